@@ -0,0 +1,31 @@
+"""
+Кэши Django, общие для всех процессов.
+
+default остаётся локальным кэшем процесса для сессий, allauth и прочего.
+Данные, которые должны видеть веб, воркеры Celery и бот, хранятся в
+отдельных алиасах Redis (settings/cache.py).
+"""
+
+import time
+
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+SHARED_CACHE_ALIAS = "shared"
+FINGERPRINT_CACHE_ALIAS = "fingerprints"
+
+# аренды импорта, история опросов, версии справочников, ключи идемпотентности
+shared_cache = ConnectionProxy(caches, SHARED_CACHE_ALIAS)
+
+
+def shared_version(key: str):
+    """Номер версии из общего кэша, при отсутствии ключ получает начальный.
+
+    add атомарен, поэтому процессы сходятся на одном номере и без
+    инвалидаций он не меняется. Ошибки Redis пробрасываются вызывающему.
+    """
+    version = shared_cache.get(key)
+    if version is None:
+        shared_cache.add(key, time.time_ns(), timeout=None)
+        version = shared_cache.get(key)
+    return version
@@ -15,3 +15,6 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
+
+# Глубина и время ожидания очередей (сигналы публикации и запуска задач)
+import core.queue_metrics  # noqa: F401
@@ -0,0 +1,114 @@
+"""
+Метрики очередей Celery: глубина очереди и время ожидания задач.
+
+При публикации задача получает заголовок enqueued_at, при запуске воркер
+копит время ожидания в памяти процесса и раз в QUEUE_METRICS_FLUSH_INTERVAL
+секунд (или по QUEUE_METRICS_FLUSH_SIZE значений) одним конвейером пишет в
+списки Redis очередей (последние QUEUE_METRICS_SAMPLES значений), поэтому
+запуск большинства задач не обращается к Redis. Смотреть: manage.py queue_stats.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from celery.signals import before_task_publish, task_prerun, worker_process_shutdown
+from django.conf import settings
+from kombu.exceptions import ChannelError
+from redis.exceptions import RedisError
+
+from core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+WAIT_KEY = "metrics:queue_wait:{queue}"
+
+_pending: defaultdict[str, list[float]] = defaultdict(list)
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+@before_task_publish.connect
+def stamp_enqueued_at(headers: dict | None = None, **kwargs) -> None:
+    if headers is not None:
+        headers.setdefault("enqueued_at", time.time())
+
+
+@task_prerun.connect
+def record_queue_wait(task=None, **kwargs) -> None:
+    enqueued_at = getattr(task.request, "enqueued_at", None)
+    if not enqueued_at:
+        return
+
+    delivery_info = task.request.delivery_info or {}
+    queue = delivery_info.get("routing_key") or "celery"
+    wait = max(0.0, time.time() - float(enqueued_at))
+    with _pending_lock:
+        _pending[queue].append(round(wait, 3))
+        due = (
+            sum(map(len, _pending.values())) >= settings.QUEUE_METRICS_FLUSH_SIZE
+            or time.monotonic() - _last_flush >= settings.QUEUE_METRICS_FLUSH_INTERVAL
+        )
+    if due:
+        flush_queue_waits()
+
+
+@worker_process_shutdown.connect
+def flush_queue_waits(**kwargs) -> None:
+    """Запись накопленных времён ожидания в Redis одним конвейером"""
+    global _last_flush
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not pending:
+        return
+
+    try:
+        pipe = get_redis().pipeline()
+        for queue, waits in pending.items():
+            pipe.lpush(WAIT_KEY.format(queue=queue), *waits)
+            pipe.ltrim(
+                WAIT_KEY.format(queue=queue), 0, settings.QUEUE_METRICS_SAMPLES - 1
+            )
+        pipe.execute()
+    except RedisError as e:
+        # метрики не критичны, значения окна теряются
+        logger.warning("Не удалось записать ожидание очередей: %s", e)
+
+
+def queue_depths(app, queues) -> dict[str, int]:
+    """Число задач, ожидающих в каждой очереди брокера"""
+    depths = {}
+    with app.connection_for_read() as connection:
+        channel = connection.default_channel
+        for queue in queues:
+            try:
+                depths[queue] = channel.queue_declare(
+                    queue=queue, passive=True
+                ).message_count
+            except ChannelError:
+                # очередь ещё не создана - в ней ничего нет
+                depths[queue] = 0
+    return depths
+
+
+def queue_wait_stats(queue: str) -> dict[str, float]:
+    """Перцентили времени ожидания задач очереди в секундах"""
+    samples = sorted(
+        float(value)
+        for value in get_redis().lrange(WAIT_KEY.format(queue=queue), 0, -1)
+    )
+    if not samples:
+        return {"samples": 0}
+
+    def percentile(percent: float) -> float:
+        return samples[min(len(samples) - 1, round(percent / 100 * (len(samples) - 1)))]
+
+    return {
+        "samples": len(samples),
+        "p50": percentile(50),
+        "p95": percentile(95),
+        "max": samples[-1],
+    }
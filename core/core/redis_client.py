@@ -0,0 +1,21 @@
+"""
+Клиенты Redis для очередей, которые не укладываются в API кэша Django
+(списки, блокирующее чтение, Lua скрипты).
+"""
+
+from functools import lru_cache
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+
+
+@lru_cache(maxsize=1)
+def get_redis() -> redis.Redis:
+    """Общий на процесс синхронный клиент с пулом соединений"""
+    return redis.Redis.from_url(settings.REDIS_QUEUE_URL, decode_responses=True)
+
+
+def get_async_redis() -> aioredis.Redis:
+    """Асинхронный клиент, привязан к event loop - создаётся на каждый запуск"""
+    return aioredis.Redis.from_url(settings.REDIS_QUEUE_URL, decode_responses=True)
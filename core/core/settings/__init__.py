@@ -7,7 +7,7 @@
 from .base import *
 from .logging import *
 from .database import *
-# from .cache import *
+from .cache import *
 # from .storage import *
 # from .email import *
 # from .auth import *
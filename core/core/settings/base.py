@@ -173,6 +173,63 @@ TELEGRAM_BOT_TOKEN = get_env(
 )
 # Extract chat ID from token (first part before colon)
 TELEGRAM_CHAT_ID = TELEGRAM_BOT_TOKEN.split(":")[0] if TELEGRAM_BOT_TOKEN else ""
+# Рассылка уведомлений: сообщений в секунду внутри одной задачи и
+# сколько получателей в одной задаче
+TELEGRAM_BROADCAST_RATE = float(get_env("TELEGRAM_BROADCAST_RATE", "14"))
+TELEGRAM_BROADCAST_BATCH_SIZE = int(get_env("TELEGRAM_BROADCAST_BATCH_SIZE", "200"))
+# Куда отправлять рассылки: "celery" - задачи send_telegram_broadcast_task,
+# "redis" - очередь сервиса run_telegram_sender с одним постоянным Bot
+TELEGRAM_SENDER_BACKEND = get_env("TELEGRAM_SENDER_BACKEND", "celery")
+# Сервис отправки: одновременных запросов к Telegram и попыток на сообщение
+TELEGRAM_SENDER_CONCURRENCY = int(get_env("TELEGRAM_SENDER_CONCURRENCY", "8"))
+TELEGRAM_SENDER_MAX_ATTEMPTS = int(get_env("TELEGRAM_SENDER_MAX_ATTEMPTS", "3"))
+# Пауза перед повтором неудачной отправки (секунд), удваивается с каждой попыткой
+TELEGRAM_SENDER_RETRY_DELAY = float(get_env("TELEGRAM_SENDER_RETRY_DELAY", "5"))
+# Общий для всех отправителей лимит Telegram (token bucket в Redis):
+# сообщений в секунду всего, в секунду в личный чат и в минуту в группу
+TELEGRAM_RATE_LIMIT_ENABLED: bool = (
+    get_env("TELEGRAM_RATE_LIMIT_ENABLED", "True") == "True"
+)
+TELEGRAM_RATE_GLOBAL = float(get_env("TELEGRAM_RATE_GLOBAL", "30"))
+TELEGRAM_RATE_PRIVATE_CHAT = float(get_env("TELEGRAM_RATE_PRIVATE_CHAT", "1"))
+TELEGRAM_RATE_GROUP_PER_MINUTE = float(get_env("TELEGRAM_RATE_GROUP_PER_MINUTE", "20"))
+# Сколько секунд помнится доставка уведомления в чат (защита от повторов)
+TELEGRAM_IDEMPOTENCY_TTL = int(get_env("TELEGRAM_IDEMPOTENCY_TTL", "86400"))
+# Сколько секунд держится отметка "отправляется": если процесс упал посреди
+# отправки, после неё уведомление можно отправить снова
+TELEGRAM_IDEMPOTENCY_CLAIM_TTL = int(get_env("TELEGRAM_IDEMPOTENCY_CLAIM_TTL", "300"))
+# Пользователи, заблокировавшие бота: сколько деактивировать за один UPDATE
+TELEGRAM_UNDELIVERABLE_BATCH_SIZE = int(
+    get_env("TELEGRAM_UNDELIVERABLE_BATCH_SIZE", "1000")
+)
+# Сессии пользователей бота в памяти: сколько пользователей хранится и
+# сколько секунд живёт сессия (подписки, изменённые на сайте, видны после)
+TELEGRAM_SESSION_CACHE_SIZE = int(get_env("TELEGRAM_SESSION_CACHE_SIZE", "10000"))
+TELEGRAM_SESSION_TTL = int(get_env("TELEGRAM_SESSION_TTL", "300"))
+# Сводка уведомлений: события копятся NOTIFICATION_DIGEST_WINDOW секунд и
+# уходят одним сообщением на пользователя, новый лидер этапа - сразу
+NOTIFICATION_DIGEST_ENABLED: bool = (
+    get_env("NOTIFICATION_DIGEST_ENABLED", "False") == "True"
+)
+NOTIFICATION_DIGEST_WINDOW = int(get_env("NOTIFICATION_DIGEST_WINDOW", "60"))
+NOTIFICATION_DIGEST_LEADER_BYPASS: bool = (
+    get_env("NOTIFICATION_DIGEST_LEADER_BYPASS", "True") == "True"
+)
+# Сколько уведомлений outbox разбирается и отмечается за одну транзакцию
+NOTIFICATION_OUTBOX_BATCH_SIZE = int(get_env("NOTIFICATION_OUTBOX_BATCH_SIZE", "500"))
+# Веса классов при рассылке: пачки получателей разных классов чередуются,
+# класс с весом 2 получает две пачки за круг. Формат "B:2,C1:2", по умолчанию 1
+TELEGRAM_CLASS_WEIGHTS = {
+    name: int(weight)
+    for name, weight in (
+        item.split(":")
+        for item in get_env("TELEGRAM_CLASS_WEIGHTS", "").split(",")
+        if item
+    )
+}
+# Сколько секунд держится отметка идущего круга рассылки по классам,
+# продлевается каждым кругом. Должна быть больше отправки одного круга
+TELEGRAM_LANE_DRAIN_TTL = int(get_env("TELEGRAM_LANE_DRAIN_TTL", "600"))
 
 # Provider specific settings
 SOCIALACCOUNT_PROVIDERS = {
@@ -197,8 +254,6 @@ ACCOUNT_DEFAULT_HTTP_PROTOCOL = (
     "https"  # Указываем allauth использовать HTTPS для redirect_uri
 )
 
-os.environ["DJANGO_ALLOW_ASYNC_UNSAFE"] = "true"  # Временно для разработки
-
 # =============================================================================
 # Celery & Redis Configuration
 # =============================================================================
@@ -209,10 +264,82 @@ CELERY_TASK_TRACK_STARTED = True  # Для отслеживания статус
 CELERY_TASK_TIME_LIMIT = 30 * 60
 CELERY_RESULT_BACKEND = "django-db"
 CELERY_BROKER_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/0"
+# Отдельная база Redis для очередей приложения (исходящие сообщения Telegram).
+# Нужен Redis >= 6.2: очереди классов забирают пачки LPOP с count,
+# сервис run_telegram_sender читает очередь через BLMOVE
+REDIS_QUEUE_URL = get_env("REDIS_QUEUE_URL", f"redis://{REDIS_HOST}:{REDIS_PORT}/2")
 CELERY_RESULT_EXTENDED = True
+# Очереди: telegram_high - срочные личные сообщения (админ, подтверждения
+# подписки) со своим воркером, telegram_bulk - массовые рассылки результатов
+CELERY_TASK_ROUTES = {
+    "gymkhanagp.tasks.send_telegram_message_task": {"queue": "telegram_high"},
+    "gymkhanagp.tasks.send_telegram_broadcast_task": {"queue": "telegram_bulk"},
+    "gymkhanagp.tasks.flush_notification_digest": {"queue": "telegram_bulk"},
+    "gymkhanagp.tasks.drain_class_lanes": {"queue": "telegram_bulk"},
+}
+# Очереди, по которым собираются глубина и время ожидания (команда queue_stats)
+QUEUE_METRICS_QUEUES = ("telegram_high", "celery", "telegram_bulk")
+QUEUE_METRICS_SAMPLES = int(get_env("QUEUE_METRICS_SAMPLES", "1000"))
+# Воркер копит время ожидания в памяти и пишет в Redis раз в интервал (секунд)
+# или когда накопилось столько значений
+QUEUE_METRICS_FLUSH_INTERVAL = float(get_env("QUEUE_METRICS_FLUSH_INTERVAL", "10"))
+QUEUE_METRICS_FLUSH_SIZE = int(get_env("QUEUE_METRICS_FLUSH_SIZE", "100"))
+# Периодические задачи, DatabaseScheduler переносит их в django_celery_beat
+CELERY_BEAT_SCHEDULE = {
+    "deactivate-undeliverable-users": {
+        "task": "gymkhanagp.tasks.deactivate_undeliverable_users",
+        "schedule": 300,
+    },
+    "resume-class-lanes": {
+        "task": "gymkhanagp.tasks.resume_class_lanes",
+        "schedule": 60,
+    },
+}
 
 # =============================================================================
 # Gymkhana Cup API Settings
 # =============================================================================
 GYMKHANA_CUP_URL = get_env("GYMKHANA_CUP_URL", "https://api.gymkhana-cup.ru")
 GYMKHANA_CUP_TOKEN = get_env("GYMKHANA_CUP_TOKEN", "")
+# Пул keep-alive соединений клиента APIGetter (один на процесс)
+GYMKHANA_CUP_MAX_CONNECTIONS = int(get_env("GYMKHANA_CUP_MAX_CONNECTIONS", "20"))
+GYMKHANA_CUP_MAX_KEEPALIVE = int(get_env("GYMKHANA_CUP_MAX_KEEPALIVE", "10"))
+GYMKHANA_CUP_KEEPALIVE_EXPIRY = float(get_env("GYMKHANA_CUP_KEEPALIVE_EXPIRY", "30"))
+# HTTP/2 включается только если установлен пакет h2
+GYMKHANA_CUP_HTTP2: bool = get_env("GYMKHANA_CUP_HTTP2", "True") == "True"
+# Сколько хранить ETag/хэш последнего обработанного ответа этапа/фигуры
+GYMKHANA_CUP_FINGERPRINT_TTL = int(get_env("GYMKHANA_CUP_FINGERPRINT_TTL", "86400"))
+# Обновление спортсменов: размер порции из БД и число параллельных запросов к API
+ATHLETE_REFRESH_CHUNK_SIZE = int(get_env("ATHLETE_REFRESH_CHUNK_SIZE", "200"))
+ATHLETE_REFRESH_CONCURRENCY = int(get_env("ATHLETE_REFRESH_CONCURRENCY", "10"))
+# Сколько секунд хранить профиль спортсмена, полученный при импорте
+ATHLETE_PROFILE_TTL = int(get_env("ATHLETE_PROFILE_TTL", "300"))
+# Размер LRU кэша стран, городов и мотоциклов в процессе импорта
+DIMENSION_CACHE_SIZE = int(get_env("DIMENSION_CACHE_SIZE", "4096"))
+# Как часто (в секундах) процесс импорта сверяет версию этих справочников
+DIMENSION_CHECK_INTERVAL = float(get_env("DIMENSION_CHECK_INTERVAL", "5"))
+# Массовое обновление активных этапов и фигур: сколько обновлений одновременно
+# и сколько секунд даётся на одно обновление
+GYMKHANA_REFRESH_CONCURRENCY = int(get_env("GYMKHANA_REFRESH_CONCURRENCY", "4"))
+GYMKHANA_REFRESH_TIME_LIMIT = int(get_env("GYMKHANA_REFRESH_TIME_LIMIT", "120"))
+# Сколько раз (раз в 5 секунд) обновление ждёт свободный слот, прежде чем
+# попасть в сводку как ошибка
+GYMKHANA_REFRESH_SLOT_RETRIES = int(get_env("GYMKHANA_REFRESH_SLOT_RETRIES", "60"))
+# Блокировка импорта одного этапа/фигуры: время аренды (продлевается, пока импорт
+# идёт, и держит блокировку упавшего воркера) и что делать, если этап уже
+# импортируется: "skip" - пропустить, "follow_up" - повторить один раз после
+GYMKHANA_IMPORT_LOCK_TTL = int(get_env("GYMKHANA_IMPORT_LOCK_TTL", "300"))
+GYMKHANA_IMPORT_LOCK_POLICY = get_env("GYMKHANA_IMPORT_LOCK_POLICY", "follow_up")
+# Сколько секунд живёт индекс подписчиков для рассылки (сбрасывается сигналами)
+SUBSCRIBER_INDEX_TTL = int(get_env("SUBSCRIBER_INDEX_TTL", "3600"))
+# Как часто (в секундах) процесс сверяет версию справочников в памяти
+REFERENCE_CHECK_INTERVAL = float(get_env("REFERENCE_CHECK_INTERVAL", "5"))
+# Адаптивный опрос этапов (секунды): частый - у конца приёма результатов или при
+# потоке изменений, обычный - для идущих этапов, редкий - для предстоящих
+GYMKHANA_POLL_FAST = int(get_env("GYMKHANA_POLL_FAST", "60"))
+GYMKHANA_POLL_NORMAL = int(get_env("GYMKHANA_POLL_NORMAL", "600"))
+GYMKHANA_POLL_SLOW = int(get_env("GYMKHANA_POLL_SLOW", "3600"))
+# Окно, в котором считаются изменения и близость к date_start/date_end
+GYMKHANA_POLL_WINDOW = int(get_env("GYMKHANA_POLL_WINDOW", "3600"))
+# Сколько новых/улучшенных результатов за окно переводят этап в частый опрос
+GYMKHANA_POLL_BURST_CHANGES = int(get_env("GYMKHANA_POLL_BURST_CHANGES", "5"))
@@ -0,0 +1,33 @@
+# ===========================================
+# CACHE CONFIGURATION
+# ===========================================
+from .base import REDIS_HOST, REDIS_PORT
+
+REDIS_CACHE_LOCATION = f"redis://{REDIS_HOST}:{REDIS_PORT}/1"
+
+# default - кэш процесса по умолчанию Django (сессии, allauth, ratelimit).
+# Redis подключается отдельными алиасами только там, где данные общие для
+# всех процессов: веб, воркеры celery и бот (core.caches)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # ETag/хэши последних обработанных ответов API этапов и фигур
+    "fingerprints": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": REDIS_CACHE_LOCATION,
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+        },
+        "KEY_PREFIX": "mg_bot:fingerprints",
+    },
+    # координация процессов: аренды, версии справочников, идемпотентность
+    "shared": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": REDIS_CACHE_LOCATION,
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+        },
+        "KEY_PREFIX": "mg_bot",
+    },
+}
@@ -51,9 +51,8 @@ PASSWORD_HASHERS = [
 
 # Disable caching for tests
 CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.dummy.DummyCache",
-    }
+    alias: {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+    for alias in ("default", "shared", "fingerprints")
 }
 
 # =============================================================================
@@ -81,6 +80,9 @@ CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "cache+memory://")
 CELERY_TASK_ALWAYS_EAGER = True
 CELERY_TASK_EAGER_PROPAGATES = True
 
+# Ограничитель Telegram требует Redis
+TELEGRAM_RATE_LIMIT_ENABLED = False
+
 # =============================================================================
 # Email Backend
 # =============================================================================
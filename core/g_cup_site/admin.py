@@ -105,7 +105,9 @@ class BaseFigureModelAdmin(admin.ModelAdmin):
         "track",
         "results_count",
         "with_in_class",
+        "is_tracked",
     )
+    list_filter = ("is_tracked",)
 
     def results_count(self, obj):
         return obj.results_base_figure.count()
@@ -1,6 +1,15 @@
+import logging
+
 from django.apps import AppConfig
 
+logger = logging.getLogger(__name__)
+
 
 class GCupSiteConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "g_cup_site"
+
+    def ready(self):
+        from . import signals
+
+        logger.debug(f"Импортированы signals {signals.clear_dimension_cache}")
@@ -0,0 +1,122 @@
+import logging
+import time
+from dataclasses import dataclass, field
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+
+from g_cup_site.models import AthleteModel
+from g_cup_site.utils import AsyncAPIGetter, fetch_athlete_profiles
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AthleteRefreshReport:
+    """Итоги обновления спортсменов"""
+
+    total: int = 0
+    changed: int = 0
+    class_changed: int = 0
+    failed: list[int] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Спортсменов в секунду"""
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"Обработано {self.total} спортсменов за {self.elapsed:.1f} сек "
+            f"({self.throughput:.1f}/сек). Изменено: {self.changed}, "
+            f"сменили класс: {self.class_changed}, ошибок: {len(self.failed)}."
+        )
+
+
+class AthleteRefreshEngine:
+    """Обновление данных всех спортсменов с gymkhana-cup.
+
+    Спортсмены читаются из базы порциями по chunk_size, профили каждой порции
+    запрашиваются параллельно, а в базу одним bulk_update записываются только
+    строки, в которых что-то поменялось.
+    """
+
+    # поле модели -> ключ в ответе /users/get
+    FIELDS_MAP = {
+        "first_name": "firstName",
+        "last_name": "lastName",
+        "sportsman_class": "class",
+        "img_url": "imgUrl",
+        "number": "number",
+    }
+
+    def __init__(self, chunk_size: int | None = None, concurrency: int | None = None):
+        self.chunk_size = chunk_size or settings.ATHLETE_REFRESH_CHUNK_SIZE
+        self.concurrency = concurrency or settings.ATHLETE_REFRESH_CONCURRENCY
+
+    def run(self) -> AthleteRefreshReport:
+        return async_to_sync(self.arun)()
+
+    async def arun(self) -> AthleteRefreshReport:
+        report = AthleteRefreshReport()
+        start_time = time.monotonic()
+
+        async with AsyncAPIGetter() as api:
+            last_id = None
+            while chunk := await self._next_chunk(last_id):
+                await self._refresh_chunk(api, chunk, report)
+                last_id = chunk[-1].id
+            logger.info("Замеры запросов к API: %s", api.timing_summary())
+
+        report.elapsed = time.monotonic() - start_time
+        logger.info(str(report))
+        return report
+
+    async def _next_chunk(self, last_id: int | None) -> list[AthleteModel]:
+        queryset = AthleteModel.objects.only("id", *self.FIELDS_MAP).order_by("id")
+        if last_id is not None:
+            queryset = queryset.filter(id__gt=last_id)
+        return [athlete async for athlete in queryset[: self.chunk_size]]
+
+    async def _refresh_chunk(
+        self,
+        api: AsyncAPIGetter,
+        chunk: list[AthleteModel],
+        report: AthleteRefreshReport,
+    ) -> None:
+        profiles = await fetch_athlete_profiles(
+            api, [athlete.id for athlete in chunk], self.concurrency
+        )
+
+        changed = []
+        for athlete in chunk:
+            profile = profiles.get(athlete.id)
+            if profile is None:
+                logger.warning("Не удалось получить данные спортсмена %s", athlete.id)
+                report.failed.append(athlete.id)
+                continue
+
+            if self.apply_profile(athlete, profile, report):
+                changed.append(athlete)
+
+        if changed:
+            await AthleteModel.objects.abulk_update(changed, list(self.FIELDS_MAP))
+
+        report.total += len(chunk)
+        report.changed += len(changed)
+
+    def apply_profile(
+        self, athlete: AthleteModel, profile: dict, report: AthleteRefreshReport
+    ) -> bool:
+        """Переносит данные профиля в модель, возвращает True если что-то изменилось"""
+        changed = False
+        for field_name, key in self.FIELDS_MAP.items():
+            if key not in profile:
+                continue
+            if getattr(athlete, field_name) != profile[key]:
+                if field_name == "sportsman_class":
+                    report.class_changed += 1
+                setattr(athlete, field_name, profile[key])
+                changed = True
+        return changed
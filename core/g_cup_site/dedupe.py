@@ -0,0 +1,79 @@
+"""
+Слияние дублей перед уникальными ограничениями.
+
+До ограничений unique_* в базе могли накопиться дубли: страны, города и
+мотоциклы с одинаковым названием, несколько результатов одного спортсмена
+на этапе или базовой фигуре. Миграция, добавляющая ограничение, упадёт
+на таких данных, поэтому дубли сливаются заранее миграциями данных
+0002_deduplicate_results и 0005_deduplicate_dimensions, а вручную - командой
+deduplicate. Функции принимают реестр приложений, чтобы работать и с
+историческими моделями миграций.
+"""
+
+import logging
+
+from django.db import models
+from django.db.models import Count
+
+logger = logging.getLogger(__name__)
+
+
+def merge_duplicates(
+    model: type[models.Model], fields: list[str], keep_order: tuple[str, ...] = ("pk",)
+) -> int:
+    """Оставляет по одной записи на значение fields - первую по keep_order.
+
+    Внешние ключи на удаляемые дубли переносятся на оставшуюся запись.
+    Возвращает число удалённых записей.
+    """
+    groups = (
+        model._base_manager.order_by()
+        .values(*fields)
+        .annotate(total=Count("pk"))
+        .filter(total__gt=1)
+    )
+    references = [
+        relation
+        for relation in model._meta.related_objects
+        if relation.one_to_many or relation.one_to_one
+    ]
+    removed = 0
+    for group in groups:
+        keep_id, *duplicate_ids = (
+            model._base_manager.filter(**{field: group[field] for field in fields})
+            .order_by(*keep_order)
+            .values_list("pk", flat=True)
+        )
+        for relation in references:
+            relation.related_model._base_manager.filter(
+                **{f"{relation.field.name}__in": duplicate_ids}
+            ).update(**{relation.field.attname: keep_id})
+        removed += model._base_manager.filter(pk__in=duplicate_ids).delete()[0]
+    if removed:
+        logger.info("%s: удалено дублей %s", model.__name__, removed)
+    return removed
+
+
+def deduplicate_dimensions(apps) -> int:
+    """Страны, города и мотоциклы. Города сливаются после стран: после
+    переноса ссылок одинаковые города разных стран-дублей совпадают."""
+    return (
+        merge_duplicates(apps.get_model("g_cup_site", "CountryModel"), ["title"])
+        + merge_duplicates(
+            apps.get_model("g_cup_site", "CityModel"), ["title", "country"]
+        )
+        + merge_duplicates(apps.get_model("g_cup_site", "MotorcycleModel"), ["title"])
+    )
+
+
+def deduplicate_results(apps) -> int:
+    """Результаты этапов и базовых фигур: остаётся лучшее время спортсмена,
+    при равном времени - более ранняя запись"""
+    best_first = ("result_time_seconds", "pk")
+    return merge_duplicates(
+        apps.get_model("g_cup_site", "StageResultModel"), ["stage", "user"], best_first
+    ) + merge_duplicates(
+        apps.get_model("g_cup_site", "BaseFigureSportsmanResultModel"),
+        ["base_figure", "user"],
+        best_first,
+    )
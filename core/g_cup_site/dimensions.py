@@ -0,0 +1,188 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable
+
+from core.caches import shared_cache, shared_version
+from django.conf import settings
+from django.db import models
+from redis.exceptions import RedisError
+
+from g_cup_site.models import CityModel, CountryModel, MotorcycleModel
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """Потокобезопасный LRU кэш ограниченного размера"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: Hashable, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DimensionResolver:
+    """Пакетное получение стран, городов и мотоциклов по названиям.
+
+    Все названия из payload разрешаются несколькими запросами по множеству,
+    недостающие записи создаются через bulk_create. Найденные модели хранятся
+    в LRU кэше процесса, поэтому повторные импорты не ходят в базу за справочниками.
+
+    Изменение справочника меняет номер версии в общем кэше (сигналы
+    g_cup_site.signals), процессы сверяют её не чаще раза в check_interval
+    секунд и сбрасывают свой LRU, если она изменилась.
+    """
+
+    VERSION_KEY = "dimensions:version"
+
+    def __init__(self, maxsize: int, check_interval: float | None = None):
+        self.cache = LRUCache(maxsize)
+        if check_interval is None:
+            check_interval = settings.DIMENSION_CHECK_INTERVAL
+        self.check_interval = check_interval
+        self._version = None
+        self._checked_at: float | None = None
+        self._version_lock = threading.Lock()
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    @classmethod
+    def _shared_version(cls):
+        try:
+            return shared_version(cls.VERSION_KEY)
+        except RedisError:
+            logger.warning("Кэш недоступен, версия справочников импорта неизвестна")
+            return None
+
+    def _ensure_fresh(self) -> None:
+        now = time.monotonic()
+        with self._version_lock:
+            if (
+                self._checked_at is not None
+                and now - self._checked_at < self.check_interval
+            ):
+                return
+            version = self._shared_version()
+            # без общего кэша LRU сбрасывается по интервалу проверки
+            if version is None or version != self._version:
+                self.cache.clear()
+            self._version = version
+            self._checked_at = now
+
+    def invalidate(self) -> None:
+        """Справочник изменён: сброс LRU и новая версия для всех процессов"""
+        self.cache.clear()
+        try:
+            shared_cache.set(self.VERSION_KEY, time.time_ns(), timeout=None)
+        except RedisError:
+            logger.warning("Не удалось обновить версию справочников импорта в кэше")
+
+    def _resolve_titles(
+        self, model: type[models.Model], titles: Iterable[str]
+    ) -> dict[str, models.Model]:
+        """Разрешение справочника с уникальным полем title"""
+        self._ensure_fresh()
+        resolved = {}
+        missing = set()
+        for title in set(titles):
+            cached = self.cache.get((model.__name__, title))
+            if cached is None:
+                missing.add(title)
+            else:
+                resolved[title] = cached
+
+        if missing:
+            found = {obj.title: obj for obj in model.objects.filter(title__in=missing)}
+
+            to_create = [model(title=title) for title in missing - found.keys()]
+            if to_create:
+                logger.info("Создаём %s: %s", model.__name__, len(to_create))
+                # параллельный импорт мог создать те же названия: конфликт
+                # пропускается, созданные записи перечитываются
+                model.objects.bulk_create(to_create, ignore_conflicts=True)
+                for obj in model.objects.filter(
+                    title__in=[obj.title for obj in to_create]
+                ):
+                    found[obj.title] = obj
+
+            for title, obj in found.items():
+                self.cache.set((model.__name__, title), obj)
+                resolved[title] = obj
+
+        return resolved
+
+    def countries(self, titles: Iterable[str]) -> dict[str, CountryModel]:
+        return self._resolve_titles(CountryModel, titles)
+
+    def motorcycles(self, titles: Iterable[str]) -> dict[str, MotorcycleModel]:
+        return self._resolve_titles(MotorcycleModel, titles)
+
+    def cities(
+        self, pairs: Iterable[tuple[str, str]]
+    ) -> dict[tuple[str, str], CityModel]:
+        """Города по парам (город, страна)"""
+        self._ensure_fresh()
+        resolved = {}
+        missing = set()
+        for pair in set(pairs):
+            cached = self.cache.get(("CityModel", pair))
+            if cached is None:
+                missing.add(pair)
+            else:
+                resolved[pair] = cached
+
+        if missing:
+            countries = self.countries(country for _, country in missing)
+            cities = CityModel.objects.filter(
+                title__in={title for title, _ in missing},
+                country__in=countries.values(),
+            ).select_related("country")
+            found = {(city.title, city.country.title): city for city in cities}
+
+            to_create = [
+                CityModel(title=title, country=countries[country])
+                for title, country in missing - found.keys()
+            ]
+            if to_create:
+                logger.info("Создаём CityModel: %s", len(to_create))
+                CityModel.objects.bulk_create(to_create, ignore_conflicts=True)
+                for city in cities.all():
+                    found[(city.title, city.country.title)] = city
+
+            for pair, city in found.items():
+                if pair in missing:
+                    self.cache.set(("CityModel", pair), city)
+                    resolved[pair] = city
+
+        return resolved
+
+    def city(self, title: str, country: str) -> CityModel:
+        return self.cities([(title, country)])[(title, country)]
+
+
+# Общий для всех импортёров процесса
+dimension_resolver = DimensionResolver(maxsize=settings.DIMENSION_CACHE_SIZE)
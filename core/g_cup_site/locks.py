@@ -0,0 +1,128 @@
+import logging
+import threading
+import uuid
+from contextlib import contextmanager
+
+from core.redis_client import get_redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# KEYS: ключ блокировки
+# ARGV: токен владельца
+# Удаляет ключ, только если он всё ещё принадлежит владельцу
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# KEYS: ключ блокировки
+# ARGV: токен владельца, срок аренды в миллисекундах
+# Продлевает аренду, только если она всё ещё принадлежит владельцу
+EXTEND_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def _release(key: str, owner: str) -> None:
+    get_redis().register_script(RELEASE_SCRIPT)(keys=[key], args=[owner])
+
+
+class ConcurrencySlots:
+    """Ограничение числа одновременно выполняемых задач через Redis.
+
+    Каждый слот - отдельный ключ, занимается атомарным SET NX. Ключи живут
+    не дольше ttl, поэтому упавший воркер не держит слот вечно.
+    """
+
+    def __init__(self, name: str, limit: int, ttl: float):
+        self.name = name
+        self.limit = limit
+        self.ttl = ttl
+
+    def _key(self, slot: int) -> str:
+        return f"slots:{self.name}:{slot}"
+
+    def acquire(self, owner: str) -> int | None:
+        """Номер занятого слота или None, если все слоты заняты"""
+        redis = get_redis()
+        for slot in range(self.limit):
+            if redis.set(self._key(slot), owner, nx=True, px=int(self.ttl * 1000)):
+                return slot
+        logger.debug("Все слоты %s заняты", self.name)
+        return None
+
+    def release(self, slot: int, owner: str) -> None:
+        # по истечении ttl слот мог занять другой владелец
+        _release(self._key(slot), owner)
+
+
+class LeaseLock:
+    """Блокировка с арендой на ttl секунд в Redis.
+
+    Захват - атомарный SET NX со случайным токеном, освобождается и
+    продлевается только владельцем (сравнение и запись в одном Lua скрипте).
+    Пока выполняется блок kept_alive, аренда продлевается в фоне, поэтому
+    ttl ограничивает только время жизни блокировки упавшего воркера.
+    Занятая блокировка может запросить один повторный запуск после
+    освобождения, повторные запросы схлопываются в один.
+    """
+
+    def __init__(self, key: str, ttl: float):
+        self.key = f"lock:{key}"
+        self.follow_up_key = f"{self.key}:follow_up"
+        self.ttl = ttl
+        self.token = uuid.uuid4().hex
+
+    @property
+    def _ttl_ms(self) -> int:
+        return int(self.ttl * 1000)
+
+    def acquire(self) -> bool:
+        return bool(get_redis().set(self.key, self.token, nx=True, px=self._ttl_ms))
+
+    def extend(self) -> bool:
+        """Продление аренды на ttl, False - блокировка уже потеряна"""
+        return bool(
+            get_redis().register_script(EXTEND_SCRIPT)(
+                keys=[self.key], args=[self.token, self._ttl_ms]
+            )
+        )
+
+    def release(self) -> None:
+        _release(self.key, self.token)
+
+    @contextmanager
+    def kept_alive(self):
+        """Аренда продлевается каждую треть ttl, пока выполняется блок"""
+        stopped = threading.Event()
+
+        def renew() -> None:
+            while not stopped.wait(self.ttl / 3):
+                try:
+                    if not self.extend():
+                        logger.warning("Аренда %s потеряна до завершения", self.key)
+                        return
+                except RedisError:
+                    logger.warning("Не удалось продлить аренду %s", self.key)
+
+        thread = threading.Thread(target=renew, name=self.key, daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            stopped.set()
+            thread.join()
+
+    def request_follow_up(self) -> None:
+        """Просьба владельцу блокировки повторить запуск после завершения"""
+        get_redis().set(self.follow_up_key, self.token, nx=True, px=self._ttl_ms)
+
+    def pop_follow_up(self) -> bool:
+        """Был ли запрошен повторный запуск, запрос снимается"""
+        return bool(get_redis().delete(self.follow_up_key))
@@ -0,0 +1,37 @@
+import logging
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from g_cup_site.dedupe import deduplicate_dimensions, deduplicate_results
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Слияние дублей, которые не дадут применить уникальные ограничения."
+        " migrate делает это сам, команда - для проверки данных вручную"
+    )
+
+    def handle(self, *args, **options):
+        tables = set(connection.introspection.table_names())
+        required = {
+            apps.get_model("g_cup_site", name)._meta.db_table
+            for name in (
+                "CountryModel",
+                "CityModel",
+                "MotorcycleModel",
+                "StageResultModel",
+                "BaseFigureSportsmanResultModel",
+            )
+        }
+        if not required <= tables:
+            # новая база: таблицы создаст migrate, дублей в ней нет
+            self.stdout.write("Таблицы ещё не созданы, слияние не требуется")
+            return
+
+        with transaction.atomic():
+            removed = deduplicate_dimensions(apps) + deduplicate_results(apps)
+        self.stdout.write(self.style.SUCCESS(f"Удалено дублей: {removed}"))
@@ -6,7 +6,7 @@ from g_cup_site.models import (
     StageModel,
     AthleteModel,
 )
-from g_cup_site.utils import BaseFigureHandler
+from g_cup_site.utils import APIGetter, BaseFigureHandler
 
 logger = logging.getLogger(__name__)
 
@@ -58,5 +58,7 @@ class Command(BaseCommand):
         except Exception as e:
             logger.exception(f"Ошибка при импорте данных: {e}")
             raise CommandError(f"Ошибка при импорте данных: {e}")
+        finally:
+            APIGetter.close_shared_client()
 
         logger.info(f"Изменения в базе данных: {stage_results.changes}")
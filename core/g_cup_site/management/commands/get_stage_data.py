@@ -60,5 +60,7 @@ class Command(BaseCommand):
         except Exception as e:
             logger.exception(f"Ошибка при импорте данных: {e}")
             raise CommandError(f"Ошибка при импорте данных: {e}")
+        finally:
+            APIGetter.close_shared_client()
 
         logger.info(f"Изменения в базе данных: {stage_results.changes}")
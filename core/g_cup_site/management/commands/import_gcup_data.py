@@ -5,12 +5,10 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.db.models import UniqueConstraint
 from django.utils import timezone
+from g_cup_site.dimensions import dimension_resolver
 from g_cup_site.models import (
     AthleteModel,
     ChampionshipModel,
-    CityModel,
-    CountryModel,
-    MotorcycleModel,
     StageModel,
     StageResultModel,
 )
@@ -61,6 +59,9 @@ class Command(BaseCommand):
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"Error during import: {str(e)}"))
             raise
+        finally:
+            logger.info("Замеры запросов к API: %s", api.timing_summary())
+            APIGetter.close_shared_client()
 
     def import_championships(self, api: APIGetter, champ_type, from_year, to_year):
         championships = api.get_data_championships(
@@ -124,14 +125,16 @@ class Command(BaseCommand):
             logger.info("Данных по результатам этапа нет.")
             return
         logger.info("Данные по результатам этапа получены. Загружаем результаты этапа.")
+        # Справочники для всего этапа разрешаются пакетно до цикла
+        cities = dimension_resolver.cities(
+            (result_data["userCity"], result_data["userCountry"])
+            for result_data in results_data
+        )
+        motorcycles = dimension_resolver.motorcycles(
+            result_data["motorcycle"] for result_data in results_data
+        )
         for result_data in results_data:
-            country, _ = CountryModel.objects.get_or_create(
-                title=result_data["userCountry"]
-            )
-
-            city, _ = CityModel.objects.get_or_create(
-                title=result_data["userCity"], country=country
-            )
+            city = cities[(result_data["userCity"], result_data["userCountry"])]
 
             athlete, _ = AthleteModel.objects.get_or_create(
                 id=result_data["userId"],
@@ -145,16 +148,14 @@ class Command(BaseCommand):
                 },
             )
 
-            motorcycle, _ = MotorcycleModel.objects.get_or_create(
-                title=result_data["motorcycle"]
-            )
+            motorcycle = motorcycles[result_data["motorcycle"]]
             # Создаем результат этапа
             try:
                 stage_result = StageResultModel.objects.update_or_create(
                     stage=stage,
                     user=athlete,
-                    motorcycle=motorcycle,
                     defaults={
+                        "motorcycle": motorcycle,
                         "date": self.parse_unix_time(result_data["date"]),
                         "place": result_data.get("place", 0),
                         "fine": result_data.get("fine", 0),
@@ -0,0 +1,40 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from django_celery_beat.models import IntervalSchedule, PeriodicTask
+
+from g_cup_site.scheduler import stage_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Регистрация адаптивного опроса этапов в django_celery_beat"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--every",
+            type=int,
+            default=15,
+            help="Как часто (в минутах) пересчитывать интервалы опроса этапов",
+        )
+
+    def handle(self, *args, **options):
+        schedule, _ = IntervalSchedule.objects.get_or_create(
+            every=options["every"], period=IntervalSchedule.MINUTES
+        )
+        PeriodicTask.objects.update_or_create(
+            name="sync_stage_schedules",
+            defaults={
+                "task": "g_cup_site.tasks.stage_update.sync_stage_schedules",
+                "interval": schedule,
+                "enabled": True,
+            },
+        )
+        intervals = stage_scheduler.sync_all()
+        for stage_id, interval in intervals.items():
+            status = f"каждые {interval} сек" if interval else "остановлен"
+            self.stdout.write(f"Этап {stage_id}: {status}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Опрос настроен для {len(intervals)} этапов")
+        )
@@ -1,8 +1,9 @@
 import logging
 
+from django.conf import settings
 from django.core.management.base import BaseCommand
 
-from g_cup_site.tasks import update_all_athletes_info
+from g_cup_site.athletes import AthleteRefreshEngine
 
 logger = logging.getLogger(__name__)
 
@@ -10,5 +11,23 @@ logger = logging.getLogger(__name__)
 class Command(BaseCommand):
     help = "Обновление данных о спортсменах в базе данных"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=settings.ATHLETE_REFRESH_CHUNK_SIZE,
+            help="Сколько спортсменов читать из базы за раз",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.ATHLETE_REFRESH_CONCURRENCY,
+            help="Число параллельных запросов к API",
+        )
+
     def handle(self, *args, **options):
-        update_all_athletes_info()
+        engine = AthleteRefreshEngine(
+            chunk_size=options["chunk_size"], concurrency=options["concurrency"]
+        )
+        report = engine.run()
+        self.stdout.write(self.style.SUCCESS(str(report)))
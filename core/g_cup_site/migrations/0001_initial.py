@@ -0,0 +1,445 @@
+# Generated by Django 6.0.9 on 2026-10-18 13:52
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="BaseFigureModel",
+            fields=[
+                (
+                    "id",
+                    models.IntegerField(
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID фигуры на сайте",
+                    ),
+                ),
+                (
+                    "title",
+                    models.CharField(max_length=255, verbose_name="Название фигуры"),
+                ),
+                ("description", models.TextField(verbose_name="Описание фигуры")),
+                ("track", models.URLField(max_length=500, verbose_name="Фото фигуры")),
+                (
+                    "with_in_class",
+                    models.BooleanField(
+                        verbose_name="Производится ли повышение класса"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Базовая фигура",
+                "verbose_name_plural": "Базовые фигуры",
+                "ordering": ["-id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ChampionshipModel",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("champ_id", models.IntegerField(verbose_name="ID чемпионата")),
+                (
+                    "title",
+                    models.CharField(
+                        max_length=255, verbose_name="Название чемпионата"
+                    ),
+                ),
+                (
+                    "year",
+                    models.IntegerField(
+                        validators=[django.core.validators.MinValueValidator(1900)],
+                        verbose_name="Год проведения",
+                    ),
+                ),
+                ("description", models.TextField(verbose_name="Описание (HTML)")),
+                (
+                    "champ_type",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("gp", "Классический чемпионат GGP"),
+                            ("offline", "Очные соревнования"),
+                            ("online", "Онлайн-соревнования"),
+                        ],
+                        max_length=20,
+                        null=True,
+                        verbose_name="Тип чемпионата",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Чемпионат",
+                "verbose_name_plural": "Чемпионаты",
+                "ordering": ["-year", "title"],
+            },
+        ),
+        migrations.CreateModel(
+            name="CityModel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("title", models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="CountryModel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "title",
+                    models.CharField(max_length=100, verbose_name="Название страны"),
+                ),
+            ],
+            options={
+                "verbose_name": "Страна",
+                "verbose_name_plural": "Страны",
+            },
+        ),
+        migrations.CreateModel(
+            name="MotorcycleModel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "title",
+                    models.CharField(max_length=100, verbose_name="Название мотоцикла"),
+                ),
+            ],
+            options={
+                "verbose_name": "Мотоцикл",
+                "verbose_name_plural": "Мотоциклы",
+            },
+        ),
+        migrations.CreateModel(
+            name="AthleteModel",
+            fields=[
+                (
+                    "id",
+                    models.IntegerField(
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID спортсмена на сайте",
+                    ),
+                ),
+                (
+                    "first_name",
+                    models.CharField(max_length=100, verbose_name="Имя спортсмена"),
+                ),
+                (
+                    "last_name",
+                    models.CharField(max_length=100, verbose_name="Фамилия спортсмена"),
+                ),
+                (
+                    "sportsman_class",
+                    models.CharField(
+                        choices=[
+                            ("A", "A"),
+                            ("B", "B"),
+                            ("C1", "C1"),
+                            ("C2", "C2"),
+                            ("C3", "C3"),
+                            ("D1", "D1"),
+                            ("D2", "D2"),
+                            ("D3", "D3"),
+                            ("D4", "D4"),
+                            ("N", "N"),
+                            (None, "None"),
+                        ],
+                        max_length=2,
+                        verbose_name="Класс спортсмена",
+                    ),
+                ),
+                (
+                    "img_url",
+                    models.URLField(
+                        blank=True,
+                        max_length=500,
+                        null=True,
+                        verbose_name="Ссылка на фото спортсмена",
+                    ),
+                ),
+                (
+                    "number",
+                    models.IntegerField(
+                        blank=True, null=True, verbose_name="Номер спортсмена"
+                    ),
+                ),
+                (
+                    "city",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="athletes",
+                        to="g_cup_site.citymodel",
+                        verbose_name="Город",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Спортсмен",
+                "verbose_name_plural": "Спортсмены",
+                "ordering": ["last_name", "first_name"],
+            },
+        ),
+        migrations.AddField(
+            model_name="citymodel",
+            name="country",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="cities",
+                to="g_cup_site.countrymodel",
+                verbose_name="Страна",
+            ),
+        ),
+        migrations.CreateModel(
+            name="BaseFigureSportsmanResultModel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateTimeField(verbose_name="Дата заезда")),
+                (
+                    "fine",
+                    models.IntegerField(blank=True, null=True, verbose_name="Штраф"),
+                ),
+                (
+                    "result_time_seconds",
+                    models.IntegerField(verbose_name="Итоговое время (мс)"),
+                ),
+                (
+                    "result_time",
+                    models.CharField(max_length=20, verbose_name="Итоговое время"),
+                ),
+                (
+                    "video",
+                    models.URLField(
+                        blank=True, max_length=500, null=True, verbose_name="Видео"
+                    ),
+                ),
+                (
+                    "base_figure",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="results_base_figure",
+                        to="g_cup_site.basefiguremodel",
+                        verbose_name="Базовая фигура",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="results_base_figure",
+                        to="g_cup_site.athletemodel",
+                        verbose_name="Спортсмен",
+                    ),
+                ),
+                (
+                    "motorcycle",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="results_base_figure",
+                        to="g_cup_site.motorcyclemodel",
+                        verbose_name="Мотоцикл",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Результат проезда базовой фигуры",
+                "verbose_name_plural": "Результаты проездов базовых фигур",
+                "ordering": ["-date"],
+            },
+        ),
+        migrations.CreateModel(
+            name="StageModel",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("stage_id", models.IntegerField(verbose_name="ID этапа")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("upcoming", "Предстоящий этап"),
+                            ("accepting", "Приём результатов"),
+                            ("judging", "Подведение итогов"),
+                            ("completed", "Прошедший этап"),
+                            ("canceled", "Этап отменён"),
+                        ],
+                        max_length=20,
+                        verbose_name="Статус этапа",
+                    ),
+                ),
+                (
+                    "title",
+                    models.CharField(max_length=255, verbose_name="Название этапа"),
+                ),
+                (
+                    "stage_class",
+                    models.CharField(
+                        choices=[
+                            ("A", "A"),
+                            ("B", "B"),
+                            ("C1", "C1"),
+                            ("C2", "C2"),
+                            ("C3", "C3"),
+                            ("D1", "D1"),
+                            ("D2", "D2"),
+                            ("D3", "D3"),
+                            ("D4", "D4"),
+                            ("N", "N"),
+                            (None, "None"),
+                        ],
+                        max_length=2,
+                        verbose_name="Класс этапа",
+                    ),
+                ),
+                (
+                    "track_url",
+                    models.URLField(
+                        blank=True,
+                        max_length=500,
+                        null=True,
+                        verbose_name="Ссылка на трассу",
+                    ),
+                ),
+                (
+                    "date_start",
+                    models.DateTimeField(null=True, verbose_name="Дата начала"),
+                ),
+                (
+                    "date_end",
+                    models.DateTimeField(null=True, verbose_name="Дата окончания"),
+                ),
+                (
+                    "championship",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stages",
+                        to="g_cup_site.championshipmodel",
+                        verbose_name="Чемпионат",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Этап чемпионата",
+                "verbose_name_plural": "Этапы чемпионатов",
+                "ordering": ["date_start"],
+            },
+        ),
+        migrations.CreateModel(
+            name="StageResultModel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateTimeField(verbose_name="Дата заезда")),
+                (
+                    "place",
+                    models.IntegerField(
+                        blank=True, null=True, verbose_name="Место в этапе"
+                    ),
+                ),
+                ("fine", models.IntegerField(verbose_name="Штраф")),
+                (
+                    "result_time_seconds",
+                    models.IntegerField(verbose_name="Итоговое время (мс)"),
+                ),
+                (
+                    "result_time",
+                    models.CharField(max_length=20, verbose_name="Итоговое время"),
+                ),
+                (
+                    "video",
+                    models.URLField(
+                        blank=True, max_length=500, null=True, verbose_name="Видео"
+                    ),
+                ),
+                (
+                    "motorcycle",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="results",
+                        to="g_cup_site.motorcyclemodel",
+                        verbose_name="Мотоцикл",
+                    ),
+                ),
+                (
+                    "stage",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="results",
+                        to="g_cup_site.stagemodel",
+                        verbose_name="Этап",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="results",
+                        to="g_cup_site.athletemodel",
+                        verbose_name="Спортсмен",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Результат этапа",
+                "verbose_name_plural": "Результаты этапов",
+                "ordering": ["-date"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="athletemodel",
+            index=models.Index(
+                fields=["last_name", "first_name"],
+                name="g_cup_site__last_na_d35fbe_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="athletemodel",
+            index=models.Index(
+                fields=["sportsman_class"], name="g_cup_site__sportsm_edb686_idx"
+            ),
+        ),
+    ]
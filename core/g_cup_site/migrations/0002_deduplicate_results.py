@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from g_cup_site.dedupe import deduplicate_results
+
+
+def forwards(apps, schema_editor):
+    deduplicate_results(apps)
+
+
+class Migration(migrations.Migration):
+    """Дубли результатов сливаются до уникальных ограничений.
+
+    Отдельной миграцией: на PostgreSQL изменение таблицы в одной транзакции
+    с изменением её строк падает на отложенных проверках внешних ключей.
+    """
+
+    dependencies = [
+        ("g_cup_site", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
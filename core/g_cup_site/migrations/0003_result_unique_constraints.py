@@ -0,0 +1,38 @@
+# Generated by Django 6.0.9 on 2026-10-18 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("g_cup_site", "0002_deduplicate_results"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="basefiguresportsmanresultmodel",
+            index=models.Index(
+                fields=["base_figure", "result_time_seconds"],
+                name="g_cup_site__base_fi_0e6dc2_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stageresultmodel",
+            index=models.Index(
+                fields=["stage", "result_time_seconds"],
+                name="g_cup_site__stage_i_365b8a_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="basefiguresportsmanresultmodel",
+            constraint=models.UniqueConstraint(
+                fields=("base_figure", "user"), name="unique_base_figure_result_user"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="stageresultmodel",
+            constraint=models.UniqueConstraint(
+                fields=("stage", "user"), name="unique_stage_result_user"
+            ),
+        ),
+    ]
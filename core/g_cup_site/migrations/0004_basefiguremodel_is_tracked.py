@@ -0,0 +1,19 @@
+# Generated by Django 6.0.9 on 2026-10-18 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("g_cup_site", "0003_result_unique_constraints"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="basefiguremodel",
+            name="is_tracked",
+            field=models.BooleanField(
+                default=False, verbose_name="Отслеживать результаты фигуры"
+            ),
+        ),
+    ]
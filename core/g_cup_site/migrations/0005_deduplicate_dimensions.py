@@ -0,0 +1,19 @@
+from django.db import migrations
+
+from g_cup_site.dedupe import deduplicate_dimensions
+
+
+def forwards(apps, schema_editor):
+    deduplicate_dimensions(apps)
+
+
+class Migration(migrations.Migration):
+    """Дубли стран, городов и мотоциклов сливаются до уникальных ограничений"""
+
+    dependencies = [
+        ("g_cup_site", "0004_basefiguremodel_is_tracked"),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.9 on 2026-10-18 13:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("g_cup_site", "0005_deduplicate_dimensions"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="citymodel",
+            constraint=models.UniqueConstraint(
+                fields=("title", "country"), name="unique_city_title_country"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="countrymodel",
+            constraint=models.UniqueConstraint(
+                fields=("title",), name="unique_country_title"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="motorcyclemodel",
+            constraint=models.UniqueConstraint(
+                fields=("title",), name="unique_motorcycle_title"
+            ),
+        ),
+    ]
@@ -1,5 +1,5 @@
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import connections, models
 from django.core.validators import MinValueValidator
 from django.utils.safestring import mark_safe
 
@@ -32,6 +32,62 @@ CHAMP_TYPE_CHOICES = [
 ]
 
 
+class ResultQuerySet(models.QuerySet):
+    """QuerySet результатов с атомарной записью лучшего времени"""
+
+    def upsert_best(self, results: list, unique_fields: list[str]) -> set[int]:
+        """Вставка результатов одним INSERT ... ON CONFLICT DO UPDATE.
+
+        Существующий результат перезаписывается только если новое время лучше,
+        возвращаются user_id реально вставленных или обновлённых строк.
+        bulk_create(update_conflicts=True) не умеет условие WHERE для DO UPDATE
+        и перезаписал бы лучшее время худшим, а чтение с select_for_update и
+        bulk_update не блокирует строки, которых ещё нет, и стоит лишний круг
+        до базы. Поэтому запрос собирается вручную: сравнение времени и запись
+        происходят в одном операторе. Работает на PostgreSQL и SQLite >= 3.35.
+        """
+        if not results:
+            return set()
+
+        connection = connections[self.db]
+        meta = self.model._meta
+        qn = connection.ops.quote_name
+        table = qn(meta.db_table)
+        fields = [field for field in meta.concrete_fields if not field.primary_key]
+        columns = ", ".join(qn(field.column) for field in fields)
+        conflict = ", ".join(qn(meta.get_field(name).column) for name in unique_fields)
+        updates = ", ".join(
+            f"{qn(field.column)} = excluded.{qn(field.column)}"
+            for field in fields
+            if field.name not in unique_fields
+        )
+        time_column = qn(meta.get_field("result_time_seconds").column)
+        row_placeholder = "(" + ", ".join(["%s"] * len(fields)) + ")"
+
+        affected = set()
+        batch_size = connection.ops.bulk_batch_size(fields, results)
+        with connection.cursor() as cursor:
+            for start in range(0, len(results), batch_size):
+                batch = results[start : start + batch_size]
+                params = [
+                    field.get_db_prep_save(
+                        field.pre_save(result, add=True), connection=connection
+                    )
+                    for result in batch
+                    for field in fields
+                ]
+                cursor.execute(
+                    f"INSERT INTO {table} ({columns}) "
+                    f"VALUES {', '.join([row_placeholder] * len(batch))} "
+                    f"ON CONFLICT ({conflict}) DO UPDATE SET {updates} "
+                    f"WHERE excluded.{time_column} < {table}.{time_column} "
+                    f"RETURNING {qn(meta.get_field('user').column)}",
+                    params,
+                )
+                affected.update(row[0] for row in cursor.fetchall())
+        return affected
+
+
 class ChampionshipModel(models.Model):
     """Модель чемпионата"""
 
@@ -117,6 +173,9 @@ class MotorcycleModel(models.Model):
     class Meta:
         verbose_name = "Мотоцикл"
         verbose_name_plural = "Мотоциклы"
+        constraints = [
+            models.UniqueConstraint(fields=["title"], name="unique_motorcycle_title"),
+        ]
 
     def __str__(self):
         return f"{self.title}"
@@ -130,6 +189,9 @@ class CountryModel(models.Model):
     class Meta:
         verbose_name = "Страна"
         verbose_name_plural = "Страны"
+        constraints = [
+            models.UniqueConstraint(fields=["title"], name="unique_country_title"),
+        ]
 
     def __str__(self):
         return f"{self.title}"
@@ -146,6 +208,13 @@ class CityModel(models.Model):
         related_name="cities",
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["title", "country"], name="unique_city_title_country"
+            ),
+        ]
+
     def __str__(self):
         return f"{self.title}"
 
@@ -215,10 +284,20 @@ class StageResultModel(models.Model):
     result_time = models.CharField(max_length=20, verbose_name="Итоговое время")
     video = models.URLField(max_length=500, blank=True, null=True, verbose_name="Видео")
 
+    objects = ResultQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Результат этапа"
         verbose_name_plural = "Результаты этапов"
         ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["stage", "user"], name="unique_stage_result_user"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["stage", "result_time_seconds"]),
+        ]
 
     def __str__(self):
         return f"{self.user.first_name} {self.user.last_name} на {self.stage.title} {self.place} место"
@@ -232,6 +311,9 @@ class BaseFigureModel(models.Model):
     description = models.TextField(verbose_name="Описание фигуры")
     track = models.URLField(max_length=500, verbose_name="Фото фигуры")
     with_in_class = models.BooleanField(verbose_name="Производится ли повышение класса")
+    is_tracked = models.BooleanField(
+        default=False, verbose_name="Отслеживать результаты фигуры"
+    )
 
     class Meta:
         verbose_name = "Базовая фигура"
@@ -267,7 +349,17 @@ class BaseFigureSportsmanResultModel(models.Model):
     result_time = models.CharField(max_length=20, verbose_name="Итоговое время")
     video = models.URLField(max_length=500, blank=True, null=True, verbose_name="Видео")
 
+    objects = ResultQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Результат проезда базовой фигуры"
         verbose_name_plural = "Результаты проездов базовых фигур"
         ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["base_figure", "user"], name="unique_base_figure_result_user"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["base_figure", "result_time_seconds"]),
+        ]
@@ -0,0 +1,146 @@
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+
+from core.caches import shared_cache
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django_celery_beat.models import IntervalSchedule, PeriodicTask, PeriodicTasks
+
+from g_cup_site.models import StageModel
+
+logger = logging.getLogger(__name__)
+
+POLLED_STATUSES = ("upcoming", "accepting", "judging")
+
+
+class StagePollScheduler:
+    """Адаптивный опрос этапов через периодические задачи django_celery_beat.
+
+    Интервал опроса этапа выбирается по его статусу, близости к date_start /
+    date_end и количеству новых и улучшенных результатов за последнее окно.
+    Для закрытых этапов периодическая задача отключается.
+    """
+
+    TASK = "g_cup_site.tasks.stage_update.stage_update"
+    TASK_NAME_PREFIX = "stage_update:"
+
+    def __init__(self):
+        self.fast = settings.GYMKHANA_POLL_FAST
+        self.normal = settings.GYMKHANA_POLL_NORMAL
+        self.slow = settings.GYMKHANA_POLL_SLOW
+        self.window = settings.GYMKHANA_POLL_WINDOW
+        self.burst_changes = settings.GYMKHANA_POLL_BURST_CHANGES
+
+    def task_name(self, stage_id: int) -> str:
+        return f"{self.TASK_NAME_PREFIX}{stage_id}"
+
+    @staticmethod
+    def _history_key(stage_id: int) -> str:
+        return f"poll:changes:{stage_id}"
+
+    def record_changes(self, stage_id: int, changes: dict) -> None:
+        """Запоминает число новых и улучшенных результатов последнего опроса"""
+        count = changes.get("new_result", 0) + changes.get("improved_result", 0)
+        now = time.time()
+        history = [
+            item
+            for item in shared_cache.get(self._history_key(stage_id), [])
+            if item[0] > now - self.window
+        ]
+        history.append((now, count))
+        shared_cache.set(self._history_key(stage_id), history, timeout=self.window)
+
+    def change_rate(self, stage_id: int) -> int:
+        """Изменений результатов этапа за последнее окно"""
+        since = time.time() - self.window
+        return sum(
+            count
+            for timestamp, count in shared_cache.get(self._history_key(stage_id), [])
+            if timestamp > since
+        )
+
+    def interval_for(
+        self, stage: StageModel, now: datetime | None = None
+    ) -> int | None:
+        """Интервал опроса в секундах, None - этап опрашивать не нужно"""
+        now = now or timezone.now()
+        window = timedelta(seconds=self.window)
+
+        if stage.status not in POLLED_STATUSES:
+            return None
+
+        if stage.status == "upcoming":
+            if stage.date_start and stage.date_start - window <= now:
+                return self.normal
+            return self.slow
+
+        near_end = stage.date_end and stage.date_end - window <= now <= stage.date_end
+        if near_end or self.change_rate(stage.stage_id) >= self.burst_changes:
+            return self.fast
+        return self.normal
+
+    def sync_stage(self, stage: StageModel) -> int | None:
+        """Приводит периодическую задачу этапа к рассчитанному интервалу.
+
+        Запись в базу происходит только при изменении, чтобы beat не
+        перечитывал расписание после каждого опроса.
+        """
+        name = self.task_name(stage.stage_id)
+        interval = self.interval_for(stage)
+
+        if interval is None:
+            if PeriodicTask.objects.filter(name=name, enabled=True).update(
+                enabled=False
+            ):
+                # update() не отправляет сигналы, beat нужно уведомить вручную
+                PeriodicTasks.update_changed()
+                logger.info(f"Опрос этапа {stage.stage_id} остановлен: {stage.status}")
+            return None
+
+        schedule, _ = IntervalSchedule.objects.get_or_create(
+            every=interval, period=IntervalSchedule.SECONDS
+        )
+        task, created = PeriodicTask.objects.get_or_create(
+            name=name,
+            defaults={
+                "task": self.TASK,
+                "interval": schedule,
+                "args": json.dumps([stage.stage_id]),
+            },
+        )
+        if created:
+            logger.info(f"Опрос этапа {stage.stage_id} каждые {interval} сек")
+        elif task.interval_id != schedule.id or not task.enabled:
+            task.interval = schedule
+            task.enabled = True
+            task.save(update_fields=["interval", "enabled"])
+            logger.info(f"Интервал опроса этапа {stage.stage_id}: {interval} сек")
+        return interval
+
+    def sync_stage_by_id(self, stage_id: int) -> int | None:
+        stage = StageModel.objects.filter(stage_id=stage_id).first()
+        if stage is None:
+            return None
+        return self.sync_stage(stage)
+
+    def scheduled_stage_ids(self) -> set[int]:
+        """stage_id этапов, которые опрашиваются своей периодической задачей"""
+        return {
+            int(name.removeprefix(self.TASK_NAME_PREFIX))
+            for name in PeriodicTask.objects.filter(
+                name__startswith=self.TASK_NAME_PREFIX, enabled=True
+            ).values_list("name", flat=True)
+        }
+
+    def sync_all(self) -> dict[int, int | None]:
+        """Пересчёт интервалов для опрашиваемых этапов и этапов с включённым опросом"""
+        stages = StageModel.objects.filter(
+            Q(status__in=POLLED_STATUSES) | Q(stage_id__in=self.scheduled_stage_ids())
+        )
+        return {stage.stage_id: self.sync_stage(stage) for stage in stages}
+
+
+stage_scheduler = StagePollScheduler()
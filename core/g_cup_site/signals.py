@@ -0,0 +1,27 @@
+import logging
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .dimensions import dimension_resolver
+from .models import CityModel, CountryModel, MotorcycleModel
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=CountryModel)
+@receiver(post_save, sender=CityModel)
+@receiver(post_save, sender=MotorcycleModel)
+@receiver(post_delete, sender=CountryModel)
+@receiver(post_delete, sender=CityModel)
+@receiver(post_delete, sender=MotorcycleModel)
+def clear_dimension_cache(sender, instance, created=False, **kwargs):
+    """
+    Сигнал для сброса кэша справочников во всех процессах, чтобы импорт не
+    сослался на удалённую или переименованную запись.
+    """
+    if created:
+        # новой записи ещё нет ни в одном кэше
+        return
+    logger.info("Изменён %s, сбрасываем кэш справочников", instance)
+    dimension_resolver.invalidate()
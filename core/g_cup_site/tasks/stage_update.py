@@ -1,19 +1,55 @@
 import logging
+import time
 
+from celery import chord
+from celery.signals import worker_process_init, worker_process_shutdown
+from django.conf import settings
 
 from core import celery_app
-from g_cup_site.models import AthleteModel
+from g_cup_site.athletes import AthleteRefreshEngine
+from g_cup_site.locks import ConcurrencySlots
+from g_cup_site.models import BaseFigureModel, StageModel
+from g_cup_site.scheduler import stage_scheduler
 from g_cup_site.utils import StageGGPHandeler, BaseFigureHandler, APIGetter
 
 logger = logging.getLogger(__name__)
 
+# Через сколько секунд повторить импорт, запрошенный во время блокировки
+FOLLOW_UP_COUNTDOWN = 5
+# Через сколько секунд снова попробовать занять слот обновления
+SLOT_RETRY_COUNTDOWN = 5
+
+
+@worker_process_init.connect
+def reset_api_client(**kwargs):
+    """Каждый процесс воркера открывает собственный пул соединений к API."""
+    APIGetter.reset_shared_client()
+
+
+@worker_process_shutdown.connect
+def close_api_client(**kwargs):
+    """Корректно закрываем keep-alive соединения при остановке воркера."""
+    APIGetter.close_shared_client()
+
 
 @celery_app.task
 def stage_update(stage_id: int):
     """Периодическое обновление этапа c переданным id."""
     stage_results = StageGGPHandeler(stage_id)
     stage_results.handle()
-    return stage_results.get_data()
+    changes = stage_results.get_data()
+    if changes.get("follow_up"):
+        stage_update.apply_async((stage_id,), countdown=FOLLOW_UP_COUNTDOWN)
+    stage_scheduler.record_changes(stage_id, changes)
+    stage_scheduler.sync_stage_by_id(stage_id)
+    return changes
+
+
+@celery_app.task
+def sync_stage_schedules():
+    """Пересчёт интервалов опроса всех этапов."""
+    intervals = stage_scheduler.sync_all()
+    return {str(stage_id): interval for stage_id, interval in intervals.items()}
 
 
 @celery_app.task
@@ -21,25 +57,141 @@ def base_figure_update(figure_id: int):
     """Получение результатов для базовой фигуры."""
     stage_results = BaseFigureHandler(figure_id)
     stage_results.handle()
-    return stage_results.get_data()
+    changes = stage_results.get_data()
+    if changes.get("follow_up"):
+        base_figure_update.apply_async((figure_id,), countdown=FOLLOW_UP_COUNTDOWN)
+    return changes
 
 
 @celery_app.task
 def update_all_athletes_info():
-    api = APIGetter()
-    count = 0
-    athletes: list[AthleteModel] = AthleteModel.objects.all()
-    for athlete in athletes:
-        fresh_athlete_data = api.get_athlete_data(athlete.id)
-
-        if athlete.sportsman_class != fresh_athlete_data.get("class"):
-            count += 1
-
-        athlete.first_name = fresh_athlete_data.get("firstName")
-        athlete.last_name = fresh_athlete_data.get("lastName")
-        athlete.sportsman_class = fresh_athlete_data.get("class")
-        athlete.img_url = fresh_athlete_data.get("imgUrl")
-        athlete.number = fresh_athlete_data.get("number")
-
-        athlete.save()
-    return f"Обновили класс {count} спортсменов из {len(athletes)}."
+    """Обновление данных всех спортсменов с gymkhana-cup."""
+    report = AthleteRefreshEngine().run()
+    return str(report)
+
+
+ACTIVE_STAGE_STATUSES = ("accepting", "judging")
+
+REFRESH_HANDLERS = {
+    "stage": StageGGPHandeler,
+    "base_figure": BaseFigureHandler,
+}
+
+refresh_slots = ConcurrencySlots(
+    "refresh_entity",
+    limit=settings.GYMKHANA_REFRESH_CONCURRENCY,
+    ttl=settings.GYMKHANA_REFRESH_TIME_LIMIT + 30,
+)
+
+
+@celery_app.task(
+    bind=True,
+    max_retries=settings.GYMKHANA_REFRESH_SLOT_RETRIES,
+    soft_time_limit=settings.GYMKHANA_REFRESH_TIME_LIMIT,
+)
+def refresh_entity(self, kind: str, entity_id: int) -> dict:
+    """Обновление одного этапа или фигуры в рамках общего обновления.
+
+    Одновременно выполняется не больше GYMKHANA_REFRESH_CONCURRENCY обновлений,
+    если свободного слота нет - задача откладывается. Не дождавшись слота за
+    max_retries попыток, обновление попадает в сводку как ошибка, чтобы
+    aggregate_refresh всё равно сработал.
+    """
+    slot = refresh_slots.acquire(self.request.id)
+    if slot is None:
+        if self.request.retries < self.max_retries:
+            raise self.retry(countdown=SLOT_RETRY_COUNTDOWN)
+        logger.error("Нет свободного слота для обновления %s|%s", kind, entity_id)
+        return {
+            "kind": kind,
+            "id": entity_id,
+            "changes": {"error": "нет свободного слота"},
+            "elapsed": 0.0,
+        }
+
+    start_time = time.monotonic()
+    try:
+        handler = REFRESH_HANDLERS[kind](entity_id)
+        handler.handle()
+        changes = handler.get_data()
+        if changes.get("follow_up"):
+            refresh_entity.apply_async((kind, entity_id), countdown=FOLLOW_UP_COUNTDOWN)
+        if kind == "stage":
+            # дальше этап опрашивает его собственная задача stage_update
+            stage_scheduler.record_changes(entity_id, changes)
+            stage_scheduler.sync_stage_by_id(entity_id)
+    except Exception as e:
+        # ошибка одного этапа не должна ронять сводку всего обновления
+        logger.exception("Ошибка обновления %s|%s", kind, entity_id)
+        changes = {"error": str(e)}
+    finally:
+        refresh_slots.release(slot, self.request.id)
+
+    return {
+        "kind": kind,
+        "id": entity_id,
+        "changes": changes,
+        "elapsed": time.monotonic() - start_time,
+    }
+
+
+@celery_app.task
+def refresh_active_entities() -> str:
+    """Параллельное обновление всех активных этапов и отслеживаемых фигур.
+
+    Этапы с периодической задачей stage_update опрашивает StagePollScheduler,
+    здесь обновляются только этапы, для которых её ещё нет: refresh_entity
+    регистрирует для них опрос, и следующий запуск их уже пропустит.
+    """
+    stage_ids = (
+        StageModel.objects.filter(status__in=ACTIVE_STAGE_STATUSES)
+        .exclude(stage_id__in=stage_scheduler.scheduled_stage_ids())
+        .values_list("stage_id", flat=True)
+        .distinct()
+    )
+    figure_ids = BaseFigureModel.objects.filter(is_tracked=True).values_list(
+        "id", flat=True
+    )
+    signatures = [refresh_entity.s("stage", stage_id) for stage_id in stage_ids]
+    signatures += [
+        refresh_entity.s("base_figure", figure_id) for figure_id in figure_ids
+    ]
+    if not signatures:
+        logger.info("Нет активных этапов и отслеживаемых фигур")
+        return "Нет активных этапов и отслеживаемых фигур"
+
+    chord(signatures)(aggregate_refresh.s(time.time()))
+    logger.info(f"Запущено обновление: {len(signatures)}")
+    return f"Запущено обновление: {len(signatures)}"
+
+
+@celery_app.task
+def aggregate_refresh(results: list[dict], started_at: float) -> dict:
+    """Сводка по всем обновлениям одного запуска refresh_active_entities."""
+    summary = {
+        "entities": len(results),
+        "new_result": 0,
+        "improved_result": 0,
+        "no_change": 0,
+        "skipped": 0,
+        "contention": 0,
+        "failed": [],
+    }
+    for result in results:
+        changes = result["changes"]
+        if "error" in changes:
+            summary["failed"].append(f"{result['kind']}|{result['id']}")
+            continue
+        if changes.get("skipped"):
+            summary["skipped"] += 1
+        for key in ("new_result", "improved_result", "no_change", "contention"):
+            summary[key] += changes.get(key, 0)
+
+    summary["sweep_seconds"] = round(time.time() - started_at, 2)
+    slowest = max(results, key=lambda result: result["elapsed"])
+    logger.info(
+        f"Обновление завершено за {summary['sweep_seconds']} сек: {summary}. "
+        f"Самое долгое: {slowest['kind']}|{slowest['id']} "
+        f"({slowest['elapsed']:.2f} сек)"
+    )
+    return summary
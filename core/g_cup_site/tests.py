@@ -1,10 +1,89 @@
-from unittest.mock import MagicMock, patch
+import asyncio
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
-from g_cup_site.utils import APIGetter, TypeChampionship
+from celery.exceptions import Retry
+from g_cup_site.athletes import AthleteRefreshEngine
+from g_cup_site.dimensions import DimensionResolver, dimension_resolver
+from g_cup_site import locks
+from g_cup_site.locks import ConcurrencySlots, LeaseLock
+from g_cup_site.scheduler import StagePollScheduler, stage_scheduler
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django_celery_beat.models import PeriodicTask
+from redis.exceptions import ConnectionError as RedisConnectionError
+from g_cup_site.models import (
+    AthleteModel,
+    BaseFigureModel,
+    BaseFigureSportsmanResultModel,
+    ChampionshipModel,
+    CityModel,
+    CountryModel,
+    MotorcycleModel,
+    StageModel,
+    StageResultModel,
+)
+from g_cup_site.tasks.stage_update import (
+    REFRESH_HANDLERS,
+    aggregate_refresh,
+    refresh_active_entities,
+    refresh_entity,
+    refresh_slots,
+)
+from g_cup_site.utils import (
+    APIGetter,
+    AsyncAPIGetter,
+    ConditionalPayload,
+    StageGGPHandeler,
+    TypeChampionship,
+    athlete_profile_cache,
+    prefetch_athlete_profiles,
+)
+from gymkhanagp.models import NotificationOutbox
+from gymkhanagp.tests.fakes import FakeRedis
 from httpx import NetworkError
 
 
+class LockRedis(FakeRedis):
+    """FakeRedis со скриптами g_cup_site.locks"""
+
+    def register_script(self, script):
+        def compare_and(keys, args):
+            if self.get(keys[0]) != args[0]:
+                return 0
+            if script == locks.RELEASE_SCRIPT:
+                return self.delete(keys[0])
+            return 1
+
+        return compare_and
+
+
+@pytest.fixture(autouse=True)
+def lock_redis():
+    """Блокировки и слоты импорта в Redis в памяти"""
+    redis = LockRedis()
+    with patch("g_cup_site.locks.get_redis", return_value=redis):
+        yield redis
+
+
+@pytest.fixture(autouse=True)
+def clear_process_caches():
+    """Кэши процесса не должны переживать откат БД между тестами"""
+    dimension_resolver.clear()
+    athlete_profile_cache.clear()
+    yield
+    dimension_resolver.clear()
+    athlete_profile_cache.clear()
+
+
 @pytest.mark.django_db
 class TestAPIGetterMakeRequest:
     """Тесты для класса APIGetter. Получение совершение запроса"""
@@ -13,7 +92,7 @@ class TestAPIGetterMakeRequest:
         """Настройка перед каждым тестом."""
         self.api = APIGetter()
 
-    @patch("g_cup_site.utils.httpx.get")
+    @patch("g_cup_site.utils.httpx.Client.get")
     def test_make_request_success(self, mock_get):
         """Тест что метод работает и возвращает 200"""
         mock_response = MagicMock()
@@ -29,7 +108,7 @@ class TestAPIGetterMakeRequest:
     @pytest.mark.parametrize("status_code", [400, 401, 404])
     @patch("g_cup_site.utils.AdminNotifier")
     @patch("g_cup_site.utils.logger")
-    @patch("g_cup_site.utils.httpx.get")
+    @patch("g_cup_site.utils.httpx.Client.get")
     def test_make_request_return_4xx_status_code(
         self, mock_get, mock_logger, mock_admin_notifier, status_code
     ):
@@ -50,7 +129,7 @@ class TestAPIGetterMakeRequest:
 
     @pytest.mark.parametrize("status_code", [500, 505, 503])
     @patch("g_cup_site.utils.logger")
-    @patch("g_cup_site.utils.httpx.get")
+    @patch("g_cup_site.utils.httpx.Client.get")
     def test_make_request_return_5xx_status_code(
         self, mock_get, mock_logger, status_code
     ):
@@ -69,7 +148,7 @@ class TestAPIGetterMakeRequest:
 
     @pytest.mark.parametrize("httpx_error", [TimeoutError, NetworkError])
     @patch("g_cup_site.utils.logger")
-    @patch("g_cup_site.utils.httpx.get")
+    @patch("g_cup_site.utils.httpx.Client.get")
     def test__make_request_timeout_error(self, mock_get, mock_logger, httpx_error):
         """Тест получения ошибки соединения от httpx."""
 
@@ -91,7 +170,7 @@ class TestAPIGetterMakeRequest:
         assert result == {}
         mock_logger.error.assert_called_once()
 
-    @patch("g_cup_site.utils.httpx.get")
+    @patch("g_cup_site.utils.httpx.Client.get")
     def test_make_request_json_parse_error(self, mock_get):
         """Тест что при ошибке парсинга JSON в теле ответа возвращается пустой dict."""
         mock_response = MagicMock()
@@ -107,7 +186,7 @@ class TestAPIGetterMakeRequest:
 
     @patch("g_cup_site.utils.AdminNotifier")
     @patch("g_cup_site.utils.logger")
-    @patch("g_cup_site.utils.httpx.get")
+    @patch("g_cup_site.utils.httpx.Client.get")
     def test_make_request_5xx_notifies_admin(
         self, mock_get, mock_logger, mock_admin_notifier
     ):
@@ -124,9 +203,9 @@ class TestAPIGetterMakeRequest:
         mock_admin_notifier.notify_admin.assert_called_once()
         mock_logger.warning.assert_called_once()
 
-    @patch("g_cup_site.utils.httpx.get")
+    @patch("g_cup_site.utils.httpx.Client.get")
     def test_make_request_passes_timeout(self, mock_get):
-        """Тест что таймаут передаётся в httpx.get."""
+        """Тест что таймаут передаётся в запрос клиента."""
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = {"ok": True}
@@ -139,6 +218,83 @@ class TestAPIGetterMakeRequest:
         assert kwargs["timeout"] == 30.0
 
 
+@pytest.mark.django_db
+class TestAPIGetterConnectionPool:
+    """Тесты пула соединений APIGetter и асинхронного двойника"""
+
+    def teardown_method(self):
+        APIGetter.close_shared_client()
+
+    def test_instances_share_one_client(self):
+        """Все экземпляры процесса используют один пул соединений."""
+        assert APIGetter().client is APIGetter().client
+
+    def test_close_shared_client_recreates_pool(self):
+        """После закрытия общий клиент создаётся заново."""
+        client = APIGetter().client
+        APIGetter.close_shared_client()
+
+        assert client.is_closed
+        assert APIGetter().client is not client
+
+    def test_pool_limits_from_settings(self, settings):
+        """Лимиты пула берутся из настроек."""
+        settings.GYMKHANA_CUP_MAX_CONNECTIONS = 3
+        settings.GYMKHANA_CUP_MAX_KEEPALIVE = 2
+
+        limits = APIGetter._client_options()["limits"]
+
+        assert limits.max_connections == 3
+        assert limits.max_keepalive_connections == 2
+
+    def test_request_timing_recorded(self):
+        """Каждый запрос сохраняет замер времени и статус."""
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, json={}))
+        api = APIGetter(client=httpx.Client(transport=transport))
+        api.url = "https://api.test"
+
+        api.get_athlete_data(1)
+        api.get_athlete_data(2)
+
+        assert [t.endpoint for t in api.timings] == ["/users/get", "/users/get"]
+        assert api.timing_summary()["requests"] == 2
+
+    async def test_async_getter_uses_same_endpoints(self):
+        """AsyncAPIGetter ходит в те же эндпоинты и возвращает json."""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json={"id": 7})
+
+        api = AsyncAPIGetter(
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+        api.url = "https://api.test"
+
+        async with api:
+            result = await api.get_athlete_data(7)
+
+        assert result == {"id": 7}
+        assert requests[0].url.path == "/users/get"
+        assert requests[0].url.params["id"] == "7"
+        assert api.timings[0].status_code == 200
+
+    @patch("g_cup_site.utils.AdminNotifier")
+    async def test_async_getter_error_notifies_admin(self, mock_admin_notifier):
+        """Ошибка сервера в асинхронном клиенте уведомляет администратора."""
+        transport = httpx.MockTransport(
+            lambda request: httpx.Response(503, text="down")
+        )
+        api = AsyncAPIGetter(client=httpx.AsyncClient(transport=transport))
+        api.url = "https://api.test"
+
+        result = await api.get_figure_data(1)
+
+        assert result == {}
+        mock_admin_notifier.notify_admin.assert_called_once()
+
+
 @pytest.mark.django_db
 class TestAPIGetterGetDataChampionship:
     """Тесты для класса APIGetter. Получение данных о чемпионатах"""
@@ -530,3 +686,987 @@ class TestAPIGetterGetAthleteData:
         result = self.api.get_athlete_data(1)
 
         assert result == {}
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    """Настоящий кэш вместо DummyCache из тестовых настроек."""
+    settings.CACHES = {
+        alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        for alias in ("default", "shared", "fingerprints")
+    }
+    yield
+    from django.core.cache import cache
+
+    cache.clear()
+
+
+@pytest.mark.django_db
+class TestAPIGetterConditionalRequest:
+    """Тесты условных запросов и отпечатков payload"""
+
+    def make_api(self, handler) -> APIGetter:
+        api = APIGetter(client=httpx.Client(transport=httpx.MockTransport(handler)))
+        api.url = "https://api.test"
+        return api
+
+    def test_same_content_is_unchanged_after_commit(self, locmem_cache):
+        """Повторный одинаковый ответ помечается как неизменившийся."""
+        api = self.make_api(lambda request: httpx.Response(200, json={"id": 1}))
+
+        first = api.data_stage_if_changed(1, "gp")
+        api.commit_payload(first)
+        second = api.data_stage_if_changed(1, "gp")
+
+        assert first.changed is True
+        assert second.changed is False
+
+    def test_not_committed_payload_is_processed_again(self, locmem_cache):
+        """Пока обработка не зафиксирована, payload считается изменившимся."""
+        api = self.make_api(lambda request: httpx.Response(200, json={"id": 1}))
+
+        api.data_stage_if_changed(1, "gp")
+
+        assert api.data_stage_if_changed(1, "gp").changed is True
+
+    def test_etag_sent_and_304_is_unchanged(self, locmem_cache):
+        """ETag прошлого ответа уходит в If-None-Match, 304 - без изменений."""
+        seen_headers = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen_headers.append(request.headers.get("If-None-Match"))
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, json={"id": 1}, headers={"ETag": '"v1"'})
+
+        api = self.make_api(handler)
+        api.commit_payload(api.get_figure_data_if_changed(5))
+        result = api.get_figure_data_if_changed(5)
+
+        assert seen_headers == [None, '"v1"']
+        assert result.changed is False
+        assert result.data == {}
+
+    def test_fingerprint_is_per_entity(self, locmem_cache):
+        """Отпечаток хранится отдельно для каждого этапа."""
+        api = self.make_api(lambda request: httpx.Response(200, json={"id": 1}))
+
+        api.commit_payload(api.data_stage_if_changed(1, "gp"))
+
+        assert api.data_stage_if_changed(2, "gp").changed is True
+
+    def test_fingerprint_stored_outside_default_cache(self, settings):
+        """Отпечатки живут в отдельном алиасе, кэш default не используется."""
+        settings.CACHES = {
+            alias: {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": alias,
+            }
+            for alias in ("default", "shared", "fingerprints")
+        }
+        api = self.make_api(lambda request: httpx.Response(200, json={"id": 1}))
+
+        payload = api.data_stage_if_changed(1, "gp")
+        api.commit_payload(payload)
+
+        assert caches["fingerprints"].get(payload.cache_key) == payload.validators
+        assert caches["default"].get(payload.cache_key) is None
+        caches["fingerprints"].clear()
+
+    @patch("g_cup_site.utils.StageModel.objects.get_or_create")
+    def test_stage_handler_skips_unchanged(self, mock_get_or_create):
+        """Обработчик этапа не трогает базу и сообщает о пропуске."""
+        handler = StageGGPHandeler(stage_id=1)
+        handler.api = MagicMock()
+        handler.api.data_stage_if_changed.return_value = ConditionalPayload(
+            {}, False, "key"
+        )
+
+        handler.handle()
+
+        mock_get_or_create.assert_not_called()
+        assert handler.get_data()["skipped"] == "unchanged"
+
+
+@pytest.fixture
+def city(db):
+    country = CountryModel.objects.create(title="Россия")
+    return CityModel.objects.create(title="Москва", country=country)
+
+
+@pytest.mark.django_db
+class TestAthleteRefreshEngine:
+    """Тесты обновления спортсменов порциями с параллельными запросами"""
+
+    def make_athletes(self, city, count: int) -> list[AthleteModel]:
+        return [
+            AthleteModel.objects.create(
+                id=i,
+                first_name=f"Имя{i}",
+                last_name=f"Фамилия{i}",
+                city=city,
+                sportsman_class="C1",
+            )
+            for i in range(1, count + 1)
+        ]
+
+    @staticmethod
+    def profile(athlete_id: int, sportsman_class: str = "C1") -> dict:
+        return {
+            "id": athlete_id,
+            "firstName": f"Имя{athlete_id}",
+            "lastName": f"Фамилия{athlete_id}",
+            "class": sportsman_class,
+            "imgUrl": None,
+            "number": None,
+        }
+
+    @patch.object(AsyncAPIGetter, "get_athlete_data", new_callable=AsyncMock)
+    def test_only_changed_rows_are_updated(self, mock_get, city):
+        """В базу пишутся только изменившиеся спортсмены."""
+        self.make_athletes(city, 5)
+        mock_get.side_effect = lambda athlete_id: self.profile(
+            athlete_id, "B" if athlete_id == 3 else "C1"
+        )
+
+        report = AthleteRefreshEngine(chunk_size=2, concurrency=2).run()
+
+        assert report.total == 5
+        assert report.changed == 1
+        assert report.class_changed == 1
+        assert AthleteModel.objects.get(id=3).sportsman_class == "B"
+        assert mock_get.call_count == 5
+
+    @patch.object(AsyncAPIGetter, "get_athlete_data", new_callable=AsyncMock)
+    def test_failed_profiles_are_reported_and_kept(self, mock_get, city):
+        """Если API не ответил, спортсмен не затирается, а попадает в ошибки."""
+        self.make_athletes(city, 3)
+        mock_get.side_effect = lambda athlete_id: (
+            {} if athlete_id == 2 else self.profile(athlete_id)
+        )
+
+        report = AthleteRefreshEngine(chunk_size=10, concurrency=3).run()
+
+        assert report.failed == [2]
+        assert AthleteModel.objects.get(id=2).first_name == "Имя2"
+
+    @patch.object(AsyncAPIGetter, "get_athlete_data", new_callable=AsyncMock)
+    def test_concurrency_is_bounded(self, mock_get, city):
+        """Одновременно выполняется не больше concurrency запросов."""
+        self.make_athletes(city, 6)
+        in_flight = 0
+        max_in_flight = 0
+
+        async def fake_get(athlete_id):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return self.profile(athlete_id)
+
+        mock_get.side_effect = fake_get
+
+        AthleteRefreshEngine(chunk_size=6, concurrency=2).run()
+
+        assert max_in_flight == 2
+
+
+def make_stage_payload(stage_id: int, count: int, base_time: int = 60000) -> dict:
+    """Payload /stages/get с count результатами."""
+    return {
+        "id": stage_id,
+        "results": [
+            {
+                "userId": i,
+                "userFirstName": f"Имя{i}",
+                "userLastName": f"Фамилия{i}",
+                "userCity": "Москва",
+                "userCountry": "Россия",
+                "athleteClass": "C1",
+                "motorcycle": f"Moto{i % 5}",
+                "date": 1700000000,
+                "place": i,
+                "fine": 0,
+                "percent": 100 if i == 1 else 110,
+                "resultTimeSeconds": base_time + i,
+                "resultTime": f"01:00.{i:03}",
+                "video": None,
+            }
+            for i in range(1, count + 1)
+        ],
+    }
+
+
+@pytest.fixture
+def stage(db):
+    championship = ChampionshipModel.objects.create(
+        champ_id=1, title="Чемпионат", year=2025, description=""
+    )
+    return StageModel.objects.create(
+        stage_id=100, championship=championship, title="Этап", stage_class="A"
+    )
+
+
+@pytest.fixture
+def athletes(city):
+    return AthleteModel.objects.bulk_create(
+        AthleteModel(
+            id=i,
+            first_name=f"Имя{i}",
+            last_name=f"Фамилия{i}",
+            city=city,
+            sportsman_class="C1",
+        )
+        for i in range(1, 501)
+    )
+
+
+def run_stage_handler(payload: dict) -> StageGGPHandeler:
+    handler = StageGGPHandeler(stage_id=payload["id"])
+    handler.api = MagicMock()
+    handler.api.data_stage_if_changed.return_value = ConditionalPayload(
+        payload, True, "key"
+    )
+    handler.handle()
+    return handler
+
+
+@pytest.mark.django_db
+@patch.object(StageGGPHandeler, "_queue_class_notification")
+class TestStageResultDiff:
+    """Тесты сравнения результатов этапа с базой набором запросов"""
+
+    def test_new_results_created_and_notified(self, mock_notify, stage, athletes):
+        handler = run_stage_handler(make_stage_payload(100, 3))
+
+        assert handler.get_data() == {
+            "new_result": 3,
+            "improved_result": 0,
+            "no_change": 0,
+        }
+        assert StageResultModel.objects.filter(stage=stage).count() == 3
+        assert mock_notify.call_count == 3
+
+    def test_improved_and_unchanged_results(self, mock_notify, stage, athletes):
+        run_stage_handler(make_stage_payload(100, 3))
+        mock_notify.reset_mock()
+
+        payload = make_stage_payload(100, 3)
+        payload["results"][0]["resultTimeSeconds"] -= 1000
+        payload["results"][0]["resultTime"] = "00:59.001"
+        handler = run_stage_handler(payload)
+
+        assert handler.get_data() == {
+            "new_result": 0,
+            "improved_result": 1,
+            "no_change": 2,
+        }
+        improved = StageResultModel.objects.get(stage=stage, user_id=1)
+        assert improved.result_time == "00:59.001"
+        mock_notify.assert_called_once()
+        assert "Старое время: 01:00.001" in mock_notify.call_args.args[1]
+
+    def test_worse_time_is_not_saved(self, mock_notify, stage, athletes):
+        run_stage_handler(make_stage_payload(100, 1))
+
+        handler = run_stage_handler(make_stage_payload(100, 1, base_time=70000))
+
+        assert handler.get_data()["no_change"] == 1
+        assert StageResultModel.objects.get(user_id=1).result_time_seconds == 60001
+
+    @pytest.mark.slow
+    def test_benchmark_query_count_500_results(self, mock_notify, stage, athletes):
+        """Бенчмарк: число запросов к БД на этап из 500 результатов."""
+        payload = make_stage_payload(100, 500)
+
+        with CaptureQueriesContext(connection) as first_import:
+            run_stage_handler(payload)
+
+        payload = make_stage_payload(100, 500, base_time=50000)
+        with CaptureQueriesContext(connection) as improved_import:
+            run_stage_handler(payload)
+
+        assert StageResultModel.objects.filter(stage=stage).count() == 500
+        # на SQLite bulk_create дробится на пачки по лимиту параметров
+        assert len(first_import) <= 30, (
+            f"Первый импорт 500 результатов: {len(first_import)} запросов"
+        )
+        assert len(improved_import) <= 10, (
+            f"Все 500 результатов улучшены: {len(improved_import)} запросов"
+        )
+
+
+@pytest.mark.django_db
+class TestDimensionResolver:
+    """Тесты пакетного разрешения справочников"""
+
+    def test_creates_missing_and_reuses_existing(self):
+        existing = MotorcycleModel.objects.create(title="Moto1")
+        resolver = DimensionResolver(maxsize=100)
+
+        motorcycles = resolver.motorcycles(["Moto1", "Moto2", "Moto2"])
+
+        assert motorcycles["Moto1"].pk == existing.pk
+        assert motorcycles["Moto2"].pk is not None
+        assert MotorcycleModel.objects.count() == 2
+
+    def test_cities_are_scoped_by_country(self):
+        resolver = DimensionResolver(maxsize=100)
+
+        cities = resolver.cities([("Минск", "Беларусь"), ("Москва", "Россия")])
+
+        assert cities[("Минск", "Беларусь")].country.title == "Беларусь"
+        assert cities[("Москва", "Россия")].country.title == "Россия"
+        assert CityModel.objects.count() == 2
+        assert CountryModel.objects.count() == 2
+
+    def test_second_resolution_hits_cache(self):
+        resolver = DimensionResolver(maxsize=100)
+        pairs = [(f"Город{i}", "Россия") for i in range(50)]
+        resolver.cities(pairs)
+
+        with CaptureQueriesContext(connection) as queries:
+            cities = resolver.cities(pairs)
+
+        assert len(cities) == 50
+        assert len(queries) == 0
+
+    def test_lru_evicts_oldest(self):
+        resolver = DimensionResolver(maxsize=2)
+        resolver.motorcycles(["A"])
+        resolver.motorcycles(["B"])
+        resolver.motorcycles(["C"])
+
+        with CaptureQueriesContext(connection) as queries:
+            resolver.motorcycles(["C"])
+        assert len(queries) == 0
+
+        with CaptureQueriesContext(connection) as queries:
+            resolver.motorcycles(["A"])
+        assert len(queries) == 1
+
+    def test_delete_clears_shared_cache(self):
+        motorcycle = dimension_resolver.motorcycles(["Moto1"])["Moto1"]
+
+        motorcycle.delete()
+
+        assert len(dimension_resolver.cache) == 0
+
+    def test_rename_seen_by_other_process(self, locmem_cache):
+        """Переименование сбрасывает LRU и в других процессах."""
+        other_process = DimensionResolver(maxsize=100, check_interval=0)
+        motorcycle = other_process.motorcycles(["Moto1"])["Moto1"]
+
+        motorcycle.title = "Moto2"
+        motorcycle.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            renamed = other_process.motorcycles(["Moto1"])["Moto1"]
+        assert len(queries) > 0
+        assert renamed.pk != motorcycle.pk
+
+    def test_cache_unavailable(self):
+        """Без общего кэша LRU сбрасывается по интервалу проверки."""
+        resolver = DimensionResolver(maxsize=100, check_interval=0)
+        error = RedisConnectionError("refused")
+
+        with (
+            patch("g_cup_site.dimensions.shared_cache.get", side_effect=error),
+            patch("g_cup_site.dimensions.shared_cache.set", side_effect=error),
+        ):
+            motorcycle = resolver.motorcycles(["Moto1"])["Moto1"]
+            resolver.invalidate()
+            assert resolver.motorcycles(["Moto1"])["Moto1"].pk == motorcycle.pk
+
+    def test_lru_survives_check_interval(self, locmem_cache):
+        """Без изменений справочника LRU не сбрасывается при сверке версии."""
+        resolver = DimensionResolver(maxsize=100, check_interval=0)
+        resolver.motorcycles(["Moto1"])
+
+        with CaptureQueriesContext(connection) as queries:
+            resolver.motorcycles(["Moto1"])
+        assert len(queries) == 0
+
+    def test_concurrent_creation_reuses_row(self):
+        """Название, созданное параллельным импортом, не создаётся повторно."""
+        resolver = DimensionResolver(maxsize=100)
+        bulk_create = MotorcycleModel.objects.bulk_create
+
+        def racing_bulk_create(objs, **kwargs):
+            # другой воркер успел создать запись между чтением и вставкой
+            MotorcycleModel.objects.create(title="Moto1")
+            return bulk_create(objs, **kwargs)
+
+        with patch.object(
+            MotorcycleModel.objects, "bulk_create", side_effect=racing_bulk_create
+        ):
+            motorcycles = resolver.motorcycles(["Moto1"])
+
+        assert MotorcycleModel.objects.get().pk == motorcycles["Moto1"].pk
+
+
+@pytest.fixture
+def without_unique_constraints(transactional_db):
+    """Таблицы без уникальных ограничений, как до миграции."""
+    constraints = [
+        (model, constraint)
+        for model in (
+            CountryModel,
+            CityModel,
+            MotorcycleModel,
+            StageResultModel,
+            BaseFigureSportsmanResultModel,
+        )
+        for constraint in model._meta.constraints
+    ]
+    with connection.schema_editor() as editor:
+        for model, constraint in constraints:
+            # SQLite пересобирает таблицу по _meta, ограничение убирается и оттуда
+            model._meta.constraints.remove(constraint)
+            editor.remove_constraint(model, constraint)
+    yield
+    with connection.schema_editor() as editor:
+        for model, constraint in constraints:
+            model._meta.constraints.append(constraint)
+            editor.add_constraint(model, constraint)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestDeduplicate:
+    """Тесты слияния дублей перед уникальными ограничениями"""
+
+    def test_merges_dimensions_and_moves_references(self, without_unique_constraints):
+        russia, russia_duplicate = CountryModel.objects.bulk_create(
+            [CountryModel(title="Россия"), CountryModel(title="Россия")]
+        )
+        moscow, moscow_duplicate = CityModel.objects.bulk_create(
+            [
+                CityModel(title="Москва", country=russia),
+                CityModel(title="Москва", country=russia_duplicate),
+            ]
+        )
+        AthleteModel.objects.bulk_create(
+            [
+                AthleteModel(id=1, first_name="А", last_name="А", city=moscow),
+                AthleteModel(
+                    id=2, first_name="Б", last_name="Б", city=moscow_duplicate
+                ),
+            ]
+        )
+
+        call_command("deduplicate", stdout=StringIO())
+
+        assert list(CountryModel.objects.values_list("pk", flat=True)) == [russia.pk]
+        assert list(CityModel.objects.values_list("pk", flat=True)) == [moscow.pk]
+        assert set(AthleteModel.objects.values_list("city_id", flat=True)) == {
+            moscow.pk
+        }
+
+    def test_keeps_best_result(self, without_unique_constraints):
+        city = CityModel.objects.create(
+            title="Москва", country=CountryModel.objects.create(title="Россия")
+        )
+        athlete = AthleteModel.objects.create(
+            id=1, first_name="А", last_name="А", city=city
+        )
+        stage = StageModel.objects.create(
+            stage_id=1,
+            championship=ChampionshipModel.objects.create(
+                champ_id=1, title="Чемпионат", year=2025, description=""
+            ),
+            title="Этап",
+            stage_class="A",
+            status="accepting",
+        )
+        motorcycle = MotorcycleModel.objects.create(title="Moto")
+        StageResultModel.objects.bulk_create(
+            [
+                StageResultModel(
+                    stage=stage,
+                    user=athlete,
+                    motorcycle=motorcycle,
+                    date=timezone.now(),
+                    fine=0,
+                    result_time_seconds=time_ms,
+                    result_time=str(time_ms),
+                )
+                for time_ms in (62000, 60000, 61000)
+            ]
+        )
+
+        call_command("deduplicate", stdout=StringIO())
+
+        assert list(
+            StageResultModel.objects.values_list("result_time_seconds", flat=True)
+        ) == [60000]
+
+    def test_migrations_merge_before_constraints(self):
+        """migrate сливает дубли сам, отдельный шаг перед ним не нужен."""
+        before = [("g_cup_site", "0004_basefiguremodel_is_tracked")]
+        executor = MigrationExecutor(connection)
+        executor.migrate(before)
+        old_apps = executor.loader.project_state(before).apps
+        country_model = old_apps.get_model("g_cup_site", "CountryModel")
+        country_model.objects.bulk_create(
+            [country_model(title="Россия"), country_model(title="Россия")]
+        )
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+        assert CountryModel.objects.count() == 1
+
+    def test_nothing_to_merge(self):
+        MotorcycleModel.objects.create(title="Moto1")
+        out = StringIO()
+
+        call_command("deduplicate", stdout=out)
+
+        assert "Удалено дублей: 0" in out.getvalue()
+        assert MotorcycleModel.objects.count() == 1
+
+
+def athlete_profile(athlete_id: int) -> dict:
+    return {
+        "id": athlete_id,
+        "firstName": f"Профиль{athlete_id}",
+        "lastName": "Спортсмен",
+        "class": "B",
+    }
+
+
+@pytest.mark.django_db
+@patch.object(StageGGPHandeler, "_queue_class_notification")
+@patch.object(AsyncAPIGetter, "get_athlete_data", new_callable=AsyncMock)
+class TestUnknownAthletesPrefetch:
+    """Тесты предварительной загрузки новых спортсменов"""
+
+    def test_unknown_athletes_created_in_bulk(self, mock_get, mock_notify, stage):
+        mock_get.side_effect = athlete_profile
+
+        with CaptureQueriesContext(connection) as queries:
+            handler = run_stage_handler(make_stage_payload(100, 50))
+
+        assert handler.get_data()["new_result"] == 50
+        assert mock_get.await_count == 50
+        assert AthleteModel.objects.filter(sportsman_class="B").count() == 50
+        assert AthleteModel.objects.get(id=7).first_name == "Профиль7"
+        # ни одного INSERT спортсмена по одному
+        athlete_inserts = [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith("INSERT")
+            and '"g_cup_site_athletemodel"' in query["sql"]
+        ]
+        assert len(athlete_inserts) == 1
+
+    def test_payload_data_used_when_api_fails(self, mock_get, mock_notify, stage):
+        mock_get.return_value = {}
+
+        run_stage_handler(make_stage_payload(100, 2))
+
+        athlete = AthleteModel.objects.get(id=2)
+        assert athlete.first_name == "Имя2"
+        assert athlete.sportsman_class == "C1"
+
+    def test_profiles_cached_between_imports(self, mock_get, mock_notify, stage):
+        mock_get.side_effect = athlete_profile
+
+        prefetch_athlete_profiles([1, 2, 3])
+        profiles = prefetch_athlete_profiles([1, 2, 3, 4])
+
+        assert set(profiles) == {1, 2, 3, 4}
+        assert mock_get.await_count == 4
+
+
+@pytest.mark.django_db
+class TestResultUpsert:
+    """Тесты upsert лучшего результата"""
+
+    def make_result(self, stage, athlete, time_ms: int) -> StageResultModel:
+        motorcycle, _ = MotorcycleModel.objects.get_or_create(title="Moto")
+        return StageResultModel(
+            stage=stage,
+            user=athlete,
+            motorcycle=motorcycle,
+            date=timezone.now(),
+            fine=0,
+            result_time_seconds=time_ms,
+            result_time=str(time_ms),
+        )
+
+    def upsert(self, results: list) -> set[int]:
+        return StageResultModel.objects.upsert_best(
+            results, unique_fields=["stage", "user"]
+        )
+
+    def test_insert_returns_user_ids(self, stage, athletes):
+        affected = self.upsert([self.make_result(stage, a, 60000) for a in athletes])
+
+        assert affected == {athlete.id for athlete in athletes}
+        assert StageResultModel.objects.count() == 500
+
+    def test_updates_only_better_time(self, stage, athletes):
+        first, second = athletes[:2]
+        self.upsert([self.make_result(stage, first, 60000)])
+        self.upsert([self.make_result(stage, second, 60000)])
+
+        affected = self.upsert(
+            [
+                self.make_result(stage, first, 70000),
+                self.make_result(stage, second, 50000),
+            ]
+        )
+
+        assert affected == {second.id}
+        assert StageResultModel.objects.get(user=first).result_time_seconds == 60000
+        assert StageResultModel.objects.get(user=second).result_time_seconds == 50000
+        assert StageResultModel.objects.count() == 2
+
+    def test_duplicate_result_rejected(self, stage, athletes):
+        self.make_result(stage, athletes[0], 60000).save()
+
+        with pytest.raises(IntegrityError):
+            self.make_result(stage, athletes[0], 50000).save()
+
+    @patch.object(StageGGPHandeler, "_queue_class_notification")
+    def test_parallel_improvement_is_not_overwritten(
+        self, mock_notify, stage, athletes
+    ):
+        run_stage_handler(make_stage_payload(100, 1))
+        mock_notify.reset_mock()
+        original_diff = StageGGPHandeler._diff_results
+
+        def diff_then_parallel_write(handler, rows, athletes):
+            diff = original_diff(handler, rows, athletes)
+            # другой воркер успел записать ещё лучшее время
+            StageResultModel.objects.filter(user_id=1).update(result_time_seconds=1)
+            return diff
+
+        with patch.object(StageGGPHandeler, "_diff_results", diff_then_parallel_write):
+            handler = run_stage_handler(make_stage_payload(100, 1, base_time=50000))
+
+        assert handler.get_data()["improved_result"] == 0
+        assert handler.get_data()["no_change"] == 1
+        assert StageResultModel.objects.get(user_id=1).result_time_seconds == 1
+        mock_notify.assert_not_called()
+
+
+class FakeRefreshHandler:
+    """Обработчик-заглушка, запоминает обновлённые сущности"""
+
+    calls: list[int] = []
+
+    def __init__(self, entity_id: int):
+        self.entity_id = entity_id
+
+    def handle(self) -> None:
+        if self.entity_id == 666:
+            raise RuntimeError("API недоступен")
+        self.calls.append(self.entity_id)
+
+    def get_data(self) -> dict:
+        return {"new_result": 1, "improved_result": 2, "no_change": 3}
+
+
+@pytest.mark.django_db
+class TestRefreshActiveEntities:
+    """Тесты параллельного обновления активных этапов и фигур"""
+
+    @pytest.fixture(autouse=True)
+    def fake_handlers(self):
+        FakeRefreshHandler.calls = []
+        with patch.dict(
+            REFRESH_HANDLERS,
+            {"stage": FakeRefreshHandler, "base_figure": FakeRefreshHandler},
+        ):
+            yield
+
+    def test_only_active_stages_and_tracked_figures(self, stage):
+        stage.status = "accepting"
+        stage.save()
+        for stage_id, status in ((101, "judging"), (102, "completed")):
+            StageModel.objects.create(
+                stage_id=stage_id,
+                championship=stage.championship,
+                title="Этап",
+                stage_class="A",
+                status=status,
+            )
+        for figure_id, is_tracked in ((1, True), (2, False)):
+            BaseFigureModel.objects.create(
+                id=figure_id,
+                title="Фигура",
+                description="",
+                track="https://example.com",
+                with_in_class=False,
+                is_tracked=is_tracked,
+            )
+
+        refresh_active_entities()
+
+        assert sorted(FakeRefreshHandler.calls) == [1, 100, 101]
+
+    def test_stage_handed_over_to_scheduler(self, stage):
+        stage.status = "accepting"
+        stage.save()
+
+        with patch.object(stage_scheduler, "record_changes") as record_changes:
+            refresh_active_entities()
+            refresh_active_entities()
+
+        # второй запуск пропускает этап: его опрашивает stage_update:100
+        assert FakeRefreshHandler.calls == [100]
+        record_changes.assert_called_once_with(
+            100, {"new_result": 1, "improved_result": 2, "no_change": 3}
+        )
+        assert PeriodicTask.objects.get(name="stage_update:100").enabled
+
+    def test_summary_aggregates_changes_and_failures(self):
+        results = [
+            {"kind": "stage", "id": 1, "changes": {"new_result": 1}, "elapsed": 0.1},
+            {
+                "kind": "stage",
+                "id": 2,
+                "changes": {"no_change": 4, "skipped": "unchanged"},
+                "elapsed": 0.5,
+            },
+            {"kind": "stage", "id": 3, "changes": {"error": "boom"}, "elapsed": 1.0},
+        ]
+
+        summary = aggregate_refresh(results, started_at=0)
+
+        assert summary["entities"] == 3
+        assert summary["new_result"] == 1
+        assert summary["no_change"] == 4
+        assert summary["skipped"] == 1
+        assert summary["failed"] == ["stage|3"]
+
+    def test_no_free_slot_reported_as_failure(self):
+        with (
+            patch.object(refresh_slots, "acquire", return_value=None),
+            patch.object(refresh_entity, "max_retries", 2),
+        ):
+            with pytest.raises(Retry):
+                refresh_entity.apply(("stage", 100), retries=1)
+            # последняя попытка не откладывается, а возвращает ошибку
+            result = refresh_entity.apply(("stage", 100), retries=2).get()
+
+        assert result["changes"] == {"error": "нет свободного слота"}
+        assert aggregate_refresh([result], started_at=0)["failed"] == ["stage|100"]
+
+    def test_failed_entity_does_not_break_others(self, stage):
+        stage.status = "accepting"
+        stage.save()
+        StageModel.objects.create(
+            stage_id=666,
+            championship=stage.championship,
+            title="Этап",
+            stage_class="A",
+            status="accepting",
+        )
+
+        refresh_active_entities()
+
+        assert FakeRefreshHandler.calls == [100]
+
+
+@pytest.mark.django_db
+class TestConcurrencySlots:
+    """Тесты ограничения числа одновременных задач"""
+
+    def test_limit_and_release(self):
+        slots = ConcurrencySlots("test", limit=2, ttl=60)
+
+        first = slots.acquire("a")
+        second = slots.acquire("b")
+
+        assert slots.acquire("c") is None
+        slots.release(first, "a")
+        assert slots.acquire("c") == first
+        assert second is not None
+
+    def test_foreign_slot_not_released(self):
+        slots = ConcurrencySlots("test", limit=1, ttl=60)
+        slot = slots.acquire("a")
+
+        slots.release(slot, "b")
+
+        assert slots.acquire("c") is None
+
+
+@pytest.mark.django_db
+class TestStagePollScheduler:
+    """Тесты адаптивного опроса этапов"""
+
+    @pytest.fixture
+    def scheduler(self, settings):
+        settings.GYMKHANA_POLL_FAST = 60
+        settings.GYMKHANA_POLL_NORMAL = 600
+        settings.GYMKHANA_POLL_SLOW = 3600
+        settings.GYMKHANA_POLL_WINDOW = 3600
+        settings.GYMKHANA_POLL_BURST_CHANGES = 5
+        return StagePollScheduler()
+
+    def test_interval_by_status_and_dates(self, scheduler, stage):
+        now = timezone.now()
+
+        stage.status = "upcoming"
+        stage.date_start = now + timedelta(days=3)
+        assert scheduler.interval_for(stage, now) == 3600
+        stage.date_start = now + timedelta(minutes=30)
+        assert scheduler.interval_for(stage, now) == 600
+
+        stage.status = "accepting"
+        stage.date_end = now + timedelta(days=3)
+        assert scheduler.interval_for(stage, now) == 600
+        stage.date_end = now + timedelta(minutes=30)
+        assert scheduler.interval_for(stage, now) == 60
+
+        stage.status = "completed"
+        assert scheduler.interval_for(stage, now) is None
+
+    def test_change_burst_speeds_up_polling(self, scheduler, stage, locmem_cache):
+        stage.status = "accepting"
+
+        scheduler.record_changes(stage.stage_id, {"new_result": 2})
+        assert scheduler.interval_for(stage) == 600
+
+        scheduler.record_changes(
+            stage.stage_id, {"new_result": 1, "improved_result": 2}
+        )
+        assert scheduler.interval_for(stage) == 60
+
+    def test_sync_registers_updates_and_disables_task(self, scheduler, stage):
+        stage.status = "upcoming"
+        scheduler.sync_stage(stage)
+        task = PeriodicTask.objects.get(name="stage_update:100")
+        assert task.interval.every == 3600
+        assert task.args == "[100]"
+
+        stage.status = "accepting"
+        scheduler.sync_stage(stage)
+        task.refresh_from_db()
+        assert task.interval.every == 600
+        assert task.enabled
+
+        stage.status = "completed"
+        stage.save()
+        scheduler.sync_all()
+        task.refresh_from_db()
+        assert not task.enabled
+
+
+@pytest.mark.django_db
+@patch.object(StageGGPHandeler, "_queue_class_notification")
+class TestImportLock:
+    """Тесты блокировки параллельного импорта одного этапа"""
+
+    def test_busy_stage_is_skipped_with_contention(self, mock_notify, stage, athletes):
+        lock = LeaseLock("import:stage:100", ttl=60)
+        assert lock.acquire()
+
+        handler = run_stage_handler(make_stage_payload(100, 3))
+
+        assert handler.get_data()["skipped"] == "locked"
+        assert handler.get_data()["contention"] == 1
+        handler.api.data_stage_if_changed.assert_not_called()
+        assert not StageResultModel.objects.exists()
+
+    @pytest.mark.parametrize(
+        "policy, follow_up", [("follow_up", True), ("skip", False)]
+    )
+    def test_contention_during_import_requests_follow_up(
+        self, mock_notify, policy, follow_up, settings, stage, athletes
+    ):
+        settings.GYMKHANA_IMPORT_LOCK_POLICY = policy
+        parallel = {}
+
+        def fetch_while_parallel_run(*args):
+            parallel["handler"] = run_stage_handler(make_stage_payload(100, 3))
+            return ConditionalPayload(make_stage_payload(100, 3), True, "key")
+
+        handler = StageGGPHandeler(stage_id=100)
+        handler.api = MagicMock()
+        handler.api.data_stage_if_changed.side_effect = fetch_while_parallel_run
+        handler.handle()
+
+        assert parallel["handler"].get_data()["skipped"] == "locked"
+        assert handler.get_data()["new_result"] == 3
+        assert handler.get_data().get("follow_up", False) is follow_up
+        # после импорта блокировка свободна
+        assert LeaseLock("import:stage:100", ttl=60).acquire()
+
+    def test_lock_released_only_by_owner(self, mock_notify):
+        owner = LeaseLock("import:stage:1", ttl=60)
+        other = LeaseLock("import:stage:1", ttl=60)
+        assert owner.acquire()
+
+        other.release()
+
+        assert not other.acquire()
+
+    def test_lease_renewed_while_import_runs(self, mock_notify):
+        lock = LeaseLock("import:stage:1", ttl=0.03)
+        assert lock.acquire()
+
+        with patch.object(lock, "extend", wraps=lock.extend) as extend:
+            with lock.kept_alive():
+                time.sleep(0.05)
+
+        assert extend.call_count >= 1
+        assert all(call == ((), {}) for call in extend.call_args_list)
+        assert not LeaseLock("import:stage:1", ttl=60).acquire()
+
+    def test_lost_lease_not_extended(self, mock_notify, lock_redis):
+        lock = LeaseLock("import:stage:1", ttl=60)
+        assert lock.acquire()
+        # аренда истекла и блокировку взял другой воркер
+        lock_redis.delete(lock.key)
+        assert LeaseLock("import:stage:1", ttl=60).acquire()
+
+        assert not lock.extend()
+        lock.release()
+        assert not LeaseLock("import:stage:1", ttl=60).acquire()
+
+
+@pytest.mark.django_db
+class TestNotificationOutbox:
+    """Тесты записи уведомлений в outbox вместе с результатами"""
+
+    def test_notifications_written_with_results(
+        self, stage, athletes, django_capture_on_commit_callbacks
+    ):
+        payload = make_stage_payload(100, 3)
+        payload["results"][0]["percent"] = 100
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            run_stage_handler(payload)
+
+        events = NotificationOutbox.objects.pending().order_by("id")
+        assert events.count() == 3
+        assert events[0].competition_type == "ggp"
+        assert events[0].icon == "🆕"
+        assert events[0].leader
+        assert not events[1].leader
+        assert events[0].event_key == f"stage:{stage.pk}:1:60001"
+        # рассылка запускается одной задачей после коммита
+        assert len(callbacks) == 1
+
+    def test_failed_import_leaves_no_notifications(
+        self, stage, athletes, django_capture_on_commit_callbacks
+    ):
+        with (
+            patch.object(
+                NotificationOutbox.objects,
+                "bulk_create",
+                side_effect=DatabaseError("outbox"),
+            ),
+            django_capture_on_commit_callbacks() as callbacks,
+        ):
+            run_stage_handler(make_stage_payload(100, 3))
+
+        assert not StageResultModel.objects.exists()
+        assert not NotificationOutbox.objects.exists()
+        assert callbacks == []
@@ -1,27 +1,39 @@
+import asyncio
+import hashlib
+import importlib.util
 import logging
 import os
+import threading
 import time
 from abc import abstractmethod
+from collections import deque
+from collections.abc import Iterable
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import EnumType
-from typing import Dict, List
+from typing import Dict, List, Self
 
 import httpx
+from asgiref.sync import async_to_sync, sync_to_async
+from core.caches import FINGERPRINT_CACHE_ALIAS
+from django.conf import settings
+from django.core.cache import caches
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.utils import timezone
 from dotenv import load_dotenv
+from g_cup_site.dimensions import dimension_resolver
+from g_cup_site.locks import LeaseLock
 from g_cup_site.models import (
     AthleteModel,
     BaseFigureModel,
     BaseFigureSportsmanResultModel,
-    CityModel,
-    CountryModel,
     MotorcycleModel,
     StageModel,
     StageResultModel,
 )
-from gymkhanagp.models import SportsmanClassModel, Subscription
-from gymkhanagp.tasks import send_telegram_message_task
+from gymkhanagp.models import NotificationOutbox, Subscription
+from gymkhanagp.tasks import dispatch_notification_outbox, send_telegram_message_task
 from users.utils import AdminNotifier, get_telegram_id
 
 load_dotenv()
@@ -34,39 +46,127 @@ class TypeChampionship(EnumType):
     BASE = "base"
 
 
-class APIGetter:
+@dataclass(frozen=True)
+class RequestTiming:
+    """Замер одного запроса к API gymkhana-cup"""
+
+    endpoint: str
+    status_code: int | None
+    elapsed: float
+    new_connection: bool
+
+
+@dataclass
+class ConditionalPayload:
+    """Ответ условного запроса.
+
+    changed=False означает, что данные не менялись с последней успешной
+    обработки (304 от API или совпал хэш содержимого). После обработки
+    payload фиксируется через `APIGetter.commit_payload`.
+    """
+
+    data: dict
+    changed: bool
+    cache_key: str
+    validators: dict = field(default_factory=dict)
+
+
+@dataclass
+class ResultRow:
+    """Один результат из payload API"""
+
+    athlete_data: dict
+    result_data: dict
+    new_time: int
+
+
+@dataclass
+class ResultDiff:
+    """Результаты payload, разложенные относительно уже сохранённых в базе"""
+
+    # (row, athlete, result)
+    new: list[tuple] = field(default_factory=list)
+    # (row, athlete, result, old_time, time_diff)
+    improved: list[tuple] = field(default_factory=list)
+    unchanged: list[AthleteModel] = field(default_factory=list)
+
+
+def _http2_available() -> bool:
+    """HTTP/2 в httpx работает только при установленном пакете h2"""
+    return importlib.util.find_spec("h2") is not None
+
+
+class BaseAPIGetter:
+    """Общая часть синхронного и асинхронного клиентов API gymkhana-cup.
+
+    Наследники реализуют только `_make_request`, методы эндпоинтов общие.
+    """
+
+    REQUEST_TIMEOUT = 30.0  # секунды
+    TIMINGS_HISTORY = 200
+
     def __init__(self):
         self.url = os.environ.get("GYMKHANA_CUP_URL")
         self.api_key = os.environ.get("GYMKHANA_CUP_TOKEN")
+        self.timings: deque[RequestTiming] = deque(maxlen=self.TIMINGS_HISTORY)
+
+    @classmethod
+    def _client_options(cls) -> dict:
+        """Настройки пула соединений для httpx клиента"""
+        return {
+            "limits": httpx.Limits(
+                max_connections=settings.GYMKHANA_CUP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GYMKHANA_CUP_MAX_KEEPALIVE,
+                keepalive_expiry=settings.GYMKHANA_CUP_KEEPALIVE_EXPIRY,
+            ),
+            "http2": settings.GYMKHANA_CUP_HTTP2 and _http2_available(),
+            "timeout": cls.REQUEST_TIMEOUT,
+        }
 
-    REQUEST_TIMEOUT = 30.0  # секунды
-
-    def _make_request(self, url_endpoint: str, params: dict) -> dict:
-        """Запрос данных с уведомлением и логированием ошибок"""
-        if self.url is None:
-            logger.error("Отсутствует адрес GYMKHANA_CUP_URL в os.environ")
-            return {}
+    def _make_request(self, url_endpoint: str, params: dict):
+        raise NotImplementedError
 
+    def _prepare_request(self, url_endpoint: str, params: dict) -> tuple[str, dict]:
         url: str = self.url + url_endpoint
         full_params = {"signature": self.api_key, **params}
-
         logger.info("Запрос к %s", url_endpoint)
-        start_time = time.monotonic()
+        return url, full_params
 
-        try:
-            response = httpx.get(url, params=full_params, timeout=self.REQUEST_TIMEOUT)
-        except Exception as e:
-            elapsed = time.monotonic() - start_time
-            logger.exception(
-                "Ошибка при запросе к %s (время: %.2f сек)",
-                url_endpoint,
-                elapsed,
-                exc_info=e,
-            )
-            return {}
+    def _record_timing(
+        self,
+        url_endpoint: str,
+        status_code: int | None,
+        elapsed: float,
+        connection_events: list[str],
+    ) -> None:
+        """Сохраняет замер запроса. Новое соединение определяем по trace событиям
+        httpcore: если TCP соединение не открывалось - запрос ушёл по keep-alive.
+        """
+        new_connection = any(
+            event.startswith("connection.connect_tcp") for event in connection_events
+        )
+        self.timings.append(
+            RequestTiming(url_endpoint, status_code, elapsed, new_connection)
+        )
 
-        elapsed = time.monotonic() - start_time
+    def timing_summary(self) -> dict:
+        """Сводка по замерам запросов: новые соединения против keep-alive"""
+        new = [t.elapsed for t in self.timings if t.new_connection]
+        reused = [t.elapsed for t in self.timings if not t.new_connection]
+        return {
+            "requests": len(self.timings),
+            "new_connections": len(new),
+            "reused_connections": len(reused),
+            "avg_new_connection": round(sum(new) / len(new), 3) if new else 0.0,
+            "avg_reused_connection": (
+                round(sum(reused) / len(reused), 3) if reused else 0.0
+            ),
+        }
 
+    def _handle_response(
+        self, url_endpoint: str, response: httpx.Response, elapsed: float
+    ) -> dict:
+        """Разбор ответа с уведомлением и логированием ошибок"""
         if response.status_code == 200:
             data = response.json()
             logger.debug("Response body: %s", data)
@@ -153,6 +253,317 @@ class APIGetter:
         return self._make_request("/users/get", {"id": athlete_id})
 
 
+class APIGetter(BaseAPIGetter):
+    """Синхронный клиент API.
+
+    По умолчанию все экземпляры процесса используют один httpx.Client с пулом
+    keep-alive соединений, поэтому TCP+TLS рукопожатие не повторяется на каждый запрос.
+    """
+
+    _shared_client: httpx.Client | None = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, client: httpx.Client | None = None):
+        super().__init__()
+        self._client = client
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = self.get_shared_client()
+        return self._client
+
+    @classmethod
+    def get_shared_client(cls) -> httpx.Client:
+        """Возвращает общий для процесса клиент, создавая его при необходимости"""
+        with cls._shared_lock:
+            if cls._shared_client is None or cls._shared_client.is_closed:
+                cls._shared_client = httpx.Client(**cls._client_options())
+            return cls._shared_client
+
+    @classmethod
+    def close_shared_client(cls) -> None:
+        """Закрывает общий клиент (завершение воркера / management команды)"""
+        with cls._shared_lock:
+            if cls._shared_client is not None:
+                cls._shared_client.close()
+            cls._shared_client = None
+
+    @classmethod
+    def reset_shared_client(cls) -> None:
+        """Забывает клиент, унаследованный от родителя после fork, не закрывая его сокеты"""
+        with cls._shared_lock:
+            cls._shared_client = None
+
+    def _send(
+        self, url_endpoint: str, params: dict, headers: dict | None = None
+    ) -> tuple[httpx.Response | None, float]:
+        """Выполняет запрос через пул соединений, возвращает ответ и время запроса"""
+        url, full_params = self._prepare_request(url_endpoint, params)
+        connection_events: list[str] = []
+        start_time = time.monotonic()
+
+        try:
+            response = self.client.get(
+                url,
+                params=full_params,
+                headers=headers,
+                timeout=self.REQUEST_TIMEOUT,
+                extensions={
+                    "trace": lambda event, info: connection_events.append(event)
+                },
+            )
+        except Exception as e:
+            elapsed = time.monotonic() - start_time
+            self._record_timing(url_endpoint, None, elapsed, connection_events)
+            logger.exception(
+                "Ошибка при запросе к %s (время: %.2f сек)",
+                url_endpoint,
+                elapsed,
+                exc_info=e,
+            )
+            return None, elapsed
+
+        elapsed = time.monotonic() - start_time
+        self._record_timing(
+            url_endpoint, response.status_code, elapsed, connection_events
+        )
+        return response, elapsed
+
+    def _make_request(self, url_endpoint: str, params: dict) -> dict:
+        """Запрос данных с уведомлением и логированием ошибок"""
+        if self.url is None:
+            logger.error("Отсутствует адрес GYMKHANA_CUP_URL в os.environ")
+            return {}
+
+        response, elapsed = self._send(url_endpoint, params)
+        if response is None:
+            return {}
+        return self._handle_response(url_endpoint, response, elapsed)
+
+    @staticmethod
+    def _payload_cache_key(url_endpoint: str, params: dict) -> str:
+        params_key = ":".join(f"{key}={value}" for key, value in sorted(params.items()))
+        return f"gcup:payload:{url_endpoint}:{params_key}"
+
+    def _make_conditional_request(
+        self, url_endpoint: str, params: dict
+    ) -> ConditionalPayload:
+        """Запрос с If-None-Match/If-Modified-Since и проверкой хэша содержимого.
+
+        Валидаторы последнего обработанного ответа хранятся в кэше по эндпоинту
+        и параметрам, т.е. отдельно для каждого этапа/фигуры.
+        """
+        cache_key = self._payload_cache_key(url_endpoint, params)
+        if self.url is None:
+            logger.error("Отсутствует адрес GYMKHANA_CUP_URL в os.environ")
+            return ConditionalPayload({}, True, cache_key)
+
+        previous: dict = caches[FINGERPRINT_CACHE_ALIAS].get(cache_key) or {}
+        headers = {}
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+
+        response, elapsed = self._send(url_endpoint, params, headers=headers or None)
+        if response is None:
+            return ConditionalPayload({}, True, cache_key)
+
+        if response.status_code == 304:
+            logger.info("Данные %s не изменились (304)", url_endpoint)
+            return ConditionalPayload({}, False, cache_key, previous)
+
+        data = self._handle_response(url_endpoint, response, elapsed)
+        if not data:
+            return ConditionalPayload(data, True, cache_key)
+
+        validators = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_hash": hashlib.sha256(response.content).hexdigest(),
+        }
+        changed = validators["content_hash"] != previous.get("content_hash")
+        if not changed:
+            logger.info("Данные %s не изменились (хэш совпал)", url_endpoint)
+        return ConditionalPayload(data, changed, cache_key, validators)
+
+    @staticmethod
+    def commit_payload(payload: ConditionalPayload) -> None:
+        """Запоминает валидаторы payload после его успешной обработки"""
+        if payload.validators:
+            caches[FINGERPRINT_CACHE_ALIAS].set(
+                payload.cache_key,
+                payload.validators,
+                timeout=settings.GYMKHANA_CUP_FINGERPRINT_TTL,
+            )
+
+    def data_stage_if_changed(
+        self, stage_id: int, stage_type: str
+    ) -> ConditionalPayload:
+        """Получает данные этапа, только если они изменились с прошлой обработки"""
+        return self._make_conditional_request(
+            "/stages/get", {"id": stage_id, "type": stage_type}
+        )
+
+    def get_figure_data_if_changed(self, figure_id: int) -> ConditionalPayload:
+        """Получает данные фигуры, только если они изменились с прошлой обработки"""
+        return self._make_conditional_request("/figures/get", {"id": figure_id})
+
+
+class AsyncAPIGetter(BaseAPIGetter):
+    """Асинхронный клиент API с теми же методами эндпоинтов, что и APIGetter.
+
+    httpx.AsyncClient привязан к event loop, поэтому клиент принадлежит экземпляру:
+    используйте `async with AsyncAPIGetter() as api:`.
+    """
+
+    def __init__(self, client: httpx.AsyncClient | None = None):
+        super().__init__()
+        self._client = client
+        self._owns_client = client is None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(**self._client_options())
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def _make_request(self, url_endpoint: str, params: dict) -> dict:
+        """Запрос данных с уведомлением и логированием ошибок"""
+        if self.url is None:
+            logger.error("Отсутствует адрес GYMKHANA_CUP_URL в os.environ")
+            return {}
+
+        url, full_params = self._prepare_request(url_endpoint, params)
+        connection_events: list[str] = []
+
+        async def trace(event: str, info: dict) -> None:
+            connection_events.append(event)
+
+        start_time = time.monotonic()
+        try:
+            response = await self.client.get(
+                url,
+                params=full_params,
+                timeout=self.REQUEST_TIMEOUT,
+                extensions={"trace": trace},
+            )
+        except Exception as e:
+            elapsed = time.monotonic() - start_time
+            self._record_timing(url_endpoint, None, elapsed, connection_events)
+            logger.exception(
+                "Ошибка при запросе к %s (время: %.2f сек)",
+                url_endpoint,
+                elapsed,
+                exc_info=e,
+            )
+            return {}
+
+        elapsed = time.monotonic() - start_time
+        self._record_timing(
+            url_endpoint, response.status_code, elapsed, connection_events
+        )
+        if response.status_code == 200:
+            return self._handle_response(url_endpoint, response, elapsed)
+        # Уведомление администратора ходит в БД синхронно
+        return await sync_to_async(self._handle_response)(
+            url_endpoint, response, elapsed
+        )
+
+
+async def fetch_athlete_profiles(
+    api: AsyncAPIGetter, athlete_ids: Iterable[int], concurrency: int
+) -> dict[int, dict]:
+    """Параллельно запрашивает профили спортсменов, не больше concurrency за раз.
+
+    Спортсмены, по которым API не вернул данных, в результат не попадают.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(athlete_id: int) -> tuple[int, dict]:
+        async with semaphore:
+            return athlete_id, await api.get_athlete_data(athlete_id)
+
+    results = await asyncio.gather(*(fetch(athlete_id) for athlete_id in athlete_ids))
+    return {athlete_id: data for athlete_id, data in results if data}
+
+
+class AthleteProfileCache:
+    """Короткоживущий кэш профилей /users/get в памяти процесса.
+
+    Один и тот же новый спортсмен обычно приходит сразу в нескольких этапах
+    и фигурах подряд, повторно запрашивать его профиль незачем.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._data: dict[int, tuple[float, dict]] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, athlete_ids: Iterable[int]) -> dict[int, dict]:
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for athlete_id in athlete_ids:
+                item = self._data.get(athlete_id)
+                if item is None:
+                    continue
+                expires_at, profile = item
+                if expires_at < now:
+                    del self._data[athlete_id]
+                    continue
+                found[athlete_id] = profile
+        return found
+
+    def set_many(self, profiles: dict[int, dict]) -> None:
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for athlete_id, profile in profiles.items():
+                self._data[athlete_id] = (expires_at, profile)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+athlete_profile_cache = AthleteProfileCache(ttl=settings.ATHLETE_PROFILE_TTL)
+
+
+def prefetch_athlete_profiles(
+    athlete_ids: Iterable[int], concurrency: int | None = None
+) -> dict[int, dict]:
+    """Профили спортсменов из кэша, недостающие запрашиваются параллельно"""
+    athlete_ids = list(athlete_ids)
+    profiles = athlete_profile_cache.get_many(athlete_ids)
+    missing = [athlete_id for athlete_id in athlete_ids if athlete_id not in profiles]
+    if not missing:
+        return profiles
+
+    async def fetch_missing() -> dict[int, dict]:
+        async with AsyncAPIGetter() as api:
+            return await fetch_athlete_profiles(
+                api, missing, concurrency or settings.ATHLETE_REFRESH_CONCURRENCY
+            )
+
+    fetched = async_to_sync(fetch_missing)()
+    logger.info("Получены профили спортсменов: %s из %s", len(fetched), len(missing))
+    athlete_profile_cache.set_many(fetched)
+    profiles.update(fetched)
+    return profiles
+
+
 def get_subscribers_for_class(
     sport_class: str, competition_type: str = "gp"
 ) -> List[User]:
@@ -184,6 +595,9 @@ def notify_user_telegram_message(user: User, message: str) -> None:
 class BaseHandler:
     """Базовый класс для обработчиков данных"""
 
+    RESULT_MODEL: type[StageResultModel] | type[BaseFigureSportsmanResultModel]
+    ENTITY_FIELD: str
+
     def __init__(self):
         self.api = APIGetter()
         self.changes = {
@@ -191,6 +605,9 @@ class BaseHandler:
             "improved_result": 0,
             "no_change": 0,
         }
+        self.skipped: str | None = None
+        self.follow_up = False
+        self.outbox: list[NotificationOutbox] = []
         self.entity = None
         self.entity_data = None
         self.COMPETITION_TYPE = None
@@ -200,7 +617,41 @@ class BaseHandler:
         pass
 
     def get_data(self) -> dict:
-        return self.changes
+        data = dict(self.changes)
+        if self.skipped:
+            data["skipped"] = self.skipped
+        if self.follow_up:
+            data["follow_up"] = True
+        return data
+
+    def _run_locked(self, entity_id: int, import_func) -> None:
+        """Импорт под блокировкой сущности, параллельный импорт того же
+        этапа или фигуры не запускается.
+        """
+        lock = LeaseLock(
+            f"import:{self.ENTITY_FIELD}:{entity_id}",
+            ttl=settings.GYMKHANA_IMPORT_LOCK_TTL,
+        )
+        if not lock.acquire():
+            self.skipped = "locked"
+            self.changes["contention"] = 1
+            if settings.GYMKHANA_IMPORT_LOCK_POLICY == "follow_up":
+                lock.request_follow_up()
+            logger.info(f"Импорт {self.ENTITY_FIELD}|{entity_id} уже выполняется")
+            return
+
+        try:
+            with lock.kept_alive():
+                import_func()
+        finally:
+            self.follow_up = lock.pop_follow_up()
+            lock.release()
+
+    def _skip_unchanged(self, payload: ConditionalPayload) -> None:
+        """Данные с API не изменились - база не трогается"""
+        self.skipped = "unchanged"
+        self.api.commit_payload(payload)
+        logger.info("Пропуск импорта %s: данные не изменились", payload.cache_key)
 
     @staticmethod
     def parse_unix_time(timestamp: float) -> datetime | None:
@@ -211,58 +662,64 @@ class BaseHandler:
 
     @staticmethod
     def get_or_create_motorcycle(motorcycle_name: str) -> MotorcycleModel:
-        motorcycle, _ = MotorcycleModel.objects.get_or_create(title=motorcycle_name)
-        return motorcycle
+        return dimension_resolver.motorcycles([motorcycle_name])[motorcycle_name]
 
     def get_or_create_athlete(self, athlete_data: Dict) -> AthleteModel:
-        country, _ = CountryModel.objects.get_or_create(
-            title=athlete_data["userCountry"]
-        )
-        city, _ = CityModel.objects.get_or_create(
-            title=athlete_data["userCity"], country=country
-        )
         athlete = AthleteModel.objects.filter(id=athlete_data.get("userId")).first()
         if not athlete:
-            athlete_data = self.api.get_athlete_data(athlete_data.get("userId"))
-            athlete = AthleteModel.objects.create(
-                id=athlete_data.get("id"),
-                first_name=athlete_data.get("firstName"),
-                last_name=athlete_data.get("lastName"),
-                city=city,
-                sportsman_class=athlete_data.get("class", "N"),
-            )
-            return athlete
+            return self._create_athletes([athlete_data])[athlete_data["userId"]]
 
         return athlete
 
-    def _send_class_notifications(
-        self, sport_class: str, message: str, entity_title: str
+    def _queue_class_notification(
+        self,
+        sport_class: str,
+        message: str,
+        entity_title: str,
+        icon: str = "",
+        leader: bool = False,
+        event_key: str = "",
     ) -> None:
-        """Отправка уведомлений для класса спортсменов"""
+        """Уведомление для класса спортсменов в outbox импорта.
+
+        Записывается вместе с результатами, рассылается после коммита.
+        """
         if not sport_class:
             raise ValueError("Класс спортсменов не указан")
 
-        subscribers = get_subscribers_for_class(
-            sport_class, competition_type=self.COMPETITION_TYPE
-        )
-        athlete_class = SportsmanClassModel.objects.get(
-            name=sport_class,
+        self.outbox.append(
+            NotificationOutbox(
+                competition_type=self.COMPETITION_TYPE,
+                sportsman_class=sport_class,
+                entity_title=entity_title,
+                icon=icon,
+                message=message,
+                leader=leader,
+                event_key=event_key,
+            )
         )
 
-        for subscriber in subscribers:
-            formatted_message = (
-                f"{entity_title}\n\n"
-                f"{athlete_class.subscribe_emoji} [{sport_class}] {message}\n"
-            )
-            notify_user_telegram_message(subscriber, formatted_message)
+    def _write_outbox(self) -> None:
+        """Запись накопленных уведомлений одним INSERT, рассылка после коммита"""
+        if not self.outbox:
+            return
+        NotificationOutbox.objects.bulk_create(self.outbox)
+        logger.info("Уведомлений в outbox: %s", len(self.outbox))
+        self.outbox = []
+        transaction.on_commit(dispatch_notification_outbox.delay)
+
+    def _event_key(self, athlete: AthleteModel, result_time: int) -> str:
+        """Ключ идемпотентности уведомления: сущность, спортсмен и время"""
+        return f"{self.ENTITY_FIELD}:{self.entity.pk}:{athlete.id}:{result_time}"
 
     def _handle_creation_notification(
-        self, result_data: Dict, athlete: AthleteModel, entity_title: str
+        self,
+        result_data: Dict,
+        athlete: AthleteModel,
+        entity_title: str,
+        event_key: str = "",
     ) -> None:
         """Обработка уведомления о новом результате"""
-        entity_title = "🆕 " + entity_title
-        if result_data.get("percent") == 100:
-            entity_title += "\n\n ❗❗ Новый лидер этапа: ❗❗"
         message = (
             f"{athlete.full_name}\n"
             f"Время: {result_data['resultTime']} [{result_data['percent']}%]\n"
@@ -275,36 +732,184 @@ class BaseHandler:
         if not athlete_class:
             athlete_class = athlete.sportsman_class
 
-        self._send_class_notifications(
+        self._queue_class_notification(
             athlete_class,
             message,
             entity_title,
+            icon="🆕",
+            leader=result_data.get("percent") == 100,
+            event_key=event_key,
         )
 
-    def _update_existing_result(
-        self,
-        existing_result: BaseFigureSportsmanResultModel | StageResultModel,
-        result_data: Dict,
-        new_time: int,
-    ) -> None:
-        """Обновление существующего результата"""
-        old_time = existing_result.result_time
-        time_diff = (existing_result.result_time_seconds - new_time) / 1000
-
-        existing_result.result_time_seconds = new_time
-        existing_result.result_time = result_data["resultTime"]
-        existing_result.fine = result_data.get("fine", existing_result.fine)
-        existing_result.video = result_data.get("video", existing_result.video)
-        existing_result.save()
-
-        self._handle_improvement_notification(
-            result_data,
-            existing_result.user,
-            old_time,
-            time_diff,
-            self.entity.title,
+    @abstractmethod
+    def _extract_result(self, result_data: dict) -> ResultRow | None:
+        """Достаёт из результата payload данные спортсмена и время"""
+
+    @abstractmethod
+    def _build_result(
+        self, row: ResultRow, athlete: AthleteModel, motorcycle: MotorcycleModel
+    ) -> StageResultModel | BaseFigureSportsmanResultModel:
+        """Создаёт (не сохраняя) модель нового результата"""
+
+    def _process_results(self, results: list[dict]) -> None:
+        """Сравнение результатов payload с базой набором запросов вместо
+        запросов на каждый результат: все существующие результаты читаются
+        одним запросом, новые и улучшенные пишутся bulk операциями.
+        """
+        rows = [row for data in results if (row := self._extract_result(data))]
+        if not rows:
+            return
+
+        athletes = self._resolve_athletes([row.athlete_data for row in rows])
+        diff = self._diff_results(rows, athletes)
+        with transaction.atomic():
+            self._persist_diff(diff)
+            self._notify_diff(diff)
+            self._write_outbox()
+
+    def _resolve_athletes(self, athletes_data: list[dict]) -> dict[int, AthleteModel]:
+        """Спортсмены payload одним запросом, неизвестные создаются"""
+        athletes = AthleteModel.objects.in_bulk(
+            {data["userId"] for data in athletes_data}
+        )
+        unknown = {
+            data["userId"]: data
+            for data in athletes_data
+            if data["userId"] not in athletes
+        }
+        if unknown:
+            athletes.update(self._create_athletes(list(unknown.values())))
+        return athletes
+
+    def _create_athletes(self, athletes_data: list[dict]) -> dict[int, AthleteModel]:
+        """Создание новых спортсменов одним bulk_create.
+
+        Профили запрашиваются параллельно до обработки результатов, если API
+        не ответил по спортсмену, используются данные из результата.
+        """
+        cities = dimension_resolver.cities(
+            (data["userCity"], data["userCountry"]) for data in athletes_data
+        )
+        profiles = prefetch_athlete_profiles(data["userId"] for data in athletes_data)
+
+        new_athletes = []
+        for data in athletes_data:
+            profile = profiles.get(data["userId"], {})
+            new_athletes.append(
+                AthleteModel(
+                    id=data["userId"],
+                    first_name=profile.get("firstName", data.get("userFirstName")),
+                    last_name=profile.get("lastName", data.get("userLastName")),
+                    city=cities[(data["userCity"], data["userCountry"])],
+                    sportsman_class=profile.get("class", data.get("athleteClass", "N")),
+                )
+            )
+        logger.info("Создаём новых спортсменов: %s", len(new_athletes))
+        # параллельный импорт мог успеть создать тех же спортсменов
+        AthleteModel.objects.bulk_create(new_athletes, ignore_conflicts=True)
+        return AthleteModel.objects.in_bulk([athlete.id for athlete in new_athletes])
+
+    def _diff_results(
+        self, rows: list[ResultRow], athletes: dict[int, AthleteModel]
+    ) -> ResultDiff:
+        """Раскладывает результаты на новые, улучшенные и без изменений"""
+        existing = {
+            result.user_id: result
+            for result in self.RESULT_MODEL.objects.filter(
+                **{self.ENTITY_FIELD: self.entity},
+                user_id__in=[athlete.id for athlete in athletes.values()],
+            )
+        }
+        motorcycles = dimension_resolver.motorcycles(
+            row.result_data["motorcycle"]
+            for row in rows
+            if row.athlete_data["userId"] not in existing
         )
-        self.changes["improved_result"] += 1
+        diff = ResultDiff()
+
+        for row in rows:
+            athlete = athletes[row.athlete_data["userId"]]
+            current = existing.get(athlete.id)
+
+            if current is None:
+                motorcycle = motorcycles[row.result_data["motorcycle"]]
+                result = self._build_result(row, athlete, motorcycle)
+                existing[athlete.id] = result
+                diff.new.append((row, athlete, result))
+            elif row.new_time < current.result_time_seconds:
+                old_time = current.result_time
+                time_diff = (current.result_time_seconds - row.new_time) / 1000
+                self._apply_improvement(current, row)
+                diff.improved.append((row, athlete, current, old_time, time_diff))
+            else:
+                diff.unchanged.append(athlete)
+
+        return diff
+
+    @staticmethod
+    def _apply_improvement(
+        result: StageResultModel | BaseFigureSportsmanResultModel, row: ResultRow
+    ) -> None:
+        """Перенос улучшенного времени в существующий результат"""
+        result.result_time_seconds = row.new_time
+        result.result_time = row.result_data["resultTime"]
+        result.fine = row.result_data.get("fine", result.fine)
+        result.video = row.result_data.get("video", result.video)
+
+    def _persist_diff(self, diff: ResultDiff) -> None:
+        """Сохранение новых и улучшенных результатов одним upsert.
+
+        База сама проверяет, что время лучше сохранённого, поэтому параллельный
+        импорт того же этапа не создаст дубликат и не затрёт лучшее время.
+        Строки, которые upsert не тронул, переходят в без изменений.
+        """
+        # результат, улучшенный в том же payload, встречается в diff дважды
+        results = {result.user_id: result for _, _, result in diff.new}
+        for _, _, result, _, _ in diff.improved:
+            results[result.user_id] = result
+
+        with transaction.atomic():
+            affected = self.RESULT_MODEL.objects.upsert_best(
+                list(results.values()), unique_fields=[self.ENTITY_FIELD, "user"]
+            )
+
+        for item in [*diff.new, *diff.improved]:
+            if item[1].id not in affected:
+                logger.info("Результат %s уже обновлён параллельно", item[1])
+                diff.unchanged.append(item[1])
+        diff.new = [item for item in diff.new if item[1].id in affected]
+        diff.improved = [item for item in diff.improved if item[1].id in affected]
+
+        self.changes["new_result"] += len(diff.new)
+        self.changes["improved_result"] += len(diff.improved)
+        for athlete in diff.unchanged:
+            self._handle_no_change(athlete)
+
+    def _notify_diff(self, diff: ResultDiff) -> None:
+        """Уведомления о новых и улучшенных результатах в outbox импорта"""
+        for row, athlete, _ in diff.new:
+            try:
+                self._handle_creation_notification(
+                    row.result_data,
+                    athlete,
+                    self.entity.title,
+                    self._event_key(athlete, row.new_time),
+                )
+            except Exception:
+                logger.exception("Ошибка уведомления о новом результате %s", athlete)
+
+        for row, athlete, _, old_time, time_diff in diff.improved:
+            try:
+                self._handle_improvement_notification(
+                    row.result_data,
+                    athlete,
+                    old_time,
+                    time_diff,
+                    self.entity.title,
+                    self._event_key(athlete, row.new_time),
+                )
+            except Exception:
+                logger.exception("Ошибка уведомления об улучшении %s", athlete)
 
     def _handle_improvement_notification(
         self,
@@ -313,11 +918,9 @@ class BaseHandler:
         old_time: str,
         time_diff: float,
         entity_title: str,
+        event_key: str = "",
     ) -> None:
         """Обработка уведомления об улучшении результата"""
-        entity_title = "⬆️ " + entity_title
-        if result_data.get("percent") == 100:
-            entity_title += "\n\n ❗❗ Новый лидер этапа: ❗❗"
         message = (
             f"{athlete.full_name}\n"
             f"Старое время: {old_time}\n"
@@ -332,7 +935,14 @@ class BaseHandler:
         if not athlete_class:
             athlete_class = athlete.sportsman_class
 
-        self._send_class_notifications(athlete_class, message, entity_title)
+        self._queue_class_notification(
+            athlete_class,
+            message,
+            entity_title,
+            icon="⬆️",
+            leader=result_data.get("percent") == 100,
+            event_key=event_key,
+        )
 
     def _handle_no_change(self, athlete: AthleteModel) -> None:
         """Обработка отсутствия изменений"""
@@ -343,6 +953,9 @@ class BaseHandler:
 class StageGGPHandeler(BaseHandler):
     """Обработчик данных этапа ГПП"""
 
+    RESULT_MODEL = StageResultModel
+    ENTITY_FIELD = "stage"
+
     def __init__(self, stage_id: int):
         super().__init__()
         self.COMPETITION_TYPE = "ggp"
@@ -350,7 +963,7 @@ class StageGGPHandeler(BaseHandler):
 
     def handle(self) -> None:
         try:
-            self._import_single_stage()
+            self._run_locked(self.stage_id, self._import_single_stage)
             self._log_import_results()
         except Exception as e:
             logger.exception(f"Ошибка при импорте данных этапа: {e}")
@@ -359,7 +972,12 @@ class StageGGPHandeler(BaseHandler):
         """Импорт данных для одного этапа"""
         logger.info(f"Начинаем импорт этапа: {self.COMPETITION_TYPE}|{self.stage_id}")
 
-        self.entity_data = self.api.data_stage(self.stage_id, "gp")
+        payload = self.api.data_stage_if_changed(self.stage_id, "gp")
+        if not payload.changed:
+            self._skip_unchanged(payload)
+            return
+
+        self.entity_data = payload.data
         if not self.entity_data:
             logger.warning(
                 f"Нет данных для этапа: {self.COMPETITION_TYPE}|{self.stage_id}"
@@ -369,36 +987,40 @@ class StageGGPHandeler(BaseHandler):
         self.entity, _ = StageModel.objects.get_or_create(
             stage_id=self.entity_data["id"]
         )
-        self._process_results()
-
-    def _process_results(self) -> None:
-        """Обработка всех результатов этапа"""
-        for result_data in self.entity_data.get("results", []):
-            self._process_single_result(result_data)
-
-    def _process_single_result(self, result_data: Dict) -> None:
-        """Обработка одного результата"""
+        self._update_stage_schedule_fields()
+        self._process_results(self.entity_data.get("results", []))
+        self.api.commit_payload(payload)
+
+    def _update_stage_schedule_fields(self) -> None:
+        """Статус и даты этапа из payload, по ним планируется опрос этапа"""
+        fields = {
+            "status": self.entity_data.get("status"),
+            "date_start": self.parse_unix_time(self.entity_data.get("dateStart")),
+            "date_end": self.parse_unix_time(self.entity_data.get("dateEnd")),
+        }
+        changed = [
+            name
+            for name, value in fields.items()
+            if value is not None and getattr(self.entity, name) != value
+        ]
+        for name in changed:
+            setattr(self.entity, name, fields[name])
+        if changed:
+            self.entity.save(update_fields=changed)
+
+    def _extract_result(self, result_data: dict) -> ResultRow | None:
         new_time = result_data.get("resultTimeSeconds")
         if not new_time:
             logger.warning(f"Отсутствует время для результата: {result_data}")
-            return
-
-        athlete = self.get_or_create_athlete(result_data)
-        existing_result = StageResultModel.objects.filter(
-            stage=self.entity, user=athlete
-        ).first()
-
-        if not existing_result:
-            self._create_new_result(result_data, athlete)
-        elif new_time < existing_result.result_time_seconds:
-            self._update_existing_result(existing_result, result_data, new_time)
-        else:
-            self._handle_no_change(athlete)
-
-    def _create_new_result(self, result_data: Dict, athlete: AthleteModel) -> None:
-        """Создание нового результата этапа"""
-        motorcycle = self.get_or_create_motorcycle(result_data["motorcycle"])
-        StageResultModel.objects.create(
+            return None
+        return ResultRow(result_data, result_data, new_time)
+
+    def _build_result(
+        self, row: ResultRow, athlete: AthleteModel, motorcycle: MotorcycleModel
+    ) -> StageResultModel:
+        """Новый результат этапа"""
+        result_data = row.result_data
+        return StageResultModel(
             stage=self.entity,
             user=athlete,
             motorcycle=motorcycle,
@@ -409,8 +1031,6 @@ class StageGGPHandeler(BaseHandler):
             result_time=result_data["resultTime"],
             video=result_data.get("video"),
         )
-        self._handle_creation_notification(result_data, athlete, self.entity.title)
-        self.changes["new_result"] += 1
 
     def _log_import_results(self) -> None:
         """Логирование результатов импорта"""
@@ -424,15 +1044,19 @@ class StageGGPHandeler(BaseHandler):
 class BaseFigureHandler(BaseHandler):
     """Обработчик базовых фигур"""
 
+    RESULT_MODEL = BaseFigureSportsmanResultModel
+    ENTITY_FIELD = "base_figure"
+
     def __init__(self, figure_id: int):
         super().__init__()
         self.figure_id = figure_id
         self.figure = self._get_or_create_figure()
+        self.entity = self.figure
         self.COMPETITION_TYPE = "base"
 
     def handle(self) -> None:
         try:
-            self._import_figure_results()
+            self._run_locked(self.figure_id, self._import_figure_results)
             self._log_import_results()
         except Exception as e:
             logger.exception(f"Ошибка при импорте данных фигуры: {e}")
@@ -459,33 +1083,18 @@ class BaseFigureHandler(BaseHandler):
     def _import_figure_results(self) -> None:
         """Импорт результатов для фигуры"""
         logger.info(f"Начинаем импорт фигуры {self.figure.title}")
-        figure_data = self.api.get_figure_data(self.figure.id)
+        payload = self.api.get_figure_data_if_changed(self.figure.id)
+        if not payload.changed:
+            self._skip_unchanged(payload)
+            return
 
-        for result_data in figure_data.get("results", []):
-            self._process_single_result(result_data)
+        self._process_results(payload.data.get("results", []))
+        self.api.commit_payload(payload)
 
-    def _process_single_result(self, result_data: Dict) -> None:
-        """Обработка одного результата фигуры"""
+    def _extract_result(self, result_data: dict) -> ResultRow | None:
         best_result = result_data.get("best")
         if not best_result:
-            return
-
-        athlete = self._prepare_athlete_data(result_data)
-        existing_result = BaseFigureSportsmanResultModel.objects.filter(
-            base_figure=self.figure, user=athlete
-        ).first()
-
-        if not existing_result:
-            self._create_new_figure_result(best_result, athlete)
-        elif best_result.get("timeSeconds") < existing_result.result_time_seconds:
-            self._update_existing_result(
-                existing_result, result_data.get("best"), best_result.get("timeSeconds")
-            )
-        else:
-            self._handle_no_change(athlete)
-
-    def _prepare_athlete_data(self, result_data: Dict) -> AthleteModel:
-        """Подготовка данных спортсмена"""
+            return None
 
         athlete_data = {
             "userId": result_data["userId"],
@@ -494,14 +1103,14 @@ class BaseFigureHandler(BaseHandler):
             "userCity": result_data["userCity"],
             "userCountry": result_data["userCountry"],
         }
-        return self.get_or_create_athlete(athlete_data)
-
-    def _create_new_figure_result(
-        self, result_data: Dict, athlete: AthleteModel
-    ) -> None:
-        """Создание нового результата для фигуры"""
-        motorcycle = self.get_or_create_motorcycle(result_data["motorcycle"])
-        BaseFigureSportsmanResultModel.objects.create(
+        return ResultRow(athlete_data, best_result, best_result.get("timeSeconds"))
+
+    def _build_result(
+        self, row: ResultRow, athlete: AthleteModel, motorcycle: MotorcycleModel
+    ) -> BaseFigureSportsmanResultModel:
+        """Новый результат для фигуры"""
+        result_data = row.result_data
+        return BaseFigureSportsmanResultModel(
             base_figure=self.figure,
             user=athlete,
             motorcycle=motorcycle,
@@ -511,8 +1120,6 @@ class BaseFigureHandler(BaseHandler):
             result_time=result_data["resultTime"],
             video=result_data.get("video"),
         )
-        self._handle_creation_notification(result_data, athlete, self.figure.title)
-        self.changes["new_result"] += 1
 
     def _log_import_results(self) -> None:
         """Логирование результатов импорта"""
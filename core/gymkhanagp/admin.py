@@ -1,6 +1,7 @@
 from django.contrib import admin
 from .models import (
     CompetitionTypeModel,
+    NotificationOutbox,
     SportsmanClassModel,
     Subscription,
     UserSubscription,
@@ -25,3 +26,15 @@ class SubscriptionAdmin(admin.ModelAdmin):
 @admin.register(UserSubscription)
 class UserSubscriptionAdmin(admin.ModelAdmin):
     list_display = ("user", "created_at", "is_active")
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = (
+        "entity_title",
+        "competition_type",
+        "sportsman_class",
+        "created_at",
+        "delivered_at",
+    )
+    list_filter = ("competition_type", "sportsman_class")
@@ -0,0 +1,107 @@
+"""
+Объединение уведомлений о результатах в одну сводку на пользователя.
+
+События складываются в список Redis на чат, первое событие открывает окно
+NOTIFICATION_DIGEST_WINDOW секунд. По окончании окна задача
+flush_notification_digest отправляет одно сообщение со всеми изменениями,
+сгруппированными по этапу и классу.
+"""
+
+import hashlib
+import json
+import logging
+from dataclasses import asdict, dataclass
+
+from core.redis_client import get_redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DigestEvent:
+    """Одно изменение результата: этап, класс с символом подписки и текст,
+    key - ключ идемпотентности уведомления
+    """
+
+    stage: str
+    sport_class: str
+    text: str
+    key: str = ""
+
+
+class NotificationDigest:
+    """Буфер уведомлений на чат в Redis"""
+
+    EVENTS_KEY = "notify:digest:{chat_id}"
+    WINDOW_KEY = "notify:digest:window:{chat_id}"
+
+    def __init__(self, window: int):
+        self.window = window
+
+    def add(self, chat_ids: list[int], event: DigestEvent) -> list[int]:
+        """Добавляет событие в буферы чатов.
+
+        Возвращает чаты, для которых событие открыло новое окно - для них
+        нужно запланировать отправку сводки.
+        """
+        payload = json.dumps(asdict(event), ensure_ascii=False)
+        pipe = get_redis().pipeline()
+        for chat_id in chat_ids:
+            events_key = self.EVENTS_KEY.format(chat_id=chat_id)
+            pipe.rpush(events_key, payload)
+            # страховка, если сводка так и не будет отправлена
+            pipe.expire(events_key, self.window * 10)
+            pipe.set(
+                self.WINDOW_KEY.format(chat_id=chat_id), 1, nx=True, ex=self.window * 2
+            )
+        replies = pipe.execute()
+        return [chat_id for chat_id, opened in zip(chat_ids, replies[2::3]) if opened]
+
+    def pop(self, chat_id: int) -> list[DigestEvent]:
+        """Забирает накопленные события и закрывает окно чата.
+
+        Окно закрывается до чтения событий: событие, пришедшее между
+        этими шагами, откроет новое окно и не потеряется. Событие, добавленное
+        повторно (повтор разбора outbox), попадает в сводку один раз.
+        """
+        redis = get_redis()
+        redis.delete(self.WINDOW_KEY.format(chat_id=chat_id))
+        events_key = self.EVENTS_KEY.format(chat_id=chat_id)
+        pipe = redis.pipeline()
+        pipe.lrange(events_key, 0, -1)
+        pipe.delete(events_key)
+        payloads, _ = pipe.execute()
+        return [
+            DigestEvent(**json.loads(payload)) for payload in dict.fromkeys(payloads)
+        ]
+
+    @staticmethod
+    def idempotency_key(events: list[DigestEvent]) -> str:
+        """Ключ сводки по ключам (или текстам) входящих в неё событий"""
+        parts = sorted(event.key or event.text for event in events)
+        return "digest:" + hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+    @staticmethod
+    def render(events: list[DigestEvent]) -> str:
+        """Текст сводки: этапы, внутри них классы, внутри - изменения"""
+        if len(events) == 1:
+            event = events[0]
+            return f"{event.stage}\n\n{event.sport_class} {event.text}\n"
+
+        grouped: dict[str, dict[str, list[str]]] = {}
+        for event in events:
+            grouped.setdefault(event.stage, {}).setdefault(
+                event.sport_class, []
+            ).append(event.text)
+
+        parts = [f"Изменения результатов ({len(events)}):"]
+        for stage, classes in grouped.items():
+            parts.append(f"\n{stage}")
+            for sport_class, texts in classes.items():
+                parts.append(f"\n{sport_class}")
+                parts.extend(f"{text}\n" for text in texts)
+        return "\n".join(parts)
+
+
+notification_digest = NotificationDigest(window=settings.NOTIFICATION_DIGEST_WINDOW)
@@ -0,0 +1,96 @@
+"""
+Очереди рассылки уведомлений по классам спортсменов.
+
+Пачки получателей складываются в список Redis своего класса, задача
+drain_class_lanes забирает их по кругу: за круг класс отдаёт столько пачек,
+сколько его вес (TELEGRAM_CLASS_WEIGHTS), следующий круг ставится только
+после отправки текущего. Поэтому массовая рассылка одного класса не
+задерживает уведомления других классов, даже пришедшие после неё, - в общей
+очереди telegram_bulk они ждали бы всех её пачек.
+"""
+
+import json
+import logging
+
+from core.redis_client import get_redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+LANE_KEY = "telegram:lane:{sport_class}"
+ACTIVE_LANES_KEY = "telegram:lanes"
+DRAIN_KEY = "telegram:lanes:drain"
+
+# KEYS: множество классов с пачками
+# ARGV: префикс очереди класса, вес по умолчанию, затем пары класс - вес
+# Забирает по весу пачек из каждой очереди, пустые очереди убирает из множества
+POP_ROUND_SCRIPT = """
+local weights = {}
+for i = 3, #ARGV, 2 do
+  weights[ARGV[i]] = tonumber(ARGV[i + 1])
+end
+
+local classes = redis.call('SMEMBERS', KEYS[1])
+table.sort(classes)
+local batches = {}
+for _, sport_class in ipairs(classes) do
+  local key = ARGV[1] .. sport_class
+  local taken = redis.call('LPOP', key, weights[sport_class] or tonumber(ARGV[2]))
+  if taken then
+    for _, batch in ipairs(taken) do
+      table.insert(batches, batch)
+    end
+  end
+  if redis.call('LLEN', key) == 0 then
+    redis.call('SREM', KEYS[1], sport_class)
+  end
+end
+return batches
+"""
+
+
+class ClassLanes:
+    """Очереди пачек рассылки по классам и отметка работающего круга.
+
+    Круги идут по одному: тот, кто поставил отметку (claim_drain), запускает
+    drain_class_lanes, задача продлевает отметку на каждом круге и снимает,
+    когда очереди опустели.
+    """
+
+    def __init__(self, drain_ttl: int):
+        self.drain_ttl = drain_ttl
+
+    def push(self, sport_class: str, chat_ids: list[int], message: str, key=None):
+        pipe = get_redis().pipeline()
+        pipe.rpush(
+            LANE_KEY.format(sport_class=sport_class),
+            json.dumps({"chat_ids": chat_ids, "message": message, "key": key}),
+        )
+        pipe.sadd(ACTIVE_LANES_KEY, sport_class)
+        pipe.execute()
+
+    def pop_round(self, weights: dict[str, int]) -> list[dict]:
+        """Пачки одного круга: до веса класса из каждой очереди"""
+        redis = get_redis()
+        args = [LANE_KEY.format(sport_class=""), 1]
+        for sport_class, weight in weights.items():
+            args += [sport_class, max(1, weight)]
+        batches = redis.register_script(POP_ROUND_SCRIPT)(
+            keys=[ACTIVE_LANES_KEY], args=args
+        )
+        return [json.loads(batch) for batch in batches]
+
+    def pending(self) -> bool:
+        return get_redis().scard(ACTIVE_LANES_KEY) > 0
+
+    def claim_drain(self) -> bool:
+        return bool(get_redis().set(DRAIN_KEY, 1, nx=True, ex=self.drain_ttl))
+
+    def extend_drain(self) -> None:
+        get_redis().expire(DRAIN_KEY, self.drain_ttl)
+
+    def release_drain(self) -> None:
+        get_redis().delete(DRAIN_KEY)
+
+
+class_lanes = ClassLanes(drain_ttl=settings.TELEGRAM_LANE_DRAIN_TTL)
@@ -0,0 +1,194 @@
+# Generated by Django 6.0.9 on 2026-10-18 13:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CompetitionTypeModel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=15, unique=True, verbose_name="Тип соревнований"
+                    ),
+                ),
+                (
+                    "description",
+                    models.CharField(
+                        blank=True, max_length=255, null=True, verbose_name="Описание"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Тип соревнования",
+                "verbose_name_plural": "Типы соревнования",
+            },
+        ),
+        migrations.CreateModel(
+            name="SportsmanClassModel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=2, unique=True, verbose_name="Класс спортсмена"
+                    ),
+                ),
+                (
+                    "description",
+                    models.CharField(
+                        blank=True, max_length=255, null=True, verbose_name="Описание"
+                    ),
+                ),
+                (
+                    "subscribe_emoji",
+                    models.CharField(
+                        db_default="🟨",
+                        default="🟨",
+                        max_length=3,
+                        verbose_name="Символ подписки",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Класс спортсмена",
+                "verbose_name_plural": "Классы спортсменов",
+            },
+        ),
+        migrations.CreateModel(
+            name="Subscription",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "competition_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="gymkhanagp.competitiontypemodel",
+                    ),
+                ),
+                (
+                    "sportsman_class",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="gymkhanagp.sportsmanclassmodel",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="UserSubscription",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Дата подписки"
+                    ),
+                ),
+                (
+                    "is_active",
+                    models.BooleanField(
+                        default=True, verbose_name="Активна ли подписка"
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[
+                            ("telegram", "Telegram"),
+                            ("site", "Сайт"),
+                            ("admin", "Админ панель"),
+                        ],
+                        default="admin",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "competition_type",
+                    models.ManyToManyField(
+                        through="gymkhanagp.Subscription",
+                        through_fields=("user_subscription", "competition_type"),
+                        to="gymkhanagp.competitiontypemodel",
+                    ),
+                ),
+                (
+                    "sportsman_class",
+                    models.ManyToManyField(
+                        through="gymkhanagp.Subscription",
+                        through_fields=("user_subscription", "sportsman_class"),
+                        to="gymkhanagp.sportsmanclassmodel",
+                    ),
+                ),
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="subscriptions",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Подписка",
+                "verbose_name_plural": "Подписки",
+            },
+        ),
+        migrations.AddField(
+            model_name="subscription",
+            name="user_subscription",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                to="gymkhanagp.usersubscription",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="subscription",
+            constraint=models.UniqueConstraint(
+                fields=("user_subscription", "competition_type", "sportsman_class"),
+                name="user_subscription_combination",
+            ),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 6.0.9 on 2026-10-18 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("gymkhanagp", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationOutbox",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "competition_type",
+                    models.CharField(max_length=15, verbose_name="Тип соревнований"),
+                ),
+                (
+                    "sportsman_class",
+                    models.CharField(max_length=2, verbose_name="Класс спортсмена"),
+                ),
+                (
+                    "entity_title",
+                    models.CharField(max_length=255, verbose_name="Этап или фигура"),
+                ),
+                (
+                    "icon",
+                    models.CharField(
+                        blank=True, max_length=8, verbose_name="Символ события"
+                    ),
+                ),
+                ("message", models.TextField(verbose_name="Текст уведомления")),
+                (
+                    "leader",
+                    models.BooleanField(default=False, verbose_name="Новый лидер"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Создано"),
+                ),
+                (
+                    "delivered_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Передано на отправку"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Уведомление в очереди",
+                "verbose_name_plural": "Очередь уведомлений",
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("delivered_at__isnull", True)),
+                        fields=["id"],
+                        name="notification_outbox_pending",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.9 on 2026-10-18 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("gymkhanagp", "0002_notificationoutbox"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notificationoutbox",
+            name="event_key",
+            field=models.CharField(
+                blank=True, max_length=100, verbose_name="Ключ идемпотентности"
+            ),
+        ),
+    ]
@@ -89,3 +89,45 @@ class Subscription(models.Model):
         return f"{self.user_subscription.user.username} - {self.competition_type.name} - {self.sportsman_class.name}"
 
     objects = models.Manager()
+
+
+class NotificationOutboxQuerySet(models.QuerySet):
+    def pending(self) -> NotificationOutboxQuerySet:
+        return self.filter(delivered_at__isnull=True)
+
+
+class NotificationOutbox(models.Model):
+    """Уведомление о результате, записанное в одной транзакции с результатами.
+
+    Рассылается диспетчером gymkhanagp.outbox после коммита импорта.
+    """
+
+    competition_type = models.CharField(max_length=15, verbose_name="Тип соревнований")
+    sportsman_class = models.CharField(max_length=2, verbose_name="Класс спортсмена")
+    entity_title = models.CharField(max_length=255, verbose_name="Этап или фигура")
+    icon = models.CharField(max_length=8, blank=True, verbose_name="Символ события")
+    message = models.TextField(verbose_name="Текст уведомления")
+    leader = models.BooleanField(default=False, verbose_name="Новый лидер")
+    event_key = models.CharField(
+        max_length=100, blank=True, verbose_name="Ключ идемпотентности"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создано")
+    delivered_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Передано на отправку"
+    )
+
+    class Meta:
+        verbose_name = "Уведомление в очереди"
+        verbose_name_plural = "Очередь уведомлений"
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=models.Q(delivered_at__isnull=True),
+                name="notification_outbox_pending",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.competition_type} [{self.sportsman_class}] {self.entity_title}"
+
+    objects = NotificationOutboxQuerySet.as_manager()
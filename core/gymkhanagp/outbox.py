@@ -0,0 +1,154 @@
+"""
+Рассылка уведомлений из таблицы NotificationOutbox.
+
+Обработчики импорта пишут уведомления в outbox в одной транзакции с
+результатами, после коммита задача dispatch_notification_outbox разбирает
+очередь пачками: маршрутизирует по индексу подписчиков, ставит рассылку в
+очередь отправки и одним UPDATE отмечает пачку переданной.
+"""
+
+import logging
+from collections import Counter, deque
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .digest import DigestEvent
+from .models import NotificationOutbox
+from .reference import SportsmanClassInfo, reference_cache
+from .routing import subscriber_index
+from .tasks import broadcast_class_message, coalesce_notification
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Fanout:
+    """Рассылка одного уведомления подписчикам класса"""
+
+    sport_class: str
+    chat_ids: list[int]
+    message: str
+    key: str | None = None
+
+
+def render_notification(
+    event: NotificationOutbox, sportsman_class: SportsmanClassInfo
+) -> str:
+    """Текст уведомления, один на событие и класс для всех подписчиков"""
+    entity_title = event.entity_title
+    if event.icon:
+        entity_title = f"{event.icon} {entity_title}"
+    if event.leader:
+        entity_title += "\n\n ❗❗ Новый лидер этапа: ❗❗"
+    return f"{entity_title}\n\n{sportsman_class.label} {event.message}\n"
+
+
+def route_class_notification(event: NotificationOutbox) -> Fanout | None:
+    """Получатели и текст уведомления подписчикам класса.
+
+    Текст строится один раз, все пачки рассылки ссылаются на одну строку.
+    При NOTIFICATION_DIGEST_ENABLED уведомление сразу откладывается в сводку
+    подписчика и рассылки нет, новый лидер этапа по умолчанию идёт сразу.
+    """
+    sport_class = event.sportsman_class
+    chat_ids = subscriber_index.get().chat_ids(event.competition_type, sport_class)
+    if not chat_ids:
+        logger.info(f"Нет подписчиков класса {sport_class}")
+        return None
+
+    class_info = reference_cache.sportsman_class(sport_class)
+    bypass = event.leader and settings.NOTIFICATION_DIGEST_LEADER_BYPASS
+    if settings.NOTIFICATION_DIGEST_ENABLED and not bypass:
+        text = f"{event.icon} {event.message}" if event.icon else event.message
+        coalesce_notification(
+            chat_ids,
+            DigestEvent(event.entity_title, class_info.label, text, event.event_key),
+        )
+        return None
+
+    return Fanout(
+        sport_class,
+        chat_ids,
+        render_notification(event, class_info),
+        event.event_key or None,
+    )
+
+
+def fair_order(
+    fanouts: Iterable[Fanout],
+    batch_size: int,
+    weights: dict[str, int] | None = None,
+) -> Iterator[tuple[Fanout, list[int]]]:
+    """Пачки получателей по классам во взвешенном круговом порядке.
+
+    Рассылка популярного класса режется на пачки по batch_size и чередуется с
+    пачками других классов. За круг класс отдаёт столько пачек, сколько его
+    вес (по умолчанию 1). Порядок действует внутри одной пачки outbox, между
+    пачками классы чередуют очереди gymkhanagp.lanes при отправке.
+    """
+    weights = weights or {}
+    queues: dict[str, deque[tuple[Fanout, list[int]]]] = {}
+    for fanout in fanouts:
+        queue = queues.setdefault(fanout.sport_class, deque())
+        for start in range(0, len(fanout.chat_ids), batch_size):
+            queue.append((fanout, fanout.chat_ids[start : start + batch_size]))
+
+    while queues:
+        for sport_class in list(queues):
+            queue = queues[sport_class]
+            for _ in range(max(1, weights.get(sport_class, 1))):
+                if not queue:
+                    break
+                yield queue.popleft()
+            if not queue:
+                del queues[sport_class]
+
+
+def dispatch_outbox(batch_size: int | None = None) -> int:
+    """Разбор неотправленных уведомлений пачками, возвращает число переданных.
+
+    Строки пачки блокируются (SKIP LOCKED), поэтому параллельные диспетчеры
+    не разбирают одно уведомление одновременно. Если постановка рассылки
+    упала, пачка остаётся неотправленной и будет разобрана повтором задачи -
+    уже доставленное отсекут ключи идемпотентности.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_OUTBOX_BATCH_SIZE
+    dispatched = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                NotificationOutbox.objects.pending()
+                .select_for_update(skip_locked=True)
+                .order_by("id")[:batch_size]
+            )
+            if not batch:
+                return dispatched
+
+            fanouts = [
+                fanout for event in batch if (fanout := route_class_notification(event))
+            ]
+            for fanout, chat_ids in fair_order(
+                fanouts,
+                settings.TELEGRAM_BROADCAST_BATCH_SIZE,
+                settings.TELEGRAM_CLASS_WEIGHTS,
+            ):
+                broadcast_class_message(
+                    fanout.sport_class, chat_ids, fanout.message, fanout.key
+                )
+
+            NotificationOutbox.objects.filter(
+                pk__in=[event.pk for event in batch]
+            ).update(delivered_at=timezone.now())
+        dispatched += len(batch)
+        recipients: Counter[str] = Counter()
+        for fanout in fanouts:
+            recipients[fanout.sport_class] += len(fanout.chat_ids)
+        logger.info(
+            "Разобрано уведомлений outbox: %s, получателей по классам: %s",
+            len(batch),
+            dict(recipients),
+        )
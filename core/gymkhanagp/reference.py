@@ -0,0 +1,140 @@
+"""
+Справочники подписок в памяти процесса.
+
+Классы спортсменов и типы соревнований - маленькие таблицы, которые меняются
+только из админки, поэтому они читаются целиком и хранятся в процессе.
+Изменение справочника меняет номер версии в общем кэше (сигналы
+gymkhanagp.signals), процессы сверяют версию не чаще раза в
+REFERENCE_CHECK_INTERVAL секунд и перечитывают справочники, если она
+изменилась.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+from core.caches import shared_cache, shared_version
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from .models import CompetitionTypeModel, SportsmanClassModel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMOJI = "🟨"
+
+
+@dataclass(frozen=True)
+class SportsmanClassInfo:
+    name: str
+    description: str | None
+    subscribe_emoji: str
+    id: int | None = None
+
+    @property
+    def label(self) -> str:
+        """Символ и класс для текста уведомлений: "🟩 [C1]" """
+        return f"{self.subscribe_emoji} [{self.name}]"
+
+
+@dataclass(frozen=True)
+class CompetitionTypeInfo:
+    id: int
+    name: str
+    description: str | None
+
+
+class ReferenceCache:
+    """Кэш справочников с версионной инвалидацией"""
+
+    VERSION_KEY = "reference:version"
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._classes: dict[str, SportsmanClassInfo] | None = None
+        self._classes_by_id: dict[int, SportsmanClassInfo] = {}
+        self._competition_types: dict[str, CompetitionTypeInfo] = {}
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _shared_version(cls):
+        try:
+            return shared_version(cls.VERSION_KEY)
+        except RedisError:
+            logger.warning("Кэш недоступен, версия справочников неизвестна")
+            return None
+
+    def _load(self, version) -> None:
+        classes = {
+            sportsman_class.name: SportsmanClassInfo(
+                sportsman_class.name,
+                sportsman_class.description,
+                sportsman_class.subscribe_emoji,
+                sportsman_class.pk,
+            )
+            for sportsman_class in SportsmanClassModel.objects.order_by("pk")
+        }
+        self._classes_by_id = {info.id: info for info in classes.values()}
+        self._competition_types = {
+            competition_type.name: CompetitionTypeInfo(
+                competition_type.pk,
+                competition_type.name,
+                competition_type.description,
+            )
+            for competition_type in CompetitionTypeModel.objects.order_by("pk")
+        }
+        # готовность справочника определяется по классам, поэтому они последние
+        self._classes = classes
+        self._version = version
+        logger.debug("Загружены справочники, версия %s", version)
+
+    def _ensure_fresh(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if (
+                self._classes is not None
+                and now - self._checked_at < self.check_interval
+            ):
+                return
+            version = self._shared_version()
+            # без общего кэша справочник перечитывается по интервалу проверки
+            if self._classes is None or version is None or version != self._version:
+                self._load(version)
+            self._checked_at = now
+
+    def sportsman_classes(self) -> dict[str, SportsmanClassInfo]:
+        self._ensure_fresh()
+        return self._classes
+
+    def sportsman_class(self, name: str) -> SportsmanClassInfo:
+        """Класс по названию, неизвестный класс - с символом по умолчанию"""
+        info = self.sportsman_classes().get(name)
+        if info is None:
+            return SportsmanClassInfo(name, None, DEFAULT_EMOJI)
+        return info
+
+    def sportsman_class_by_id(self, pk: int) -> SportsmanClassInfo | None:
+        self._ensure_fresh()
+        return self._classes_by_id.get(pk)
+
+    def competition_types(self) -> dict[str, CompetitionTypeInfo]:
+        self._ensure_fresh()
+        return self._competition_types
+
+    def competition_type(self, name: str) -> CompetitionTypeInfo | None:
+        return self.competition_types().get(name)
+
+    def invalidate(self) -> None:
+        """Справочник изменён: новая версия для всех процессов"""
+        with self._lock:
+            self._classes = None
+        try:
+            shared_cache.set(self.VERSION_KEY, time.time_ns(), timeout=None)
+        except RedisError:
+            logger.warning("Не удалось обновить версию справочников в кэше")
+
+
+reference_cache = ReferenceCache(check_interval=settings.REFERENCE_CHECK_INTERVAL)
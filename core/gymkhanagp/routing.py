@@ -0,0 +1,106 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+
+from core.caches import shared_cache
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from .models import Subscription
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RoutingIndex:
+    """Куда рассылать уведомления о результатах.
+
+    routes: (тип соревнования, класс спортсмена) -> telegram chat id подписчиков
+    """
+
+    routes: dict[tuple[str, str], list[int]] = field(default_factory=dict)
+
+    def chat_ids(self, competition_type: str, sportsman_class: str) -> list[int]:
+        return self.routes.get((competition_type, sportsman_class), [])
+
+
+class SubscriberRoutingIndex:
+    """Индекс подписчиков для рассылки уведомлений.
+
+    Строится одним join запросом и хранится в общем кэше (Redis), поэтому
+    рассылка по событию - одно чтение из кэша вместо запросов подписок и
+    SocialAccount на каждого подписчика. Если Redis недоступен, используется
+    копия индекса в памяти процесса. Сбрасывается сигналами gymkhanagp.signals.
+    """
+
+    CACHE_KEY = "routing:subscribers"
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._local: RoutingIndex | None = None
+        self._local_expires_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def build() -> RoutingIndex:
+        index = RoutingIndex()
+        rows = Subscription.objects.filter(
+            user_subscription__is_active=True,
+            user_subscription__user__is_active=True,
+            user_subscription__user__socialaccount__provider="telegram",
+        ).values_list(
+            "competition_type__name",
+            "sportsman_class__name",
+            "user_subscription__user__socialaccount__uid",
+        )
+        for competition_type, sportsman_class, uid in rows:
+            index.routes.setdefault((competition_type, sportsman_class), []).append(
+                int(uid)
+            )
+        logger.info("Построен индекс подписчиков: %s маршрутов", len(index.routes))
+        return index
+
+    def _set_local(self, index: RoutingIndex) -> None:
+        with self._lock:
+            self._local = index
+            self._local_expires_at = time.monotonic() + self.ttl
+
+    def _get_local(self) -> RoutingIndex:
+        with self._lock:
+            if self._local is not None and self._local_expires_at > time.monotonic():
+                return self._local
+        index = self.build()
+        self._set_local(index)
+        return index
+
+    def get(self) -> RoutingIndex:
+        try:
+            index = shared_cache.get(self.CACHE_KEY)
+        except RedisError:
+            logger.warning("Кэш недоступен, используем индекс подписчиков процесса")
+            return self._get_local()
+
+        if index is None:
+            # копия процесса могла устареть, общий индекс строится заново
+            index = self.build()
+            self._set_local(index)
+            try:
+                shared_cache.set(self.CACHE_KEY, index, timeout=self.ttl)
+            except RedisError:
+                logger.warning("Не удалось сохранить индекс подписчиков в кэш")
+        return index
+
+    def chat_ids(self, competition_type: str, sportsman_class: str) -> list[int]:
+        return self.get().chat_ids(competition_type, sportsman_class)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._local = None
+        try:
+            shared_cache.delete(self.CACHE_KEY)
+        except RedisError:
+            logger.warning("Не удалось сбросить индекс подписчиков в кэше")
+
+
+subscriber_index = SubscriberRoutingIndex(ttl=settings.SUBSCRIBER_INDEX_TTL)
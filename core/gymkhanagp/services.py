@@ -0,0 +1,120 @@
+"""
+Изменение подписок одним SQL-запросом (на PostgreSQL).
+
+Общие для бота и сайта операции над Subscription: переключение, подписка и
+отписка на класс в рамках типа соревнований. Запросы выполняются в обход
+ORM-сигналов, поэтому индекс подписчиков сбрасывается здесь после коммита.
+"""
+
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+
+from .models import Subscription
+from .routing import subscriber_index
+
+
+def _table() -> tuple[str, str, str, str]:
+    quote = connection.ops.quote_name
+    opts = Subscription._meta
+    return (
+        quote(opts.db_table),
+        quote(opts.get_field("user_subscription").column),
+        quote(opts.get_field("competition_type").column),
+        quote(opts.get_field("sportsman_class").column),
+    )
+
+
+def _delete(cursor, params: list[int]) -> int:
+    table, user_subscription, competition_type, sportsman_class = _table()
+    cursor.execute(
+        f"DELETE FROM {table} WHERE {user_subscription} = %s"
+        f" AND {competition_type} = %s AND {sportsman_class} = %s",
+        params,
+    )
+    return cursor.rowcount
+
+
+def _insert(params: list[int]) -> None:
+    Subscription.objects.bulk_create(
+        [
+            Subscription(
+                user_subscription_id=params[0],
+                competition_type_id=params[1],
+                sportsman_class_id=params[2],
+            )
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def toggle_subscription(
+    user_subscription_id: int, competition_type_id: int, sportsman_class_id: int
+) -> bool:
+    """Переключает подписку на класс в типе соревнований.
+
+    Возвращает True, если после переключения пользователь подписан. На
+    PostgreSQL удаление и вставка - один запрос (CTE с DELETE ... RETURNING и
+    INSERT ... ON CONFLICT), параллельные нажатия не создают дублей и не
+    падают на уникальном ограничении. На других базах (SQLite в тестах) это
+    не один запрос: DELETE и, если удалять было нечего, INSERT выполняются
+    отдельными запросами в одной транзакции.
+    """
+    params = [user_subscription_id, competition_type_id, sportsman_class_id]
+    if connection.vendor == "postgresql":
+        table, user_subscription, competition_type, sportsman_class = _table()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH deleted AS (
+                    DELETE FROM {table}
+                    WHERE {user_subscription} = %s
+                      AND {competition_type} = %s
+                      AND {sportsman_class} = %s
+                    RETURNING 1
+                ), inserted AS (
+                    INSERT INTO {table}
+                        ({user_subscription}, {competition_type}, {sportsman_class})
+                    SELECT CAST(%s AS bigint), CAST(%s AS bigint), CAST(%s AS bigint)
+                    WHERE NOT EXISTS (SELECT 1 FROM deleted)
+                    ON CONFLICT DO NOTHING
+                    RETURNING 1
+                )
+                SELECT NOT EXISTS (SELECT 1 FROM deleted)
+                """,
+                params + params,
+            )
+            subscribed = cursor.fetchone()[0]
+    else:
+        with transaction.atomic(), connection.cursor() as cursor:
+            subscribed = not _delete(cursor, params)
+            if subscribed:
+                _insert(params)
+    transaction.on_commit(subscriber_index.invalidate)
+    return subscribed
+
+
+def subscribe(
+    user_subscription_id: int, competition_type_id: int, sportsman_class_id: int
+) -> None:
+    """Подписка на класс, повторная подписка ничего не меняет"""
+    _insert([user_subscription_id, competition_type_id, sportsman_class_id])
+    transaction.on_commit(subscriber_index.invalidate)
+
+
+def unsubscribe(
+    user_subscription_id: int, competition_type_id: int, sportsman_class_id: int
+) -> bool:
+    """Отписка от класса, False - подписки не было"""
+    params = [user_subscription_id, competition_type_id, sportsman_class_id]
+    with connection.cursor() as cursor:
+        deleted = _delete(cursor, params)
+    transaction.on_commit(subscriber_index.invalidate)
+    return bool(deleted)
+
+
+async def atoggle_subscription(
+    user_subscription_id: int, competition_type_id: int, sportsman_class_id: int
+) -> bool:
+    return await sync_to_async(toggle_subscription)(
+        user_subscription_id, competition_type_id, sportsman_class_id
+    )
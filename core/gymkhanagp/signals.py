@@ -1,10 +1,18 @@
 import logging
 
+from allauth.socialaccount.models import SocialAccount
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from .models import UserSubscription
+from .models import (
+    CompetitionTypeModel,
+    SportsmanClassModel,
+    Subscription,
+    UserSubscription,
+)
+from .reference import reference_cache
+from .routing import subscriber_index
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -20,3 +28,40 @@ def create_telegram_user_subscription(sender, instance, created, **kwargs):
         UserSubscription.objects.create(
             user=instance,
         )
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+@receiver(post_save, sender=UserSubscription)
+@receiver(post_delete, sender=UserSubscription)
+@receiver(post_save, sender=SocialAccount)
+@receiver(post_delete, sender=SocialAccount)
+def invalidate_subscriber_index(sender, instance, **kwargs):
+    """
+    Сигнал для сброса индекса подписчиков при изменении подписок и аккаунтов Telegram.
+    """
+    logger.debug("Изменён %s, сбрасываем индекс подписчиков", instance)
+    subscriber_index.invalidate()
+
+
+@receiver(post_save, sender=User)
+def invalidate_subscriber_index_on_user(sender, instance, update_fields=None, **kwargs):
+    """
+    Сигнал для сброса индекса подписчиков при смене активности пользователя.
+    Сохранения отдельных полей (например last_login) индекс не затрагивают.
+    """
+    if update_fields is None or "is_active" in update_fields:
+        subscriber_index.invalidate()
+
+
+@receiver(post_save, sender=SportsmanClassModel)
+@receiver(post_delete, sender=SportsmanClassModel)
+@receiver(post_save, sender=CompetitionTypeModel)
+@receiver(post_delete, sender=CompetitionTypeModel)
+def invalidate_reference_cache(sender, instance, **kwargs):
+    """
+    Сигнал для сброса справочников в памяти процессов при изменении классов
+    и типов соревнований.
+    """
+    logger.debug("Изменён %s, сбрасываем справочники", instance)
+    reference_cache.invalidate()
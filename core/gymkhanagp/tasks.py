@@ -1,10 +1,33 @@
 import logging
 
+from allauth.socialaccount.models import SocialAccount
 from asgiref.sync import async_to_sync
-from telegram_bot.utils.messages import send_telegram_message
+from celery import chord
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, transaction
+from kombu.exceptions import OperationalError as BrokerError
+from redis.exceptions import RedisError
+from telegram_bot.sender import enqueue_messages
+from telegram_bot.undeliverable import undeliverable_chats
+from telegram_bot.utils.messages import (
+    BLOCKED,
+    DUPLICATE,
+    FAILED,
+    SENT,
+    UNREACHABLE,
+    send_telegram_message,
+    send_telegram_messages,
+)
 
 from core import celery_app
 
+from .digest import DigestEvent, notification_digest
+from .lanes import class_lanes
+from .models import UserSubscription
+from .routing import subscriber_index
+
+User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
@@ -12,16 +35,240 @@ logger = logging.getLogger(__name__)
     bind=True,
     max_retries=4,
     default_retry_delay=30,
-    retry_backoff=True,
-    retry_backoff_max=600,
-    retry_jitter=True,
     acks_late=True,
-    rate_limit="14/s",
     reject_on_worker_lost=True,
-    autoretry_for=(Exception,),
 )
-def send_telegram_message_task(self, telegram_id: int, message: str) -> str:
-    # Высылаем сообщение пользователю
+def send_telegram_message_task(
+    self, telegram_id: int, message: str, idempotency_key: str | None = None
+) -> str:
+    """Отправка сообщения пользователю.
+
+    Повторяется только недоступность Telegram: паузу RetryAfter отправка уже
+    выдержала, а отклонённое сообщение или заблокированный бот повтором
+    не исправить.
+    """
     logger.info("Запущена задача по отправке сообщения")
-    async_to_sync(send_telegram_message)(telegram_id, message)
+    status = async_to_sync(send_telegram_message)(telegram_id, message, idempotency_key)
+    if status == UNREACHABLE:
+        raise self.retry(countdown=self.default_retry_delay * 2**self.request.retries)
     return f"[{telegram_id}]: {message}"
+
+
+@celery_app.task(
+    bind=True,
+    max_retries=4,
+    default_retry_delay=30,
+    acks_late=True,
+    reject_on_worker_lost=True,
+)
+def send_telegram_broadcast_task(
+    self, chat_ids: list[int], message: str, idempotency_key: str | None = None
+) -> dict:
+    """Рассылка одного сообщения списку чатов в одной задаче.
+
+    Отправка идёт с темпом TELEGRAM_BROADCAST_RATE сообщений в секунду, итог по
+    всем получателям сохраняется одной записью результата задачи. При повторе
+    сообщение уходит только тем, кому доставка не удалась, а с ключом
+    идемпотентности не уходит и тем, кому уже было доставлено.
+    """
+    logger.info("Запущена рассылка сообщения %s чатам", len(chat_ids))
+    outcomes = async_to_sync(send_telegram_messages)(
+        chat_ids, message, settings.TELEGRAM_BROADCAST_RATE, idempotency_key
+    )
+    failed = [
+        chat_id
+        for chat_id, status in outcomes.items()
+        if status in (FAILED, UNREACHABLE)
+    ]
+    summary = {
+        SENT: sum(status == SENT for status in outcomes.values()),
+        BLOCKED: [chat_id for chat_id, status in outcomes.items() if status == BLOCKED],
+        FAILED: failed,
+        DUPLICATE: sum(status == DUPLICATE for status in outcomes.values()),
+        "retries": self.request.retries,
+    }
+    if failed and self.request.retries < self.max_retries:
+        logger.warning("Повторная отправка %s чатам", len(failed))
+        send_telegram_broadcast_task.apply_async(
+            (failed, message, idempotency_key),
+            countdown=self.default_retry_delay * 2**self.request.retries,
+            retries=self.request.retries + 1,
+        )
+    return summary
+
+
+def broadcast_telegram_message(
+    chat_ids: list[int], message: str, idempotency_key: str | None = None
+) -> None:
+    """Постановка рассылки пачками по TELEGRAM_BROADCAST_BATCH_SIZE чатов
+    или в очередь сервиса run_telegram_sender (TELEGRAM_SENDER_BACKEND=redis).
+    Чаты, заблокировавшие бота, отсекаются до постановки.
+    """
+    chat_ids = undeliverable_chats.filter(chat_ids)
+    if not chat_ids:
+        return
+
+    if settings.TELEGRAM_SENDER_BACKEND == "redis":
+        enqueue_messages(chat_ids, message, idempotency_key)
+        return
+
+    batch_size = settings.TELEGRAM_BROADCAST_BATCH_SIZE
+    for start in range(0, len(chat_ids), batch_size):
+        send_telegram_broadcast_task.delay(
+            chat_ids[start : start + batch_size], message, idempotency_key
+        )
+
+
+def broadcast_class_message(
+    sport_class: str,
+    chat_ids: list[int],
+    message: str,
+    idempotency_key: str | None = None,
+) -> None:
+    """Рассылка уведомления подписчикам класса.
+
+    Пачки ставятся в очередь класса (gymkhanagp.lanes) и отправляются по кругу
+    с другими классами задачей drain_class_lanes. Сервис run_telegram_sender
+    (TELEGRAM_SENDER_BACKEND=redis) получает сообщения сразу. Если Redis
+    недоступен, пачки отправляются задачами без очереди класса.
+    """
+    if settings.TELEGRAM_SENDER_BACKEND == "redis":
+        broadcast_telegram_message(chat_ids, message, idempotency_key)
+        return
+
+    chat_ids = undeliverable_chats.filter(chat_ids)
+    if not chat_ids:
+        return
+
+    batch_size = settings.TELEGRAM_BROADCAST_BATCH_SIZE
+    batches = [
+        chat_ids[start : start + batch_size]
+        for start in range(0, len(chat_ids), batch_size)
+    ]
+    queued = 0
+    try:
+        for batch in batches:
+            class_lanes.push(sport_class, batch, message, idempotency_key)
+            queued += 1
+        if class_lanes.claim_drain():
+            drain_class_lanes.delay()
+    except RedisError as e:
+        # поставленные пачки отправит resume_class_lanes, когда Redis вернётся
+        logger.warning("Очереди классов недоступны, рассылаем напрямую: %s", e)
+        for batch in batches[queued:]:
+            send_telegram_broadcast_task.delay(batch, message, idempotency_key)
+
+
+@celery_app.task
+def drain_class_lanes() -> int:
+    """Один круг рассылки по очередям классов.
+
+    Следующий круг запускается callback-ом chord, когда пачки этого круга
+    отправлены, поэтому пачки класса, пришедшие позже, уходят уже в нём.
+    """
+    batches = class_lanes.pop_round(settings.TELEGRAM_CLASS_WEIGHTS)
+    if batches:
+        class_lanes.extend_drain()
+        chord(
+            send_telegram_broadcast_task.si(
+                batch["chat_ids"], batch["message"], batch["key"]
+            )
+            for batch in batches
+        )(drain_class_lanes.si())
+        return len(batches)
+
+    class_lanes.release_drain()
+    # пачка, поставленная пока отметка была занята, сама круг не запустила
+    if class_lanes.pending() and class_lanes.claim_drain():
+        drain_class_lanes.delay()
+    return 0
+
+
+@celery_app.task
+def resume_class_lanes() -> bool:
+    """Запуск кругов, если очереди классов не пусты, а круг не идёт
+    (воркер упал посреди круга и отметка истекла)
+    """
+    if class_lanes.pending() and class_lanes.claim_drain():
+        logger.warning("Возобновлена рассылка по очередям классов")
+        drain_class_lanes.delay()
+        return True
+    return False
+
+
+@celery_app.task(acks_late=True, reject_on_worker_lost=True)
+def flush_notification_digest(chat_id: int) -> int:
+    """Отправка накопленной за окно сводки уведомлений одному чату"""
+    events = notification_digest.pop(chat_id)
+    if events:
+        broadcast_telegram_message(
+            [chat_id],
+            notification_digest.render(events),
+            notification_digest.idempotency_key(events),
+        )
+    return len(events)
+
+
+def coalesce_notification(chat_ids: list[int], event: DigestEvent) -> None:
+    """Откладывает уведомление в сводку чатов (NOTIFICATION_DIGEST_ENABLED).
+
+    Если Redis недоступен, уведомление отправляется сразу.
+    """
+    try:
+        opened = notification_digest.add(chat_ids, event)
+    except RedisError as e:
+        logger.warning("Буфер уведомлений недоступен, отправляем сразу: %s", e)
+        broadcast_telegram_message(
+            chat_ids, notification_digest.render([event]), event.key or None
+        )
+        return
+
+    for chat_id in opened:
+        flush_notification_digest.apply_async(
+            (chat_id,), countdown=notification_digest.window
+        )
+
+
+@celery_app.task(
+    max_retries=5,
+    default_retry_delay=30,
+    retry_backoff=True,
+    retry_backoff_max=600,
+    # недоступность базы, брокера или Redis, ошибки в данных повтор не исправит
+    autoretry_for=(OperationalError, BrokerError, RedisError),
+)
+def dispatch_notification_outbox() -> int:
+    """Разбор очереди уведомлений после коммита импорта"""
+    from .outbox import dispatch_outbox
+
+    return dispatch_outbox()
+
+
+@celery_app.task
+def deactivate_undeliverable_users() -> dict:
+    """Пакетная деактивация пользователей, заблокировавших бота.
+
+    Пользователи и их подписки отключаются парой UPDATE на пачку вместо
+    save() на каждого, после чего индекс подписчиков сбрасывается.
+    """
+    deactivated = 0
+    while chat_ids := undeliverable_chats.pop_pending(
+        settings.TELEGRAM_UNDELIVERABLE_BATCH_SIZE
+    ):
+        user_ids = SocialAccount.objects.filter(
+            provider="telegram", uid__in=[str(chat_id) for chat_id in chat_ids]
+        ).values_list("user_id", flat=True)
+        with transaction.atomic():
+            deactivated += User.objects.filter(id__in=user_ids, is_active=True).update(
+                is_active=False
+            )
+            UserSubscription.objects.filter(
+                user_id__in=user_ids, is_active=True
+            ).update(is_active=False)
+
+    if deactivated:
+        # update() не отправляет сигналы, индекс сбрасывается вручную
+        subscriber_index.invalidate()
+    stats = {"deactivated": deactivated, **undeliverable_chats.stats()}
+    logger.info("Недоставляемые чаты: %s", stats)
+    return stats
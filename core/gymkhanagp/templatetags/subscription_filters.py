@@ -10,17 +10,13 @@ def is_subscribed(competition_type, user_subscriptions):
 
 
 @register.filter(name="is_subscribed_class")
-def is_subscribed_class(sport_class, user_subscriptions):
+def is_subscribed_class(sport_class, subscribed_class_ids):
     """
     Фильтр проверяющий подписан ли пользователь на данный класс.
-    В данный момент проверка проводится для ggp, поэтому в запросе отправляется запрос с параметром competition_type=1
+    Классы подписок передаются уже отобранными по выбранному типу соревнований.
 
     :param sport_class:
-    :param user_subscriptions:
+    :param subscribed_class_ids:
     :return:
     """
-    competition_type_id = 1
-    for _, sc_id_ in user_subscriptions:
-        if sc_id_ == sport_class.id and _ == competition_type_id:
-            return True
-    return False
+    return sport_class.id in subscribed_class_ids
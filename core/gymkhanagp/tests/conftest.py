@@ -1,9 +1,18 @@
 import pytest
 
 from django.contrib.auth.models import User
+from gymkhanagp.reference import reference_cache
 from .factories import UserFactory, SportsmanClassFactory, SubscriptionFactory
 
 
+@pytest.fixture(autouse=True)
+def clear_reference_cache():
+    """Справочники процесса не должны переживать откат БД между тестами"""
+    reference_cache.invalidate()
+    yield
+    reference_cache.invalidate()
+
+
 @pytest.fixture
 def user(db):
     return UserFactory()
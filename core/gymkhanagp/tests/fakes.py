@@ -0,0 +1,74 @@
+class FakePipeline:
+    """Конвейер Redis в памяти: команды выполняются по execute()."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+
+        return command
+
+    def execute(self):
+        replies = [
+            getattr(self.redis, name)(*args, **kwargs)
+            for name, args, kwargs in self.commands
+        ]
+        self.commands = []
+        return replies
+
+
+class FakeRedis:
+    """Списки, множества и строки Redis в памяти, без сроков жизни."""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def rpush(self, key, *values):
+        self.data.setdefault(key, []).extend(values)
+        return len(self.data[key])
+
+    def lrange(self, key, start, end):
+        return list(self.data.get(key, []))
+
+    def lpop(self, key, count=None):
+        items = self.data.get(key)
+        if not items:
+            return None
+        taken, self.data[key] = items[: count or 1], items[count or 1 :]
+        if not self.data[key]:
+            del self.data[key]
+        return taken if count else taken[0]
+
+    def sadd(self, key, *members):
+        self.data.setdefault(key, set()).update(members)
+
+    def srem(self, key, *members):
+        self.data.get(key, set()).difference_update(members)
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    def scard(self, key):
+        return len(self.data.get(key, set()))
+
+    def expire(self, key, seconds):
+        return key in self.data
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, ex=None, px=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
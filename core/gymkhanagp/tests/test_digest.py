@@ -0,0 +1,132 @@
+from unittest.mock import patch
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from gymkhanagp.digest import DigestEvent, NotificationDigest
+from gymkhanagp.models import NotificationOutbox
+from gymkhanagp.outbox import Fanout, route_class_notification
+from gymkhanagp.routing import RoutingIndex
+from gymkhanagp.tasks import coalesce_notification, flush_notification_digest
+
+from .factories import SportsmanClassFactory
+from .fakes import FakeRedis
+
+
+@pytest.fixture
+def redis():
+    fake = FakeRedis()
+    with patch("gymkhanagp.digest.get_redis", return_value=fake):
+        yield fake
+
+
+def event(text, stage="Этап 1", sport_class="🟩 [C1]"):
+    return DigestEvent(stage, sport_class, text)
+
+
+@pytest.mark.django_db
+class TestNotificationDigest:
+    """Тесты буфера сводки уведомлений"""
+
+    def test_first_event_opens_window_once(self, redis):
+        digest = NotificationDigest(window=60)
+
+        assert digest.add([1, 2], event("a")) == [1, 2]
+        assert digest.add([2, 3], event("b")) == [3]
+
+        assert digest.pop(2) == [event("a"), event("b")]
+        assert digest.pop(2) == []
+        # после сводки следующее событие открывает новое окно
+        assert digest.add([2], event("c")) == [2]
+
+    def test_render_groups_by_stage_and_class(self):
+        text = NotificationDigest.render(
+            [
+                event("🆕 A"),
+                event("🆕 B", stage="Этап 2"),
+                event("⬆️ C", sport_class="🟦 [B]"),
+                event("⬆️ D"),
+            ]
+        )
+
+        assert text == (
+            "Изменения результатов (4):\n"
+            "\nЭтап 1\n\n🟩 [C1]\n🆕 A\n\n⬆️ D\n\n\n🟦 [B]\n⬆️ C\n\n"
+            "\nЭтап 2\n\n🟩 [C1]\n🆕 B\n"
+        )
+
+    def test_single_event_keeps_plain_format(self):
+        assert NotificationDigest.render([event("🆕 A")]) == "Этап 1\n\n🟩 [C1] 🆕 A\n"
+
+    @patch("gymkhanagp.tasks.broadcast_telegram_message")
+    @patch.object(flush_notification_digest, "apply_async")
+    def test_one_message_per_user_after_window(
+        self, mock_schedule, mock_broadcast, redis
+    ):
+        coalesce_notification([1, 2], event("🆕 A"))
+        coalesce_notification([1], event("⬆️ B"))
+
+        assert [c.args[0] for c in mock_schedule.call_args_list] == [(1,), (2,)]
+        mock_broadcast.assert_not_called()
+
+        assert flush_notification_digest(1) == 2
+        mock_broadcast.assert_called_once()
+        chat_ids, message, key = mock_broadcast.call_args.args
+        assert chat_ids == [1]
+        assert "🆕 A" in message and "⬆️ B" in message
+        assert key == NotificationDigest.idempotency_key([event("⬆️ B"), event("🆕 A")])
+
+    @patch("gymkhanagp.tasks.broadcast_telegram_message")
+    @patch("gymkhanagp.digest.get_redis")
+    def test_redis_unavailable_sends_immediately(self, mock_redis, mock_broadcast):
+        mock_redis.return_value.pipeline.return_value.execute.side_effect = (
+            RedisConnectionError("refused")
+        )
+
+        coalesce_notification([1, 2], DigestEvent("Этап 1", "🟩 [C1]", "🆕 A", "k"))
+
+        mock_broadcast.assert_called_once_with([1, 2], "Этап 1\n\n🟩 [C1] 🆕 A\n", "k")
+
+
+@pytest.mark.django_db
+class TestOutboxDigest:
+    """Тесты отправки уведомлений outbox через сводку"""
+
+    @pytest.fixture(autouse=True)
+    def routing(self, settings):
+        settings.NOTIFICATION_DIGEST_ENABLED = True
+        SportsmanClassFactory(name="C1", subscribe_emoji="🟩")
+        index = RoutingIndex(routes={("ggp", "C1"): [101]})
+        with patch("gymkhanagp.outbox.subscriber_index") as mock_index:
+            mock_index.get.return_value = index
+            yield
+
+    @staticmethod
+    def outbox_event(**kwargs):
+        return NotificationOutbox(
+            competition_type="ggp",
+            sportsman_class="C1",
+            entity_title="Этап",
+            icon="🆕",
+            message="Результат",
+            **kwargs,
+        )
+
+    @patch("gymkhanagp.outbox.coalesce_notification")
+    def test_regular_change_goes_to_digest(self, mock_coalesce):
+        assert route_class_notification(self.outbox_event()) is None
+
+        mock_coalesce.assert_called_once_with(
+            [101], DigestEvent("Этап", "🟩 [C1]", "🆕 Результат")
+        )
+
+    @patch("gymkhanagp.outbox.coalesce_notification")
+    def test_leader_bypasses_window(self, mock_coalesce):
+        fanout = route_class_notification(self.outbox_event(leader=True))
+
+        mock_coalesce.assert_not_called()
+        assert fanout == Fanout(
+            "C1",
+            [101],
+            "🆕 Этап\n\n ❗❗ Новый лидер этапа: ❗❗\n\n🟩 [C1] Результат\n",
+        )
@@ -0,0 +1,234 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from redis.exceptions import ConnectionError as RedisConnectionError
+from telegram_bot.utils.messages import SENT
+
+from gymkhanagp.lanes import ACTIVE_LANES_KEY, DRAIN_KEY, class_lanes
+from gymkhanagp.models import NotificationOutbox
+from gymkhanagp.outbox import (
+    Fanout,
+    dispatch_outbox,
+    fair_order,
+    route_class_notification,
+)
+from gymkhanagp.routing import RoutingIndex
+from gymkhanagp.tasks import (
+    broadcast_class_message,
+    drain_class_lanes,
+    resume_class_lanes,
+)
+
+from .factories import SportsmanClassFactory
+from .fakes import FakeRedis
+
+
+class LaneRedis(FakeRedis):
+    """FakeRedis со скриптом круга gymkhanagp.lanes"""
+
+    def register_script(self, script):
+        def pop_round(keys, args):
+            prefix, default_weight, *pairs = args
+            weights = dict(zip(pairs[::2], pairs[1::2]))
+            batches = []
+            for sport_class in sorted(self.smembers(keys[0])):
+                key = prefix + sport_class
+                batches += (
+                    self.lpop(key, weights.get(sport_class, default_weight)) or []
+                )
+                if key not in self.data:
+                    self.srem(keys[0], sport_class)
+            return batches
+
+        return pop_round
+
+
+@pytest.fixture
+def routing(db):
+    SportsmanClassFactory(name="C1", subscribe_emoji="🟩")
+    SportsmanClassFactory(name="B", subscribe_emoji="🟦")
+    index = RoutingIndex(
+        routes={
+            ("ggp", "C1"): [101, 102],
+            ("base", "C1"): [103],
+            ("ggp", "B"): [201],
+        },
+    )
+    with patch("gymkhanagp.outbox.subscriber_index") as mock_index:
+        mock_index.get.return_value = index
+        yield
+
+
+def make_event(message="Новый результат", **kwargs):
+    kwargs.setdefault("sportsman_class", "C1")
+    return NotificationOutbox(
+        competition_type="ggp",
+        entity_title="Этап",
+        message=message,
+        **kwargs,
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("routing")
+class TestNotificationOutboxDispatch:
+    """Тесты разбора outbox уведомлений"""
+
+    def test_routed_to_class_subscribers(self):
+        route_class_notification(make_event())
+
+        with CaptureQueriesContext(connection) as queries:
+            fanout = route_class_notification(make_event(event_key="stage:1:1:1"))
+
+        # справочник классов уже в памяти процесса
+        assert len(queries) == 0
+        assert fanout == Fanout(
+            "C1", [101, 102], "Этап\n\n🟩 [C1] Новый результат\n", "stage:1:1:1"
+        )
+
+    @patch("gymkhanagp.outbox.broadcast_class_message")
+    def test_batches_marked_delivered_in_bulk(self, mock_broadcast):
+        NotificationOutbox.objects.bulk_create(
+            [make_event(f"Результат {i}") for i in range(5)]
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            assert dispatch_outbox(batch_size=2) == 5
+
+        assert mock_broadcast.call_count == 5
+        assert not NotificationOutbox.objects.pending().exists()
+        # на пачку: выборка и один UPDATE, последняя выборка пустая
+        updates = [q for q in queries if q["sql"].startswith("UPDATE")]
+        assert len(updates) == 3
+        # повторный запуск ничего не отправляет
+        assert dispatch_outbox() == 0
+        assert mock_broadcast.call_count == 5
+
+    @patch("gymkhanagp.outbox.broadcast_class_message")
+    def test_failure_keeps_batch_pending(self, mock_broadcast):
+        NotificationOutbox.objects.bulk_create(
+            [make_event(f"Результат {i}") for i in range(3)]
+        )
+        mock_broadcast.side_effect = [None, ConnectionError("broker"), None]
+
+        with pytest.raises(ConnectionError):
+            dispatch_outbox()
+
+        # повтор разберёт всю пачку, доставленное отсекут ключи идемпотентности
+        assert NotificationOutbox.objects.pending().count() == 3
+
+    @patch("gymkhanagp.outbox.broadcast_class_message")
+    def test_popular_class_does_not_starve_others(self, mock_broadcast, settings):
+        settings.TELEGRAM_BROADCAST_BATCH_SIZE = 1
+        NotificationOutbox.objects.bulk_create(
+            [make_event(f"Результат {i}") for i in range(3)]
+            + [make_event("Класс B", sportsman_class="B")]
+        )
+
+        dispatch_outbox()
+
+        recipients = [call.args[1] for call in mock_broadcast.call_args_list]
+        # первое уведомление класса B уходит во втором круге, а не после всех C1
+        assert recipients[:2] == [[101], [201]]
+        assert len(recipients) == 7
+
+
+@pytest.mark.django_db
+class TestFairOrder:
+    """Тесты взвешенного кругового порядка пачек"""
+
+    def test_weighted_round_robin(self):
+        fanouts = [
+            Fanout("C1", [1, 2, 3, 4], "c1"),
+            Fanout("B", [5, 6, 7, 8], "b"),
+            Fanout("D1", [9], "d1"),
+        ]
+
+        order = [
+            (fanout.sport_class, chat_ids)
+            for fanout, chat_ids in fair_order(fanouts, 1, {"B": 2})
+        ]
+
+        assert order == [
+            ("C1", [1]),
+            ("B", [5]),
+            ("B", [6]),
+            ("D1", [9]),
+            ("C1", [2]),
+            ("B", [7]),
+            ("B", [8]),
+            ("C1", [3]),
+            ("C1", [4]),
+        ]
+
+
+@pytest.fixture
+def lanes_redis(settings):
+    settings.TELEGRAM_SENDER_BACKEND = "celery"
+    settings.TELEGRAM_BROADCAST_BATCH_SIZE = 1
+    fake = LaneRedis()
+    with patch("gymkhanagp.lanes.get_redis", return_value=fake):
+        yield fake
+
+
+@pytest.mark.django_db
+@patch("gymkhanagp.tasks.send_telegram_messages", new_callable=AsyncMock)
+class TestClassLanes:
+    """Тесты кругового забора пачек из очередей классов"""
+
+    @staticmethod
+    def sent(mock_send) -> list[list[int]]:
+        return [call.args[0] for call in mock_send.await_args_list]
+
+    def test_later_class_not_queued_behind_popular_one(
+        self, mock_send, lanes_redis, settings
+    ):
+        settings.TELEGRAM_CLASS_WEIGHTS = {"C1": 2}
+        mock_send.side_effect = lambda chat_ids, *args: dict.fromkeys(chat_ids, SENT)
+        # пока идёт круг, пачки обоих разборов outbox ждут в очередях классов
+        assert class_lanes.claim_drain()
+        broadcast_class_message("C1", [1, 2, 3, 4, 5], "c1", "stage:1")
+        broadcast_class_message("B", [6, 7], "b", "stage:2")
+
+        drain_class_lanes()
+
+        # круги: B по одной пачке, C1 по две
+        assert self.sent(mock_send) == [[6], [1], [2], [7], [3], [4], [5]]
+        assert mock_send.await_args_list[0].args[3] == "stage:2"
+        assert DRAIN_KEY not in lanes_redis.data
+        assert not lanes_redis.smembers(ACTIVE_LANES_KEY)
+
+    def test_lost_round_resumed(self, mock_send, lanes_redis):
+        mock_send.side_effect = lambda chat_ids, *args: dict.fromkeys(chat_ids, SENT)
+        class_lanes.push("C1", [1], "c1")
+
+        # отметка круга истекла вместе с упавшим воркером
+        assert resume_class_lanes()
+
+        assert self.sent(mock_send) == [[1]]
+        assert not resume_class_lanes()
+
+    def test_direct_dispatch_without_redis(self, mock_send, lanes_redis):
+        mock_send.side_effect = lambda chat_ids, *args: dict.fromkeys(chat_ids, SENT)
+        failure = RedisConnectionError("refused")
+
+        with patch.object(class_lanes, "push", side_effect=[None, failure]) as push:
+            broadcast_class_message("C1", [1, 2, 3], "c1", "stage:1")
+
+        # первая пачка уже в очереди класса, остальные ушли без неё
+        assert push.call_count == 2
+        assert self.sent(mock_send) == [[2], [3]]
+        assert mock_send.await_args_list[0].args[3] == "stage:1"
+
+    @patch("gymkhanagp.tasks.broadcast_telegram_message")
+    def test_sender_service_gets_messages_directly(
+        self, mock_broadcast, mock_send, lanes_redis, settings
+    ):
+        settings.TELEGRAM_SENDER_BACKEND = "redis"
+
+        broadcast_class_message("C1", [1, 2], "c1", "stage:1")
+
+        mock_broadcast.assert_called_once_with([1, 2], "c1", "stage:1")
+        assert not lanes_redis.data
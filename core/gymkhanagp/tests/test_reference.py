@@ -0,0 +1,151 @@
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from gymkhanagp import outbox
+from gymkhanagp.models import NotificationOutbox, SportsmanClassModel
+from gymkhanagp.outbox import dispatch_outbox
+from gymkhanagp.reference import ReferenceCache, reference_cache
+from gymkhanagp.routing import RoutingIndex
+
+from .factories import (
+    CompetitionTypeFactory,
+    SportsmanClassFactory,
+)
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    """Настоящий кэш вместо DummyCache из тестовых настроек."""
+    settings.CACHES = {
+        alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        for alias in ("default", "shared", "fingerprints")
+    }
+    cache.clear()
+
+
+@pytest.mark.django_db
+class TestReferenceCache:
+    """Тесты справочника классов в памяти процесса"""
+
+    def test_loaded_once(self):
+        SportsmanClassFactory(name="C1", subscribe_emoji="🟩")
+
+        with CaptureQueriesContext(connection) as queries:
+            first = reference_cache.sportsman_class("C1")
+            second = reference_cache.sportsman_class("C1")
+
+        # классы и типы соревнований
+        assert len(queries) == 2
+        assert first is second
+        assert first.label == "🟩 [C1]"
+
+    def test_unknown_class_gets_default_emoji(self):
+        assert reference_cache.sportsman_class("X").label == "🟨 [X]"
+
+    def test_saved_class_invalidates(self):
+        sportsman_class = SportsmanClassFactory(name="C1", subscribe_emoji="🟩")
+        reference_cache.sportsman_class("C1")
+
+        sportsman_class.subscribe_emoji = "🟦"
+        sportsman_class.save()
+
+        assert reference_cache.sportsman_class("C1").label == "🟦 [C1]"
+
+    def test_competition_types(self):
+        competition_type = CompetitionTypeFactory(name="ggp")
+        sportsman_class = SportsmanClassFactory(name="C1")
+
+        assert reference_cache.competition_type("ggp").id == competition_type.pk
+        assert reference_cache.competition_type("base") is None
+        assert reference_cache.sportsman_class_by_id(sportsman_class.pk).name == "C1"
+
+    def test_saved_competition_type_invalidates(self):
+        competition_type = CompetitionTypeFactory(name="ggp", description="old")
+        reference_cache.competition_type("ggp")
+
+        competition_type.description = "new"
+        competition_type.save()
+
+        assert reference_cache.competition_type("ggp").description == "new"
+
+    def test_version_change_seen_by_other_process(self, locmem_cache):
+        SportsmanClassFactory(name="C1", subscribe_emoji="🟩")
+        worker = ReferenceCache(check_interval=0)
+        lazy_worker = ReferenceCache(check_interval=3600)
+        worker.sportsman_class("C1")
+        lazy_worker.sportsman_class("C1")
+
+        SportsmanClassModel.objects.filter(name="C1").update(subscribe_emoji="🟦")
+        # сигнал сохранения в другом процессе
+        ReferenceCache(check_interval=0).invalidate()
+
+        assert worker.sportsman_class("C1").subscribe_emoji == "🟦"
+        # версия сверяется не чаще интервала проверки
+        assert lazy_worker.sportsman_class("C1").subscribe_emoji == "🟩"
+
+    def test_cache_unavailable(self):
+        SportsmanClassFactory(name="C1", subscribe_emoji="🟩")
+        worker = ReferenceCache(check_interval=0)
+        error = RedisConnectionError("refused")
+
+        with (
+            patch("gymkhanagp.reference.shared_cache.get", side_effect=error),
+            patch("gymkhanagp.reference.shared_cache.set", side_effect=error),
+        ):
+            assert worker.sportsman_class("C1").label == "🟩 [C1]"
+            worker.invalidate()
+            assert worker.sportsman_class("C1").label == "🟩 [C1]"
+
+
+@pytest.mark.django_db
+@pytest.mark.slow
+def test_benchmark_render_1000_subscribers(settings):
+    """Бенчмарк: рассылка 10 событий классу из 1000 подписчиков."""
+    settings.TELEGRAM_SENDER_BACKEND = "redis"
+    SportsmanClassFactory(name="C1", subscribe_emoji="🟩")
+    NotificationOutbox.objects.bulk_create(
+        NotificationOutbox(
+            competition_type="ggp",
+            sportsman_class="C1",
+            entity_title="Этап",
+            icon="🆕",
+            message=f"Результат {i}",
+            event_key=f"stage:1:{i}:1",
+        )
+        for i in range(10)
+    )
+    index = RoutingIndex(routes={("ggp", "C1"): list(range(1000))})
+    queue_redis = MagicMock()
+    undeliverable_redis = MagicMock()
+    undeliverable_redis.smismember.side_effect = lambda key, ids: [0] * len(ids)
+    render = MagicMock(side_effect=outbox.render_notification)
+
+    with (
+        patch("gymkhanagp.outbox.subscriber_index") as mock_index,
+        patch("gymkhanagp.outbox.render_notification", render),
+        patch("telegram_bot.sender.get_redis", return_value=queue_redis),
+        patch("telegram_bot.undeliverable.get_redis", return_value=undeliverable_redis),
+    ):
+        mock_index.get.return_value = index
+        started_at = time.perf_counter()
+        assert dispatch_outbox() == 10
+        elapsed = time.perf_counter() - started_at
+
+    pipe = queue_redis.pipeline.return_value
+    queued = sum(len(call.args) - 1 for call in pipe.lpush.call_args_list)
+    summary = (
+        f"10 событий x 1000 подписчиков: {elapsed * 1000:.0f}мс, "
+        f"текстов построено {render.call_count}, сохранено {pipe.set.call_count}"
+    )
+    assert render.call_count == 10, summary
+    assert queued == 10_000, summary
+    # текст хранится один раз на пачку рассылки, а не на подписчика
+    assert pipe.set.call_count == 10 * 1000 // settings.TELEGRAM_BROADCAST_BATCH_SIZE, (
+        summary
+    )
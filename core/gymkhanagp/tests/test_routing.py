@@ -0,0 +1,126 @@
+from unittest.mock import patch
+
+import pytest
+from allauth.socialaccount.models import SocialAccount
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from gymkhanagp.routing import SubscriberRoutingIndex, subscriber_index
+
+from ..models import Subscription
+from .factories import (
+    CompetitionTypeFactory,
+    SportsmanClassFactory,
+    UserFactory,
+)
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    """Настоящий кэш вместо DummyCache из тестовых настроек."""
+    settings.CACHES = {
+        alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        for alias in ("default", "shared", "fingerprints")
+    }
+    subscriber_index.invalidate()
+    yield
+    subscriber_index.invalidate()
+
+
+@pytest.fixture
+def competition_type(db):
+    return CompetitionTypeFactory(name="ggp")
+
+
+@pytest.fixture
+def sportsman_class(db):
+    return SportsmanClassFactory(name="C1", subscribe_emoji="🟩")
+
+
+def make_subscriber(telegram_id, competition_type, sportsman_class, **user_kwargs):
+    user = UserFactory(**user_kwargs)
+    if telegram_id:
+        SocialAccount.objects.create(
+            user=user,
+            provider="telegram",
+            uid=str(telegram_id),
+            extra_data={"id": telegram_id},
+        )
+    Subscription.objects.create(
+        user_subscription=user.subscriptions,
+        competition_type=competition_type,
+        sportsman_class=sportsman_class,
+    )
+    return user
+
+
+@pytest.mark.django_db
+class TestSubscriberRoutingIndex:
+    def test_build_routes_only_active_telegram_users(
+        self, competition_type, sportsman_class
+    ):
+        make_subscriber(101, competition_type, sportsman_class)
+        make_subscriber(102, competition_type, sportsman_class, is_active=False)
+        make_subscriber(None, competition_type, sportsman_class)
+
+        with CaptureQueriesContext(connection) as queries:
+            index = SubscriberRoutingIndex(ttl=60).build()
+
+        assert len(queries) == 1
+        assert index.chat_ids("ggp", "C1") == [101]
+        assert index.chat_ids("base", "C1") == []
+
+    def test_cached_index_read_without_queries(
+        self, locmem_cache, competition_type, sportsman_class
+    ):
+        make_subscriber(101, competition_type, sportsman_class)
+        subscriber_index.get()
+
+        with CaptureQueriesContext(connection) as queries:
+            chat_ids = subscriber_index.chat_ids("ggp", "C1")
+
+        assert chat_ids == [101]
+        assert len(queries) == 0
+
+    def test_invalidated_by_subscription_and_user_changes(
+        self, locmem_cache, competition_type, sportsman_class
+    ):
+        user = make_subscriber(101, competition_type, sportsman_class)
+        assert subscriber_index.chat_ids("ggp", "C1") == [101]
+
+        make_subscriber(102, competition_type, sportsman_class)
+        assert subscriber_index.chat_ids("ggp", "C1") == [101, 102]
+
+        user.is_active = False
+        user.save()
+        assert subscriber_index.chat_ids("ggp", "C1") == [102]
+
+        Subscription.objects.filter(user_subscription__user__is_active=True).delete()
+        assert subscriber_index.chat_ids("ggp", "C1") == []
+
+    def test_last_login_update_keeps_index(
+        self, locmem_cache, competition_type, sportsman_class
+    ):
+        user = make_subscriber(101, competition_type, sportsman_class)
+        subscriber_index.get()
+
+        with patch.object(subscriber_index, "invalidate") as mock_invalidate:
+            user.save(update_fields=["last_login"])
+
+        mock_invalidate.assert_not_called()
+
+    def test_local_fallback_when_cache_unavailable(
+        self, competition_type, sportsman_class
+    ):
+        make_subscriber(101, competition_type, sportsman_class)
+        index = SubscriberRoutingIndex(ttl=60)
+
+        with patch(
+            "gymkhanagp.routing.shared_cache.get", side_effect=RedisConnectionError
+        ):
+            assert index.chat_ids("ggp", "C1") == [101]
+            with CaptureQueriesContext(connection) as queries:
+                assert index.chat_ids("ggp", "C1") == [101]
+
+        assert len(queries) == 0
@@ -0,0 +1,159 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from gymkhanagp import services
+from gymkhanagp.models import Subscription
+
+from .factories import (
+    CompetitionTypeFactory,
+    SportsmanClassFactory,
+    UserSubscriptionFactory,
+)
+
+
+@pytest.fixture
+def tap_args(db):
+    """Подписка пользователя, GGP и базовые фигуры, класс C1"""
+    user_subscription = UserSubscriptionFactory()
+    ggp = CompetitionTypeFactory(name="ggp")
+    base = CompetitionTypeFactory(name="base")
+    sportsman_class = SportsmanClassFactory(name="C1")
+    return user_subscription.id, ggp.id, base.id, sportsman_class.id
+
+
+@pytest.mark.django_db
+class TestToggleSubscription:
+    def test_toggle(self, tap_args):
+        user_subscription, ggp, _, sportsman_class = tap_args
+
+        assert services.toggle_subscription(user_subscription, ggp, sportsman_class)
+        assert Subscription.objects.filter(competition_type_id=ggp).count() == 1
+        assert not services.toggle_subscription(user_subscription, ggp, sportsman_class)
+        assert not Subscription.objects.exists()
+
+    def test_toggle_on_off_on(self, tap_args):
+        """Семантика переключения на любой базе, без проверки числа запросов"""
+        user_subscription, ggp, _, sportsman_class = tap_args
+
+        results = [
+            services.toggle_subscription(user_subscription, ggp, sportsman_class)
+            for _ in range(3)
+        ]
+
+        assert results == [True, False, True]
+        assert list(
+            Subscription.objects.values_list(
+                "user_subscription_id", "competition_type_id", "sportsman_class_id"
+            )
+        ) == [(user_subscription, ggp, sportsman_class)]
+
+    def test_scoped_by_competition_type(self, tap_args):
+        user_subscription, ggp, base, sportsman_class = tap_args
+        services.subscribe(user_subscription, base, sportsman_class)
+        services.subscribe(user_subscription, ggp, sportsman_class)
+
+        assert not services.toggle_subscription(user_subscription, ggp, sportsman_class)
+
+        assert list(Subscription.objects.values_list("competition_type_id")) == [
+            (base,)
+        ]
+
+    def test_subscribe_unsubscribe_idempotent(self, tap_args):
+        user_subscription, ggp, _, sportsman_class = tap_args
+
+        services.subscribe(user_subscription, ggp, sportsman_class)
+        services.subscribe(user_subscription, ggp, sportsman_class)
+        assert Subscription.objects.count() == 1
+
+        assert services.unsubscribe(user_subscription, ggp, sportsman_class)
+        assert not services.unsubscribe(user_subscription, ggp, sportsman_class)
+
+    @pytest.mark.skipif(
+        connection.vendor != "postgresql",
+        reason="переключение одним запросом - только PostgreSQL (CI_USE_POSTGRES)",
+    )
+    def test_toggle_is_single_statement(self, tap_args):
+        user_subscription, ggp, base, sportsman_class = tap_args
+        services.subscribe(user_subscription, base, sportsman_class)
+
+        with CaptureQueriesContext(connection) as queries:
+            assert services.toggle_subscription(user_subscription, ggp, sportsman_class)
+        assert len(queries) == 1
+        assert Subscription.objects.filter(competition_type_id=ggp).count() == 1
+
+        with CaptureQueriesContext(connection) as queries:
+            assert not services.toggle_subscription(
+                user_subscription, ggp, sportsman_class
+            )
+        assert len(queries) == 1
+        # подписка на другой тип соревнований не затронута
+        assert list(Subscription.objects.values_list("competition_type_id")) == [
+            (base,)
+        ]
+
+    def test_invalidates_subscriber_index_on_commit(
+        self, tap_args, monkeypatch, django_capture_on_commit_callbacks
+    ):
+        user_subscription, ggp, _, sportsman_class = tap_args
+        invalidated = []
+        monkeypatch.setattr(
+            services.subscriber_index, "invalidate", lambda: invalidated.append(1)
+        )
+
+        with django_capture_on_commit_callbacks(execute=True):
+            services.toggle_subscription(user_subscription, ggp, sportsman_class)
+            services.unsubscribe(user_subscription, ggp, sportsman_class)
+            assert not invalidated
+
+        assert len(invalidated) == 2
+
+
+@pytest.mark.django_db(transaction=True)
+async def test_concurrent_bot_taps(tap_args):
+    """Нажатия из бота, пришедшие одновременно, переключают по очереди"""
+    user_subscription, ggp, _, sportsman_class = tap_args
+
+    results = await asyncio.gather(
+        *(
+            services.atoggle_subscription(user_subscription, ggp, sportsman_class)
+            for _ in range(20)
+        )
+    )
+
+    assert results.count(True) == results.count(False) == 10
+    assert not await Subscription.objects.aexists()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.skipif(
+    connection.vendor != "postgresql",
+    reason="одновременная запись из потоков - только PostgreSQL (CI_USE_POSTGRES)",
+)
+def test_parallel_taps(tap_args):
+    """Параллельные нажатия из разных соединений: без ошибок и дублей"""
+    user_subscription, ggp, _, sportsman_class = tap_args
+
+    def tap(_):
+        try:
+            return services.toggle_subscription(user_subscription, ggp, sportsman_class)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(tap, range(40)))
+
+    subscribed = Subscription.objects.filter(
+        user_subscription_id=user_subscription,
+        competition_type_id=ggp,
+        sportsman_class_id=sportsman_class,
+    ).count()
+    assert subscribed <= 1
+    assert len(results) == 40
+    # следующее нажатие видит итог параллельных
+    assert services.toggle_subscription(
+        user_subscription, ggp, sportsman_class
+    ) is not bool(subscribed)
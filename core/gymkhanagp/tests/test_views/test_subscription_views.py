@@ -1,12 +1,18 @@
 import pytest
 from django.urls import reverse
 from gymkhanagp.models import Subscription
+from gymkhanagp.tests.factories import (
+    CompetitionTypeFactory,
+    SportsmanClassFactory,
+    SubscriptionFactory,
+)
 
 
 @pytest.mark.django_db(transaction=True)
 class TestSubscriptionViews:
     def test_subscription_manage_authenticated(self, client, user):
         """Тест доступа к странице подписок для авторизованного пользователя"""
+        CompetitionTypeFactory(name="ggp")
         client.force_login(user)
         response = client.get(reverse("gymkhanagp:index"))
         assert response.status_code == 200
@@ -18,12 +24,75 @@ class TestSubscriptionViews:
         url = (
             reverse("gymkhanagp:unsubscribe_class")
             + f"?sportsman_class={subscription.sportsman_class.id}"
+            + f"&competition_type={subscription.competition_type.name}"
         )
 
         response = client.post(url)
         assert response.status_code == 200
         assert not Subscription.objects.filter(id=subscription.id).exists()
 
+    def test_subscription_page_scoped_by_competition_type(self, client, user):
+        """Тест отметок подписок на странице выбранного типа соревнований"""
+        ggp = CompetitionTypeFactory(name="ggp")
+        base = CompetitionTypeFactory(name="base")
+        sportsman_class = SportsmanClassFactory(name="C1")
+        SubscriptionFactory(
+            user_subscription=user.subscriptions,
+            competition_type=base,
+            sportsman_class=sportsman_class,
+        )
+        client.force_login(user)
+
+        ggp_page = client.get(reverse("gymkhanagp:index"))
+        base_page = client.get(reverse("gymkhanagp:index") + "?competition_type=base")
+
+        assert ggp_page.context["competition_type"].id == ggp.id
+        assert ggp_page.context["subscribed_class_ids"] == set()
+        assert base_page.context["subscribed_class_ids"] == {sportsman_class.id}
+        assert "competition_type=base" in base_page.content.decode()
+
+    def test_subscribe_and_unsubscribe_scoped(self, client, user):
+        """Тест подписки и отписки в рамках типа соревнований"""
+        CompetitionTypeFactory(name="ggp")
+        base = CompetitionTypeFactory(name="base")
+        sportsman_class = SportsmanClassFactory(name="C1")
+        SubscriptionFactory(
+            user_subscription=user.subscriptions,
+            competition_type=base,
+            sportsman_class=sportsman_class,
+        )
+        client.force_login(user)
+        query = f"?sportsman_class={sportsman_class.id}&competition_type=ggp"
+
+        assert (
+            client.get(reverse("gymkhanagp:subscribe_class") + query).status_code == 200
+        )
+        assert (
+            client.get(reverse("gymkhanagp:subscribe_class") + query).status_code == 200
+        )
+        assert Subscription.objects.count() == 2
+
+        response = client.get(reverse("gymkhanagp:unsubscribe_class") + query)
+        assert response.status_code == 200
+        assert "competition_type=ggp" in response.content.decode()
+        assert list(Subscription.objects.values_list("competition_type_id")) == [
+            (base.id,)
+        ]
+        response = client.get(reverse("gymkhanagp:unsubscribe_class") + query)
+        assert response.status_code == 404
+
+    def test_subscribe_unknown_class(self, client, user):
+        """Тест подписки на класс, которого нет в справочнике"""
+        CompetitionTypeFactory(name="ggp")
+        client.force_login(user)
+        for sportsman_class in ("999", "abc"):
+            url = (
+                reverse("gymkhanagp:subscribe_class")
+                + f"?sportsman_class={sportsman_class}"
+            )
+            assert client.get(url).status_code == 404
+        assert not Subscription.objects.exists()
+
     def test_anonymous_redirect(self, client):
         """Тест редиректа для анонимных пользователей"""
         for url in [
@@ -1,16 +1,37 @@
 from django.contrib.auth.decorators import login_required
-from django.http import HttpRequest
+from django.http import Http404, HttpRequest
 from django.shortcuts import get_object_or_404, render
 
 from users.utils import get_telegram_id
-from .models import (
-    Subscription,
-    UserSubscription,
-    CompetitionTypeModel,
-    SportsmanClassModel,
-)
+from . import services
+from .models import Subscription, UserSubscription
+from .reference import CompetitionTypeInfo, SportsmanClassInfo, reference_cache
 from .tasks import send_telegram_message_task
 
+# Страница подписок управляет классами Gymkhana GP, если тип не передан
+DEFAULT_COMPETITION_TYPE = "ggp"
+
+
+def get_competition_type_or_404(name: str | None) -> CompetitionTypeInfo:
+    """Тип соревнований из справочника по названию из запроса"""
+    competition_type = reference_cache.competition_type(
+        name or DEFAULT_COMPETITION_TYPE
+    )
+    if competition_type is None:
+        raise Http404("Тип соревнований не найден")
+    return competition_type
+
+
+def get_sportsman_class_or_404(pk) -> SportsmanClassInfo:
+    """Класс спортсмена из справочника по id из запроса"""
+    try:
+        sportsman_class = reference_cache.sportsman_class_by_id(int(pk))
+    except (TypeError, ValueError):
+        sportsman_class = None
+    if sportsman_class is None:
+        raise Http404("Класс спортсмена не найден")
+    return sportsman_class
+
 
 @login_required(login_url="/accounts/login")
 def index(request: HttpRequest):
@@ -23,7 +44,7 @@ def index(request: HttpRequest):
         Subscription.objects.all()
         .filter(
             user_subscription=user_subscription,
-            competition_type=CompetitionTypeModel.objects.get(pk=1),
+            competition_type_id=get_competition_type_or_404(None).id,
         )
         .select_related("competition_type", "sportsman_class")
     )
@@ -39,22 +60,30 @@ def index(request: HttpRequest):
 
 @login_required
 def subscriptions_view(request):
-    competition_types = CompetitionTypeModel.objects.all()
-    sportsman_classes = SportsmanClassModel.objects.all()
+    competition_type = get_competition_type_or_404(request.GET.get("competition_type"))
+    competition_types = reference_cache.competition_types().values()
+    sportsman_classes = reference_cache.sportsman_classes().values()
 
     user_subscriptions = set(
         Subscription.objects.filter(user_subscription__user=request.user).values_list(
             "competition_type_id", "sportsman_class_id"
         )
     )
+    subscribed_class_ids = {
+        sportsman_class_id
+        for competition_type_id, sportsman_class_id in user_subscriptions
+        if competition_type_id == competition_type.id
+    }
 
     return render(
         request,
         "gymkhanagp/subscriptions.html",
         {
+            "competition_type": competition_type,
             "competition_types": competition_types,
             "sportsman_classes": sportsman_classes,
             "user_subscriptions": user_subscriptions,
+            "subscribed_class_ids": subscribed_class_ids,
         },
     )
 
@@ -63,16 +92,11 @@ def subscriptions_view(request):
 def subscribe_class(request):
     """Добавление подписки"""
 
-    competition_type_id = 1
-    sportsman_class_id = request.GET.get("sportsman_class")
+    competition_type = get_competition_type_or_404(request.GET.get("competition_type"))
+    sportsman_class = get_sportsman_class_or_404(request.GET.get("sportsman_class"))
     user_subscription = UserSubscription.objects.get(user=request.user)
 
-    Subscription.objects.get_or_create(
-        user_subscription=user_subscription,
-        competition_type_id=competition_type_id,
-        sportsman_class_id=sportsman_class_id,
-    )
-    sportsman_class = get_object_or_404(SportsmanClassModel, pk=sportsman_class_id)
+    services.subscribe(user_subscription.id, competition_type.id, sportsman_class.id)
     telegram_id = get_telegram_id(request.user)
     if telegram_id:
         message = (
@@ -85,29 +109,21 @@ def subscribe_class(request):
     return render(
         request,
         "gymkhanagp/components/class_input_on.html",
-        {
-            "sportsman_class": get_object_or_404(
-                SportsmanClassModel, pk=sportsman_class_id
-            )
-        },
+        {"sportsman_class": sportsman_class, "competition_type": competition_type},
     )
 
 
 @login_required
 def unsubscribe_class(request):
     """Удаление подписки"""
-    competition_type_id = 1
-    sportsman_class_id = request.GET.get("sportsman_class")
-
-    subscription = get_object_or_404(
-        Subscription,
-        user_subscription__user=request.user,
-        competition_type_id=competition_type_id,
-        sportsman_class_id=sportsman_class_id,
-    )
-    subscription.delete()
+    competition_type = get_competition_type_or_404(request.GET.get("competition_type"))
+    sportsman_class = get_sportsman_class_or_404(request.GET.get("sportsman_class"))
+    user_subscription = get_object_or_404(UserSubscription, user=request.user)
 
-    sportsman_class = get_object_or_404(SportsmanClassModel, pk=sportsman_class_id)
+    if not services.unsubscribe(
+        user_subscription.id, competition_type.id, sportsman_class.id
+    ):
+        raise Http404("Подписка не найдена")
 
     telegram_id = get_telegram_id(request.user)  # Используем один из способов выше
     if telegram_id:
@@ -120,9 +136,5 @@ def unsubscribe_class(request):
     return render(
         request,
         "gymkhanagp/components/class_input_off.html",
-        {
-            "sportsman_class": get_object_or_404(
-                SportsmanClassModel, pk=sportsman_class_id
-            )
-        },
+        {"sportsman_class": sportsman_class, "competition_type": competition_type},
     )
@@ -21,8 +21,7 @@ logger = logging.getLogger(__name__)
 
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    keyboard_manager = KeyboardManager()
-    await keyboard_manager.handle_message(update, context)
+    await KeyboardManager.from_context(context).handle_message(update, context)
 
 
 def setup_bot():
@@ -34,6 +33,7 @@ def setup_bot():
         raise e
 
     keyboard_manager = KeyboardManager()
+    application.bot_data[KeyboardManager.BOT_DATA_KEY] = keyboard_manager
     conv_handler = ConversationHandler(
         entry_points=[
             MessageHandler(
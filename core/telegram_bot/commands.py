@@ -4,16 +4,17 @@ from telegram import Update
 from telegram.ext import ContextTypes
 
 from telegram_bot.manager import KeyboardManager
+from telegram_bot.repositories import users
 from telegram_bot.states import States
 from telegram_bot.utils.users import create_user_from_telegram
 from users.models import SourceReports, TypeReport
-from users.utils import ReportHandler, AdminNotifier, get_user_by_telegram_id
+from users.utils import ReportHandler, AdminNotifier
 
 logger = logging.getLogger(__name__)
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None | States:
-    keyboard_manager = KeyboardManager()
+    keyboard_manager = KeyboardManager.from_context(context)
     tg_user = update.effective_user
     user, created = await create_user_from_telegram(tg_user)
     user_name = tg_user.first_name or user.username
@@ -83,7 +84,7 @@ async def feature_report(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
 
 async def register_report(telegram_id: int, text: str, type_report: TypeReport) -> str:
-    user = get_user_by_telegram_id(telegram_id)
+    user = await users.get_by_telegram_id(telegram_id)
     success, message = await ReportHandler.handle_report(
         user=user, text=text, source=SourceReports.TELEGRAM, type_report=type_report
     )
@@ -1,19 +1,15 @@
 import logging
 import typing
 from abc import ABC, abstractmethod
-from django.db import transaction
-from allauth.socialaccount.models import SocialAccount
+from collections import OrderedDict
 from asgiref.sync import sync_to_async
 from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
 from telegram.ext import ContextTypes
 
-from g_cup_site.models import StageModel, StageResultModel
-from gymkhanagp.models import (
-    UserSubscription,
-    SportsmanClassModel,
-    Subscription,
-    CompetitionTypeModel,
-)
+from g_cup_site.models import StageResultModel
+from gymkhanagp.reference import SportsmanClassInfo, reference_cache
+from telegram_bot.repositories import stages, users
+from telegram_bot.session import UserSession, user_sessions
 from telegram_bot.states import States
 from telegram_bot.utils.math_calculate import (
     ClassCoefficientManager,
@@ -22,17 +18,92 @@ from telegram_bot.utils.math_calculate import (
 )
 from telegram_bot.utils.messages import MessageTimeTableFormatter
 from users.models import SourceReports, TypeReport
-from users.utils import AdminNotifier, get_user_by_telegram_id, ReportHandler
+from users.utils import AdminNotifier, ReportHandler
+
+if typing.TYPE_CHECKING:
+    from telegram_bot.manager import KeyboardManager
 
 logger = logging.getLogger(__name__)
 
+BACK_BUTTON = "🔙 Назад"
+
+
+class ClassSelectionKeyboards:
+    """Готовые клавиатуры выбора класса по видам соревнований.
+
+    Раскладка классов по рядам строится один раз на версию справочника
+    классов, клавиатура с отметками подписок - один раз на набор подписок.
+    """
+
+    ROW_SIZE = 3
+    MAX_MARKUPS = 512
+
+    def __init__(self):
+        self._classes: dict[str, SportsmanClassInfo] | None = None
+        self._layouts: dict[str, tuple[tuple[SportsmanClassInfo, ...], ...]] = {}
+        self._markups: OrderedDict[tuple, ReplyKeyboardMarkup] = OrderedDict()
+
+    def _sync(self, classes: dict[str, SportsmanClassInfo]) -> None:
+        # справочник перечитан - прежние раскладки устарели
+        if classes is not self._classes:
+            self._classes = classes
+            self._layouts.clear()
+            self._markups.clear()
+
+    def layout(
+        self, competition: str, classes: dict[str, SportsmanClassInfo]
+    ) -> tuple[tuple[SportsmanClassInfo, ...], ...]:
+        self._sync(classes)
+        if (layout := self._layouts.get(competition)) is None:
+            ordered = tuple(classes.values())
+            layout = tuple(
+                ordered[start : start + self.ROW_SIZE]
+                for start in range(0, len(ordered), self.ROW_SIZE)
+            )
+            self._layouts[competition] = layout
+        return layout
+
+    def markup(
+        self,
+        competition: str,
+        classes: dict[str, SportsmanClassInfo],
+        subscribed_classes: typing.Iterable[str],
+    ) -> ReplyKeyboardMarkup:
+        self._sync(classes)
+        subscribed = frozenset(subscribed_classes)
+        key = (competition, subscribed)
+        if (markup := self._markups.get(key)) is not None:
+            self._markups.move_to_end(key)
+            return markup
+
+        rows = [
+            [
+                f"{cls.subscribe_emoji if cls.name in subscribed else '🔲'} {cls.name}"
+                for cls in row
+            ]
+            for row in self.layout(competition, classes)
+        ]
+        rows.append([BACK_BUTTON])
+        markup = ReplyKeyboardMarkup(rows, resize_keyboard=True)
+        self._markups[key] = markup
+        if len(self._markups) > self.MAX_MARKUPS:
+            self._markups.popitem(last=False)
+        return markup
+
 
 class BaseHandler(ABC):
-    """Базовый класс для обработчиков действий"""
+    """Базовый класс для обработчиков действий.
+
+    Обработчики создаются один раз в KeyboardManager и получают его для
+    доступа к готовым клавиатурам.
+    """
 
     COMPETITION_TYPE: typing.Optional[str] = None
     STATE: typing.Optional[States] = None
 
+    def __init__(self, manager: typing.Optional["KeyboardManager"] = None):
+        self.manager = manager
+
     @property
     @abstractmethod
     def button_text(self) -> str:
@@ -49,88 +120,25 @@ class BaseHandler(ABC):
     ) -> typing.Optional[States]:
         pass
 
-    @staticmethod
     async def get_keyboard(
-        subscribed_classes: typing.List[str],
-    ) -> typing.List[typing.List[str]]:
-        """Генератор клавиатуры с буквами подпискиподписками"""
-        try:
-            classes = await SportsmanClassModel.objects.all().alist()
-        except AttributeError:
-            classes = await sync_to_async(list)(SportsmanClassModel.objects.all())
-
-        keyboard = []
-        row = []
-        for i, cls in enumerate(classes, 1):
-            prefix = cls.subscribe_emoji if cls.name in subscribed_classes else "🔲"
-            row.append(f"{prefix} {cls.name}")
-            if i % 3 == 0 or i == len(classes):
-                keyboard.append(row)
-                row = []
-        return keyboard
-
-    @staticmethod
+        self, subscribed_classes: typing.List[str]
+    ) -> ReplyKeyboardMarkup:
+        """Клавиатура выбора класса с отметками подписок и кнопкой возврата"""
+        classes = await sync_to_async(reference_cache.sportsman_classes)()
+        return self.manager.class_keyboards.markup(
+            self.COMPETITION_TYPE, classes, subscribed_classes
+        )
+
     async def _handle_back(
-        update: Update, context: ContextTypes.DEFAULT_TYPE
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> States:
-        """Обработка возврата в главное меню, для многоуровневых меню необходимо будет хранить стэк состояний
-        а пока это статикметод
-        """
-        from telegram_bot.manager import KeyboardManager
-
+        """Обработка возврата в главное меню, для многоуровневых меню необходимо будет хранить стэк состояний"""
         await update.message.reply_text(
-            "Главное меню:", reply_markup=KeyboardManager().get_main_keyboard()
+            "Главное меню:", reply_markup=self.manager.get_main_keyboard()
         )
         return States.MAIN_MENU
 
 
-class SubscriptionHandlerMixin:
-    """Миксин для обработки подписок на спортивные классы"""
-
-    async def _get_user_subscriptions(
-        self, subscription: UserSubscription
-    ) -> typing.List[str]:
-        """Получает список подписок пользователя"""
-        return [
-            sc.name
-            async for sc in SportsmanClassModel.objects.filter(
-                subscription__user_subscription=subscription,
-                subscription__competition_type__name=self.COMPETITION_TYPE,
-            )
-        ]
-
-    async def _toggle_subscription(
-        self,
-        subscription: UserSubscription,
-        sportsman_class: SportsmanClassModel,
-        competition_name: str,
-    ) -> bool:
-        """Переключает состояние подписки"""
-        with transaction.atomic():
-            competition = await CompetitionTypeModel.objects.filter(
-                name=competition_name
-            ).afirst()
-            is_subscribed = await Subscription.objects.filter(
-                user_subscription=subscription,
-                sportsman_class=sportsman_class,
-                competition_type=competition,
-            ).aexists()
-
-            if is_subscribed:
-                await Subscription.objects.filter(
-                    user_subscription=subscription,
-                    sportsman_class=sportsman_class,
-                ).adelete()
-                return False
-            else:
-                await Subscription.objects.acreate(
-                    user_subscription=subscription,
-                    sportsman_class=sportsman_class,
-                    competition_type=competition,
-                )
-                return True
-
-
 class TrackHandler(BaseHandler):
     """Обработчик отправки карты этапа и ссылки на соревнование"""
 
@@ -149,9 +157,7 @@ class TrackHandler(BaseHandler):
         возвращает основное меню.
         """
         try:
-            active_stage = await StageModel.objects.filter(
-                status__in=("judging", "accepting")
-            ).afirst()
+            active_stage = await stages.get_active_stage()
         except Exception as e:
             logger.exception(
                 "Поймана ошибка при отправке активного этапа и ссылки на соревнования GGP \n %s",
@@ -178,9 +184,8 @@ class TrackHandler(BaseHandler):
 class TimeTableGGPHandler(BaseHandler):
     """Обработчик для предоставления временных диапазонов этапа"""
 
-    def __init__(
-        self,
-    ):
+    def __init__(self, manager: typing.Optional["KeyboardManager"] = None):
+        super().__init__(manager)
         self.stage_service = StageService()
         self.coefficient_manager = ClassCoefficientManager()
         self.message_formatter = MessageTimeTableFormatter(TimeConverter())
@@ -209,10 +214,8 @@ class TimeTableGGPHandler(BaseHandler):
                 return States.MAIN_MENU
 
             base_time = self._calculate_base_time(best_result)
-            sportsman_class: SportsmanClassModel = (
-                await SportsmanClassModel.objects.filter(
-                    name=best_result.user.sportsman_class
-                ).afirst()
+            sportsman_class = await sync_to_async(reference_cache.sportsman_class)(
+                best_result.user.sportsman_class
             )
 
             message = f"Лидер: {sportsman_class.subscribe_emoji} {sportsman_class.name} - {best_result.user.full_name}\n"
@@ -235,7 +238,7 @@ class TimeTableGGPHandler(BaseHandler):
         return int(result.result_time_seconds / coefficient)
 
 
-class BaseSubscriptionHandler(BaseHandler, SubscriptionHandlerMixin):
+class BaseSubscriptionHandler(BaseHandler):
     """Базовый обработчик подписок"""
 
     SELECTION_TEXT: str = "Выберите класс спортсмена:"
@@ -244,27 +247,18 @@ class BaseSubscriptionHandler(BaseHandler, SubscriptionHandlerMixin):
     async def handle(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> States:
-        user = update.effective_user
-        social_account = await SocialAccount.objects.filter(uid=str(user.id)).afirst()
+        session = await user_sessions.get(update.effective_user.id)
 
-        if not social_account:
+        if session is None:
             await update.message.reply_text("Сначала зарегистрируйтесь через /start")
             return States.MAIN_MENU
 
-        subscription, _ = await UserSubscription.objects.aget_or_create(
-            user=social_account.user, defaults={"is_active": True, "source": "telegram"}
-        )
-
-        subscribed_classes = await self._get_user_subscriptions(subscription)
-        keyboard = await self.get_keyboard(subscribed_classes)
-        keyboard.append(["🔙 Назад"])
+        subscribed_classes = session.subscribed_classes(self.COMPETITION_TYPE)
 
         await update.message.reply_text(
             self.SELECTION_TEXT,
-            reply_markup=ReplyKeyboardMarkup(keyboard, resize_keyboard=True),
+            reply_markup=await self.get_keyboard(subscribed_classes),
         )
-
-        context.user_data["subscription_id"] = subscription.id
         return self.STATE
 
 
@@ -302,7 +296,7 @@ class BaseFigureSubscriptionHandler(BaseSubscriptionHandler):
         return KeyboardButton(self.button_text)
 
 
-class BaseSelectionHandler(BaseHandler, SubscriptionHandlerMixin):
+class BaseSelectionHandler(BaseHandler):
     """Базовый обработчик выбора класса"""
 
     COMPETITION_NAME: str = None
@@ -321,7 +315,7 @@ class BaseSelectionHandler(BaseHandler, SubscriptionHandlerMixin):
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> States:
         text = update.message.text
-        if text == "🔙 Назад":
+        if text == BACK_BUTTON:
             return await self._handle_back(update, context)
 
         return await self._process_class_selection(update, context)
@@ -330,28 +324,28 @@ class BaseSelectionHandler(BaseHandler, SubscriptionHandlerMixin):
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> States:
         class_name = update.message.text[2:].strip()
-        subscription_id = context.user_data.get("subscription_id")
+        session = await user_sessions.get(update.effective_user.id)
 
-        if not subscription_id:
+        if session is None:
             await update.message.reply_text("Ошибка сессии. Начните с /start")
             return States.MAIN_MENU
 
         try:
-            sportsman_class = await SportsmanClassModel.objects.aget(name=class_name)
-            subscription = await UserSubscription.objects.aget(pk=subscription_id)
+            classes = await sync_to_async(reference_cache.sportsman_classes)()
+            if (sportsman_class := classes.get(class_name)) is None:
+                await update.message.reply_text("Неизвестный класс")
+                return self.STATE
 
-            is_subscribed = await self._toggle_subscription(
-                subscription, sportsman_class, self.COMPETITION_NAME
+            competition = await sync_to_async(reference_cache.competition_type)(
+                self.COMPETITION_NAME
             )
-
-            await self._update_interface(
-                update, subscription, is_subscribed, class_name
+            is_subscribed = await user_sessions.toggle(
+                session, competition, sportsman_class
             )
-            return self.STATE
 
-        except SportsmanClassModel.DoesNotExist:
-            await update.message.reply_text("Неизвестный класс")
+            await self._update_interface(update, session, is_subscribed, class_name)
             return self.STATE
+
         except Exception as e:
             logger.error(f"Ошибка в {self.__class__.__name__}: {str(e)}", exc_info=True)
             await update.message.reply_text("⚠️ Произошла ошибка")
@@ -360,13 +354,11 @@ class BaseSelectionHandler(BaseHandler, SubscriptionHandlerMixin):
     async def _update_interface(
         self,
         update: Update,
-        subscription: UserSubscription,
+        session: UserSession,
         is_subscribed: bool,
         class_name: str,
     ):
-        subscribed_classes = await self._get_user_subscriptions(subscription)
-        keyboard = await self.get_keyboard(subscribed_classes)
-        keyboard.append(["🔙 Назад"])
+        subscribed_classes = session.subscribed_classes(self.COMPETITION_TYPE)
 
         action = (
             self.ACTION_TEXT_SUBSCRIBED
@@ -375,11 +367,13 @@ class BaseSelectionHandler(BaseHandler, SubscriptionHandlerMixin):
         )
         await update.message.reply_text(
             f"Вы {action} - {class_name}",
-            reply_markup=ReplyKeyboardMarkup(keyboard, resize_keyboard=True),
+            reply_markup=await self.get_keyboard(subscribed_classes),
         )
 
 
 class BugReportHandler(BaseHandler):
+    STATE = States.BUG_REPORT_WAIT
+
     @property
     def button_text(self) -> str:
         return "Отправить 🐞 баг-репорт"
@@ -391,7 +385,7 @@ class BugReportHandler(BaseHandler):
     async def handle(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> States:
-        user = get_user_by_telegram_id(update.effective_user.id)
+        user = await users.get_by_telegram_id(update.effective_user.id)
         text = update.message.text
         success, message = await ReportHandler.handle_report(
             user=user,
@@ -408,6 +402,8 @@ class BugReportHandler(BaseHandler):
 
 
 class FeatureReportHandler(BaseHandler):
+    STATE = States.FEATURE_REPORT_WAIT
+
     @property
     def button_text(self) -> str:
         return "Предложить ✨ фичу"
@@ -419,7 +415,7 @@ class FeatureReportHandler(BaseHandler):
     async def handle(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> States:
-        user = get_user_by_telegram_id(update.effective_user.id)
+        user = await users.get_by_telegram_id(update.effective_user.id)
         text = update.message.text
         success, message = await ReportHandler.handle_report(
             user=user,
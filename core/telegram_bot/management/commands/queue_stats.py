@@ -0,0 +1,30 @@
+from core.queue_metrics import queue_depths, queue_wait_stats
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import celery_app
+from telegram_bot.undeliverable import undeliverable_chats
+
+
+class Command(BaseCommand):
+    help = "Глубина очередей Celery и время ожидания задач в них"
+
+    def handle(self, *args, **options):
+        depths = queue_depths(celery_app, settings.QUEUE_METRICS_QUEUES)
+        for queue in settings.QUEUE_METRICS_QUEUES:
+            waits = queue_wait_stats(queue)
+            line = f"{queue}: в очереди {depths[queue]}"
+            if waits["samples"]:
+                line += (
+                    f", ожидание p50={waits['p50']:.2f}сек "
+                    f"p95={waits['p95']:.2f}сек max={waits['max']:.2f}сек "
+                    f"(задач: {waits['samples']})"
+                )
+            self.stdout.write(line)
+
+        stats = undeliverable_chats.stats()
+        self.stdout.write(
+            f"Недоставляемых чатов: {stats['undeliverable']}, "
+            f"ждут деактивации: {stats['pending_deactivation']}, "
+            f"пропущено отправок: {stats['skipped_sends']}"
+        )
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+
+from core.redis_client import get_async_redis
+from django.core.management.base import BaseCommand
+
+from telegram_bot.sender import TelegramSender
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Запускает сервис отправки сообщений Telegram из очереди Redis"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            help="Сколько сообщений отправлять одновременно",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            help="Не больше сообщений в секунду",
+        )
+        parser.add_argument(
+            "--consumer",
+            default="default",
+            help=(
+                "Имя списка обработки, у каждого одновременно запущенного сервиса своё"
+            ),
+        )
+        parser.add_argument(
+            "--report-every",
+            type=float,
+            default=60,
+            help="Как часто (в секундах) писать в лог статистику отправки",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS("Starting telegram sender..."))
+
+        async def run():
+            redis = get_async_redis()
+            sender = TelegramSender(
+                redis,
+                concurrency=options["concurrency"],
+                rate=options["rate"],
+                report_every=options["report_every"],
+                consumer=options["consumer"],
+            )
+            try:
+                return await sender.run()
+            finally:
+                await redis.aclose()
+
+        try:
+            asyncio.run(run())
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS("Shutting down telegram sender..."))
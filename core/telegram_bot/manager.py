@@ -4,6 +4,7 @@ from telegram import ReplyKeyboardMarkup, Update
 from telegram.ext import ContextTypes
 
 from telegram_bot.keyboard import (
+    ClassSelectionKeyboards,
     TrackHandler,
     BaseHandler,
     GGPSubscriptionHandler,
@@ -21,44 +22,54 @@ logger = logging.getLogger(__name__)
 
 
 class KeyboardManager:
+    """Обработчики и клавиатуры бота.
+
+    Создаётся один раз в setup_bot и хранится в application.bot_data:
+    обработчики, главное меню и клавиатуры выбора класса не пересоздаются
+    на каждое сообщение.
+    """
+
+    BOT_DATA_KEY = "keyboard_manager"
+
     def __init__(self):
         self._handlers: dict[str, BaseHandler] = {}
-        self._class_selection_handlers = {}
+        self._state_handlers: dict[States, BaseHandler] = {}
+        self.class_keyboards = ClassSelectionKeyboards()
         self._register_handlers()
 
+    @classmethod
+    def from_context(cls, context: ContextTypes.DEFAULT_TYPE) -> "KeyboardManager":
+        return context.bot_data[cls.BOT_DATA_KEY]
+
     def _register_handlers(self) -> None:
         # Главное меню
-        self.add_handler(TrackHandler())
-        self.add_handler(TimeTableGGPHandler())
-        self.add_handler(GGPSubscriptionHandler())
-        self.add_handler(BaseFigureSubscriptionHandler())
+        track = self.add_handler(TrackHandler(self))
+        time_table = self.add_handler(TimeTableGGPHandler(self))
+        ggp_subscription = self.add_handler(GGPSubscriptionHandler(self))
+        base_subscription = self.add_handler(BaseFigureSubscriptionHandler(self))
 
         self.main_menu = ReplyKeyboardMarkup(
             keyboard=[
-                [GGPSubscriptionHandler().button],
-                [BaseFigureSubscriptionHandler().button],
-                [
-                    TrackHandler().button,
-                    TimeTableGGPHandler().button,
-                ],
+                [ggp_subscription.button],
+                [base_subscription.button],
+                [track.button, time_table.button],
             ],
             resize_keyboard=True,
         )
 
-        # Меню выбора класса
-        self.add_class_selection_handler(GGPSelectionHandler())
-        self.add_class_selection_handler(BaseFigureSelectionHandler())
-        self.add_class_selection_handler(BugReportHandler())
-        self.add_class_selection_handler(FeatureReportHandler())
+        # Меню выбора класса и ожидание текста репорта
+        self.add_state_handler(GGPSelectionHandler(self))
+        self.add_state_handler(BaseFigureSelectionHandler(self))
+        self.add_state_handler(BugReportHandler(self))
+        self.add_state_handler(FeatureReportHandler(self))
 
-    def add_handler(
-        self,
-        handler: BaseHandler,
-    ) -> None:
+    def add_handler(self, handler: BaseHandler) -> BaseHandler:
         self._handlers[handler.button_text] = handler
+        return handler
 
-    def add_class_selection_handler(self, handler: BaseHandler):
-        self._class_selection_handlers[handler.__class__.__name__] = handler
+    def add_state_handler(self, handler: BaseHandler) -> BaseHandler:
+        self._state_handlers[handler.STATE] = handler
+        return handler
 
     def get_main_keyboard(self) -> ReplyKeyboardMarkup:
         return self.main_menu
@@ -66,20 +77,13 @@ class KeyboardManager:
     async def handle_message(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> None:
-        handler = None
         text = update.message.text
         current_state = context.user_data.get("state", States.MAIN_MENU)
 
         if current_state == States.MAIN_MENU:
             handler = self._handlers.get(text)
-        elif current_state == States.CLASS_SELECTION:
-            handler = self._class_selection_handlers.get("GGPSelectionHandler")
-        elif current_state == States.BASE_CLASS_SELECTION:
-            handler = self._class_selection_handlers.get("BaseFigureSelectionHandler")
-        elif current_state == States.BUG_REPORT_WAIT:
-            handler = self._class_selection_handlers.get("BugReportHandler")
-        elif current_state == States.FEATURE_REPORT_WAIT:
-            handler = self._class_selection_handlers.get("FeatureReportHandler")
+        else:
+            handler = self._state_handlers.get(current_state)
         if handler:
             new_state = await handler.handle(update, context)
             context.user_data["state"] = new_state
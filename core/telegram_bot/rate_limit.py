@@ -0,0 +1,160 @@
+"""
+Общий для всех отправителей ограничитель частоты запросов к Telegram.
+
+Token bucket хранится в Redis и списывается атомарно Lua скриптом, поэтому
+лимит соблюдается сколько бы воркеров и сервисов отправки ни было запущено.
+Ограничиваются общее число сообщений в секунду и частота в один чат
+(личный чат и группа - разные лимиты). RetryAfter от Telegram ставит на паузу
+всех отправителей.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from core.redis_client import get_async_redis
+from django.conf import settings
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_BUCKET_KEY = "telegram:bucket:global"
+CHAT_BUCKET_KEY = "telegram:bucket:chat:{chat_id}"
+PAUSE_KEY = "telegram:pause"
+
+# KEYS: общий bucket, bucket чата, ключ паузы
+# ARGV: скорость и ёмкость общего bucket, скорость и ёмкость bucket чата
+# Возвращает 0, если токены списаны, иначе сколько миллисекунд подождать
+TAKE_TOKEN_SCRIPT = """
+local pause = redis.call('PTTL', KEYS[3])
+if pause > 0 then
+  return pause
+end
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local function level(key, rate, capacity)
+  local data = redis.call('HMGET', key, 'tokens', 'ts')
+  local tokens = tonumber(data[1]) or capacity
+  local ts = tonumber(data[2]) or now
+  return math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+end
+
+local global_rate = tonumber(ARGV[1])
+local global_capacity = tonumber(ARGV[2])
+local chat_rate = tonumber(ARGV[3])
+local chat_capacity = tonumber(ARGV[4])
+
+local global_tokens = level(KEYS[1], global_rate, global_capacity)
+local chat_tokens = level(KEYS[2], chat_rate, chat_capacity)
+
+if global_tokens >= 1 and chat_tokens >= 1 then
+  redis.call('HSET', KEYS[1], 'tokens', global_tokens - 1, 'ts', now)
+  redis.call('PEXPIRE', KEYS[1], math.ceil(global_capacity / global_rate * 1000) + 1000)
+  redis.call('HSET', KEYS[2], 'tokens', chat_tokens - 1, 'ts', now)
+  redis.call('PEXPIRE', KEYS[2], math.ceil(chat_capacity / chat_rate * 1000) + 1000)
+  return 0
+end
+
+local wait = 0
+if global_tokens < 1 then
+  wait = math.max(wait, math.ceil((1 - global_tokens) * 1000 / global_rate))
+end
+if chat_tokens < 1 then
+  wait = math.max(wait, math.ceil((1 - chat_tokens) * 1000 / chat_rate))
+end
+return wait
+"""
+
+
+class TelegramRateLimiter:
+    """Асинхронный ограничитель поверх клиента redis.asyncio.
+
+    Если Redis недоступен, отправка не блокируется: лучше рискнуть 429 и
+    получить RetryAfter, чем остановить все уведомления.
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.script = redis.register_script(TAKE_TOKEN_SCRIPT)
+        self.global_rate = settings.TELEGRAM_RATE_GLOBAL
+        self.private_rate = settings.TELEGRAM_RATE_PRIVATE_CHAT
+        self.group_rate = settings.TELEGRAM_RATE_GROUP_PER_MINUTE / 60
+
+    def chat_limits(self, chat_id: int) -> tuple[float, float]:
+        """Скорость и ёмкость bucket чата. У групп отрицательный chat_id"""
+        if chat_id < 0:
+            return self.group_rate, settings.TELEGRAM_RATE_GROUP_PER_MINUTE
+        return self.private_rate, max(1.0, self.private_rate)
+
+    async def acquire(self, chat_id: int) -> float:
+        """Ждёт разрешения на отправку в чат, возвращает время ожидания"""
+        chat_rate, chat_capacity = self.chat_limits(chat_id)
+        waited = 0.0
+        while True:
+            try:
+                wait_ms = await self.script(
+                    keys=[
+                        GLOBAL_BUCKET_KEY,
+                        CHAT_BUCKET_KEY.format(chat_id=chat_id),
+                        PAUSE_KEY,
+                    ],
+                    args=[self.global_rate, self.global_rate, chat_rate, chat_capacity],
+                )
+            except RedisError as e:
+                logger.warning("Ограничитель Telegram недоступен: %s", e)
+                return waited
+            if not wait_ms:
+                return waited
+            waited += wait_ms / 1000
+            await asyncio.sleep(wait_ms / 1000)
+
+    async def pause(self, seconds: float) -> None:
+        """Пауза всех отправителей по RetryAfter от Telegram"""
+        logger.warning("Telegram попросил подождать %s сек, пауза для всех", seconds)
+        try:
+            await self.redis.set(PAUSE_KEY, 1, px=max(1, math.ceil(seconds * 1000)))
+        except RedisError as e:
+            logger.warning("Не удалось поставить паузу отправки: %s", e)
+
+    async def metrics(self) -> dict:
+        """Текущий уровень общего bucket и оставшаяся пауза"""
+        try:
+            tokens, ts = await self.redis.hmget(GLOBAL_BUCKET_KEY, "tokens", "ts")
+            pause_ms = await self.redis.pttl(PAUSE_KEY)
+        except RedisError as e:
+            logger.warning("Не удалось прочитать метрики ограничителя: %s", e)
+            return {}
+
+        level = float(self.global_rate)
+        if tokens is not None and ts is not None:
+            elapsed = max(0.0, time.time() * 1000 - float(ts))
+            level = min(level, float(tokens) + elapsed * self.global_rate / 1000)
+        return {
+            "global_tokens": round(level, 2),
+            "global_capacity": self.global_rate,
+            "paused_ms": max(0, pause_ms),
+        }
+
+
+@asynccontextmanager
+async def shared_rate_limiter() -> AsyncIterator[TelegramRateLimiter | None]:
+    """Ограничитель на время одной отправки или рассылки.
+
+    None, если ограничитель выключен (TELEGRAM_RATE_LIMIT_ENABLED=False).
+    """
+    if not settings.TELEGRAM_RATE_LIMIT_ENABLED:
+        yield None
+        return
+
+    redis = get_async_redis()
+    try:
+        yield TelegramRateLimiter(redis)
+    finally:
+        await redis.aclose()
@@ -0,0 +1,150 @@
+"""
+Асинхронный доступ бота к базе.
+
+Обработчики бота работают в цикле событий и не должны вызывать синхронный
+ORM: все чтения и записи идут через репозитории, построенные на асинхронных
+методах ORM (afirst, acreate, aupdate ...). Связанные объекты, которые нужны
+обработчикам, загружаются сразу через select_related - ленивое обращение к
+внешнему ключу в цикле событий - синхронный запрос. Операции без
+асинхронного аналога выполняются в пуле потоков через sync_to_async.
+"""
+
+import logging
+
+from allauth.socialaccount.models import SocialAccount
+from allauth.socialaccount.providers.telegram.provider import TelegramProvider
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from g_cup_site.models import StageModel, StageResultModel
+from gymkhanagp.models import Subscription, UserSubscription
+from gymkhanagp.services import atoggle_subscription
+
+from telegram_bot.undeliverable import undeliverable_chats
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+ACTIVE_STAGE_STATUSES = ("judging", "accepting")
+
+
+class UserRepository:
+    """Пользователи Django, привязанные к Telegram"""
+
+    async def get_by_telegram_id(self, telegram_id: int | str | None) -> User | None:
+        """Пользователь по telegram id, None - не найден или id некорректен"""
+        if telegram_id is None:
+            return None
+
+        if type(telegram_id) not in (int, str):
+            logger.error("Получено неверное значение telegram_id: %s", telegram_id)
+            return None
+
+        try:
+            tg_id = int(telegram_id)
+        except ValueError:
+            return None
+
+        social_account = (
+            await SocialAccount.objects.filter(
+                provider=TelegramProvider.id, uid=str(tg_id)
+            )
+            .select_related("user")
+            .afirst()
+        )
+        return social_account.user if social_account else None
+
+    async def get_or_create_from_telegram(self, tg_user) -> tuple[User, bool]:
+        """Пользователь Django и SocialAccount для пользователя Telegram"""
+        social_account = (
+            await SocialAccount.objects.filter(uid=str(tg_user.id))
+            .select_related("user")
+            .afirst()
+        )
+        if social_account:
+            logger.info(f"Найден существующий пользователь через телеграмм: {tg_user}")
+            # пользователь снова пишет боту - сообщения ему доставляются
+            await sync_to_async(undeliverable_chats.discard)(tg_user.id)
+            return social_account.user, False
+
+        user = await User.objects.acreate(
+            username=f"tg_{tg_user.id}",
+            first_name=tg_user.first_name or "",
+            last_name=tg_user.last_name or "",
+            is_active=True,
+        )
+        await SocialAccount.objects.acreate(
+            user=user,
+            provider=TelegramProvider.id,
+            uid=str(tg_user.id),
+            extra_data={
+                "id": tg_user.id,
+                "first_name": tg_user.first_name,
+                "last_name": tg_user.last_name,
+                "username": tg_user.username,
+            },
+        )
+        await UserSubscription.objects.filter(user=user).aupdate(source="telegram")
+
+        logger.info(f"Создан новый пользователь через телеграмм: {tg_user}")
+        return user, True
+
+    async def get_user_id(self, telegram_id: int) -> int | None:
+        """id пользователя Django без загрузки самого пользователя"""
+        return (
+            await SocialAccount.objects.filter(
+                provider=TelegramProvider.id, uid=str(telegram_id)
+            )
+            .values_list("user_id", flat=True)
+            .afirst()
+        )
+
+
+class SubscriptionRepository:
+    """Подписки пользователей на классы"""
+
+    async def get_or_create_user_subscription(self, user_id: int) -> int:
+        """id подписки пользователя, создаётся при первом обращении из бота"""
+        subscription, _ = await UserSubscription.objects.aget_or_create(
+            user_id=user_id, defaults={"is_active": True, "source": "telegram"}
+        )
+        return subscription.id
+
+    async def subscribed_pairs(self, subscription_id: int) -> list[tuple[int, int]]:
+        """Пары (id типа соревнований, id класса) подписки"""
+        return [
+            row
+            async for row in Subscription.objects.filter(
+                user_subscription_id=subscription_id
+            ).values_list("competition_type_id", "sportsman_class_id")
+        ]
+
+    async def toggle(
+        self, subscription_id: int, competition_type_id: int, sportsman_class_id: int
+    ) -> bool:
+        """Переключает подписку, True - пользователь теперь подписан"""
+        return await atoggle_subscription(
+            subscription_id, competition_type_id, sportsman_class_id
+        )
+
+
+class StageRepository:
+    """Этапы и их результаты"""
+
+    async def get_active_stage(self) -> StageModel | None:
+        return await StageModel.objects.filter(
+            status__in=ACTIVE_STAGE_STATUSES
+        ).afirst()
+
+    async def get_best_result(self, stage: StageModel) -> StageResultModel | None:
+        """Лучший результат этапа вместе с пользователем"""
+        return (
+            await StageResultModel.objects.filter(stage=stage)
+            .select_related("user")
+            .order_by("result_time_seconds")
+            .afirst()
+        )
+
+
+users = UserRepository()
+subscriptions = SubscriptionRepository()
+stages = StageRepository()
@@ -0,0 +1,291 @@
+"""
+Постоянный сервис отправки сообщений Telegram.
+
+Сообщения складываются в список Redis (enqueue_messages), сервис
+run_telegram_sender забирает их и отправляет через один инициализированный
+Bot с пулом HTTP соединений, вместо нового Bot и event loop на каждое сообщение.
+
+Забранное сообщение до ответа Telegram лежит в списке обработки сервиса и
+удаляется из него только после отправки, при запуске сервис возвращает
+оставшиеся там сообщения в очередь. Неудачные попытки ждут повтора в
+отсортированном множестве по времени следующей попытки.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import Counter, OrderedDict, deque
+from collections.abc import Iterable
+
+from core.redis_client import get_redis
+from django.conf import settings
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+from telegram_bot.rate_limit import TelegramRateLimiter
+from telegram_bot.utils.messages import FAILED, UNREACHABLE, deliver_message
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_KEY = "telegram:outbox"
+PROCESSING_KEY = "telegram:outbox:processing:{consumer}"
+RETRY_KEY = "telegram:outbox:retry"
+PAYLOAD_KEY = "telegram:payload:{payload_id}"
+PAYLOAD_TTL = 24 * 60 * 60
+# Сколько повторов за раз переносить в очередь
+RETRY_BATCH = 100
+
+# KEYS: повторы, очередь. ARGV: текущее время, сколько перенести
+# Переносит наступившие повторы в начало очереди, возвращает их число
+PROMOTE_RETRIES_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, message in ipairs(due) do
+  redis.call('ZREM', KEYS[1], message)
+  redis.call('RPUSH', KEYS[2], message)
+end
+return #due
+"""
+
+
+def enqueue_messages(
+    chat_ids: Iterable[int], text: str, idempotency_key: str | None = None
+) -> int:
+    """Постановка сообщения для списка чатов в очередь сервиса отправки.
+
+    Текст сохраняется в Redis один раз, сообщения очереди ссылаются на него.
+    """
+    now = time.time()
+    payload_id = hashlib.sha1(text.encode()).hexdigest()
+    messages = [
+        json.dumps(
+            {
+                "chat_id": chat_id,
+                "payload": payload_id,
+                "key": idempotency_key,
+                "enqueued_at": now,
+                "attempt": 1,
+            }
+        )
+        for chat_id in chat_ids
+    ]
+    if messages:
+        pipe = get_redis().pipeline()
+        pipe.set(PAYLOAD_KEY.format(payload_id=payload_id), text, ex=PAYLOAD_TTL)
+        pipe.lpush(OUTBOX_KEY, *messages)
+        pipe.execute()
+    return len(messages)
+
+
+class SenderStats:
+    """Пропускная способность и перцентили задержек отправки"""
+
+    def __init__(self, window: int = 10_000):
+        self.started_at = time.monotonic()
+        self.statuses: Counter[str] = Counter()
+        # от постановки в очередь до ответа Telegram и сам запрос к Telegram
+        self.queue_latencies: deque[float] = deque(maxlen=window)
+        self.send_latencies: deque[float] = deque(maxlen=window)
+
+    def record(self, status: str, queue_latency: float, send_latency: float) -> None:
+        self.statuses[status] += 1
+        self.queue_latencies.append(queue_latency)
+        self.send_latencies.append(send_latency)
+
+    @staticmethod
+    def percentile(values: Iterable[float], percent: float) -> float:
+        ordered = sorted(values)
+        if not ordered:
+            return 0.0
+        index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+        return ordered[index]
+
+    @property
+    def throughput(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return sum(self.statuses.values()) / elapsed if elapsed else 0.0
+
+    def __str__(self) -> str:
+        latencies = ", ".join(
+            f"p{p}={self.percentile(self.send_latencies, p) * 1000:.0f}мс"
+            for p in (50, 95, 99)
+        )
+        return (
+            f"Отправлено {dict(self.statuses)}, {self.throughput:.1f} сообщ/сек, "
+            f"запрос: {latencies}, "
+            f"от очереди p95={self.percentile(self.queue_latencies, 95):.2f}сек"
+        )
+
+
+class RatePacer:
+    """Равномерный темп: не больше rate запусков в секунду"""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class TelegramSender:
+    """Чтение очереди Redis и параллельная отправка с ограничением темпа.
+
+    consumer - имя списка обработки, у каждого одновременно работающего
+    сервиса своё и неизменное между перезапусками.
+    """
+
+    def __init__(
+        self,
+        redis,
+        bot: Bot | None = None,
+        concurrency: int | None = None,
+        rate: float | None = None,
+        max_attempts: int | None = None,
+        report_every: float = 60,
+        consumer: str = "default",
+        retry_delay: float | None = None,
+    ):
+        self.redis = redis
+        self.processing_key = PROCESSING_KEY.format(consumer=consumer)
+        self.concurrency = concurrency or settings.TELEGRAM_SENDER_CONCURRENCY
+        self.bot = bot or Bot(
+            token=settings.TELEGRAM_BOT_TOKEN,
+            request=HTTPXRequest(connection_pool_size=self.concurrency),
+        )
+        # общий лимит кластера, локальный темп - только если ограничитель выключен
+        self.limiter = (
+            TelegramRateLimiter(redis) if settings.TELEGRAM_RATE_LIMIT_ENABLED else None
+        )
+        self.pacer = RatePacer(rate or settings.TELEGRAM_BROADCAST_RATE)
+        self.max_attempts = max_attempts or settings.TELEGRAM_SENDER_MAX_ATTEMPTS
+        self.retry_delay = (
+            settings.TELEGRAM_SENDER_RETRY_DELAY if retry_delay is None else retry_delay
+        )
+        self.promote_script = redis.register_script(PROMOTE_RETRIES_SCRIPT)
+        self.report_every = report_every
+        self.stats = SenderStats()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._in_flight: set[asyncio.Task] = set()
+        # тексты рассылок по ссылке из сообщений очереди
+        self._texts: OrderedDict[str, str] = OrderedDict()
+
+    async def run(self, stop: asyncio.Event | None = None) -> SenderStats:
+        stop = stop or asyncio.Event()
+        last_report = time.monotonic()
+        last_promote = 0.0
+        async with self.bot:
+            logger.info("Сервис отправки запущен, параллельно: %s", self.concurrency)
+            await self.recover()
+            while not stop.is_set():
+                if time.monotonic() - last_promote >= 1:
+                    await self.promote_retries()
+                    last_promote = time.monotonic()
+
+                raw = await self.redis.blmove(
+                    OUTBOX_KEY, self.processing_key, 1, src="RIGHT", dest="LEFT"
+                )
+                if raw is not None:
+                    await self._slots.acquire()
+                    if self.limiter is None:
+                        await self.pacer.wait()
+                    task = asyncio.create_task(self._send(raw))
+                    self._in_flight.add(task)
+                    task.add_done_callback(self._in_flight.discard)
+
+                if time.monotonic() - last_report >= self.report_every:
+                    await self.report()
+                    last_report = time.monotonic()
+
+            if self._in_flight:
+                await asyncio.gather(*self._in_flight)
+        logger.info("Сервис отправки остановлен. %s", self.stats)
+        return self.stats
+
+    async def recover(self) -> int:
+        """Возвращает в очередь сообщения, не отправленные до остановки сервиса.
+
+        Они переносятся в её начало в прежнем порядке.
+        """
+        recovered = 0
+        while await self.redis.lmove(
+            self.processing_key, OUTBOX_KEY, src="LEFT", dest="RIGHT"
+        ):
+            recovered += 1
+        if recovered:
+            logger.warning("Возвращено в очередь после перезапуска: %s", recovered)
+        return recovered
+
+    async def promote_retries(self) -> int:
+        """Переносит в очередь сообщения, для которых наступило время повтора"""
+        return await self.promote_script(
+            keys=[RETRY_KEY, OUTBOX_KEY], args=[time.time(), RETRY_BATCH]
+        )
+
+    async def report(self) -> None:
+        metrics = await self.limiter.metrics() if self.limiter else {}
+        logger.info("%s. Ограничитель: %s", self.stats, metrics)
+
+    async def _text(self, message: dict) -> str | None:
+        """Текст сообщения: сам текст или ссылка на текст рассылки"""
+        if "text" in message:
+            return message["text"]
+
+        payload_id = message["payload"]
+        if payload_id in self._texts:
+            self._texts.move_to_end(payload_id)
+            return self._texts[payload_id]
+
+        text = await self.redis.get(PAYLOAD_KEY.format(payload_id=payload_id))
+        if text is not None:
+            self._texts[payload_id] = text
+            if len(self._texts) > 256:
+                self._texts.popitem(last=False)
+        return text
+
+    async def _send(self, raw: str) -> None:
+        try:
+            started_at = time.monotonic()
+            message = json.loads(raw)
+            text = await self._text(message)
+            if text is None:
+                logger.error("[%s]: Текст рассылки устарел", message["chat_id"])
+                self.stats.record(FAILED, time.time() - message["enqueued_at"], 0.0)
+                await self.redis.lrem(self.processing_key, 1, raw)
+                return
+
+            status = await deliver_message(
+                self.bot,
+                message["chat_id"],
+                text,
+                self.limiter,
+                message.get("key"),
+            )
+            self.stats.record(
+                status,
+                time.time() - message["enqueued_at"],
+                time.monotonic() - started_at,
+            )
+            if (
+                status in (FAILED, UNREACHABLE)
+                and message["attempt"] < self.max_attempts
+            ):
+                # повтор с экспоненциальной паузой, а не сразу в очередь
+                delay = self.retry_delay * 2 ** (message["attempt"] - 1)
+                message["attempt"] += 1
+                await self.redis.zadd(
+                    RETRY_KEY, {json.dumps(message): time.time() + delay}
+                )
+            # падение до этой строки - сообщение вернётся в очередь при запуске
+            await self.redis.lrem(self.processing_key, 1, raw)
+        finally:
+            self._slots.release()
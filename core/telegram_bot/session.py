@@ -0,0 +1,127 @@
+"""
+Сессии пользователей бота в памяти процесса.
+
+Сессия хранит id пользователя Django, id его подписки и подписанные классы по
+типам соревнований. Загружается при первом обращении пользователя, живёт
+TELEGRAM_SESSION_TTL секунд, лишние сессии вытесняются по LRU. Переключение
+подписки из бота сразу обновляет сессию, поэтому нажатие на класс не читает
+из базы ни пользователя, ни его подписки.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from gymkhanagp.reference import (
+    CompetitionTypeInfo,
+    SportsmanClassInfo,
+    reference_cache,
+)
+
+from telegram_bot.repositories import subscriptions, users
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UserSession:
+    user_id: int
+    subscription_id: int
+    subscribed: dict[str, set[str]] = field(default_factory=dict)
+    expires_at: float = 0.0
+
+    def subscribed_classes(self, competition: str) -> set[str]:
+        """Классы, на которые подписан пользователь в типе соревнований"""
+        return self.subscribed.setdefault(competition, set())
+
+
+def _subscribed_by_competition(
+    rows: list[tuple[int, int]],
+) -> dict[str, set[str]]:
+    """Пары (тип соревнований, класс) из базы в названия из справочников"""
+    competitions = {
+        competition.id: competition.name
+        for competition in reference_cache.competition_types().values()
+    }
+    subscribed: dict[str, set[str]] = {}
+    for competition_id, class_id in rows:
+        competition = competitions.get(competition_id)
+        sportsman_class = reference_cache.sportsman_class_by_id(class_id)
+        if competition and sportsman_class:
+            subscribed.setdefault(competition, set()).add(sportsman_class.name)
+    return subscribed
+
+
+class SessionCache:
+    """LRU сессий по telegram id с ограниченным временем жизни"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._sessions: OrderedDict[int, UserSession] = OrderedDict()
+
+    async def get(self, telegram_id: int) -> UserSession | None:
+        """Сессия пользователя, None - пользователь не зарегистрирован"""
+        now = time.monotonic()
+        session = self._sessions.get(telegram_id)
+        if session is not None and session.expires_at > now:
+            self._sessions.move_to_end(telegram_id)
+            return session
+
+        session = await self._load(telegram_id)
+        if session is None:
+            self._sessions.pop(telegram_id, None)
+            return None
+        session.expires_at = now + self.ttl
+        self._sessions[telegram_id] = session
+        self._sessions.move_to_end(telegram_id)
+        if len(self._sessions) > self.max_size:
+            self._sessions.popitem(last=False)
+        return session
+
+    @staticmethod
+    async def _load(telegram_id: int) -> UserSession | None:
+        user_id = await users.get_user_id(telegram_id)
+        if user_id is None:
+            return None
+
+        subscription_id = await subscriptions.get_or_create_user_subscription(user_id)
+        rows = await subscriptions.subscribed_pairs(subscription_id)
+        subscribed = await sync_to_async(_subscribed_by_competition)(rows)
+        logger.debug("[%s]: Загружена сессия пользователя", telegram_id)
+        return UserSession(user_id, subscription_id, subscribed)
+
+    async def toggle(
+        self,
+        session: UserSession,
+        competition: CompetitionTypeInfo,
+        sportsman_class: SportsmanClassInfo,
+    ) -> bool:
+        """Переключает подписку и сразу обновляет сессию.
+
+        Переключение - один запрос без чтения, его результат записывается в
+        сессию. Возвращает True, если пользователь теперь подписан.
+        """
+        is_subscribed = await subscriptions.toggle(
+            session.subscription_id, competition.id, sportsman_class.id
+        )
+        subscribed = session.subscribed_classes(competition.name)
+        if is_subscribed:
+            subscribed.add(sportsman_class.name)
+        else:
+            subscribed.discard(sportsman_class.name)
+        return is_subscribed
+
+    def invalidate(self, telegram_id: int) -> None:
+        self._sessions.pop(telegram_id, None)
+
+    def clear(self) -> None:
+        self._sessions.clear()
+
+
+user_sessions = SessionCache(
+    max_size=settings.TELEGRAM_SESSION_CACHE_SIZE, ttl=settings.TELEGRAM_SESSION_TTL
+)
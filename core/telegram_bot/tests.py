@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 
 from telegram_bot.keyboard import TrackHandler, GGPSubscriptionHandler
+from telegram_bot.session import UserSession
 from telegram_bot.states import States
 
 
@@ -41,31 +42,15 @@ async def test_ggp_subscription_flow():
     update.effective_user = user_mock
 
     with patch(
-        "allauth.socialaccount.models.SocialAccount.objects.filter"
-    ) as mock_filter:
-        mock_query = AsyncMock()
-        mock_account = MagicMock()
-        mock_account.user = MagicMock()
-        mock_query.afirst.return_value = mock_account
-        mock_filter.return_value = mock_query
-
-        async def async_get_or_create(*args, **kwargs):
-            mock_subscription = MagicMock()
-            mock_subscription.id = 1
-            return (mock_subscription, True)  # (instance, created)
-
-        with patch(
-            "gymkhanagp.models.UserSubscription.objects.aget_or_create",
-            side_effect=async_get_or_create,
-        ):
-            # Замокаем _get_user_subscriptions
-            with patch.object(handler, "_get_user_subscriptions", return_value=[]):
-                # Замокаем get_keyboard
-                with patch.object(handler, "get_keyboard", return_value=[["🔙 Назад"]]):
-                    result = await handler.handle(update, context)
-
-                    assert result == States.CLASS_SELECTION
-                    update.message.reply_text.assert_called_once()
-                    # Проверяем, что был вызван reply_text с нужным текстом
-                    args, kwargs = update.message.reply_text.call_args
-                    assert "Выберите класс спортсмена:" in args[0]
+        "telegram_bot.keyboard.user_sessions.get",
+        return_value=UserSession(user_id=1, subscription_id=1),
+    ):
+        # Замокаем get_keyboard
+        with patch.object(handler, "get_keyboard", return_value=[["🔙 Назад"]]):
+            result = await handler.handle(update, context)
+
+            assert result == States.CLASS_SELECTION
+            update.message.reply_text.assert_called_once()
+            # Проверяем, что был вызван reply_text с нужным текстом
+            args, kwargs = update.message.reply_text.call_args
+            assert "Выберите класс спортсмена:" in args[0]
@@ -0,0 +1,90 @@
+"""
+Общее множество чатов, в которые Telegram не доставляет сообщения.
+
+Forbidden (бот заблокирован) сразу записывает чат в множество Redis, рассылки
+отсекают такие чаты до постановки в очередь. Пользователи и подписки
+деактивируются пакетно периодической задачей deactivate_undeliverable_users.
+"""
+
+import logging
+from collections.abc import Iterable
+
+from core.redis_client import get_redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+
+class UndeliverableChats:
+    """Множество недоставляемых чатов и счётчик несостоявшихся отправок"""
+
+    KEY = "telegram:undeliverable"
+    PENDING_KEY = "telegram:undeliverable:pending"
+    SKIPPED_KEY = "telegram:undeliverable:skipped"
+
+    def add(self, chat_id: int) -> None:
+        """Чат недоставляемый, пользователь ждёт пакетной деактивации"""
+        try:
+            pipe = get_redis().pipeline()
+            pipe.sadd(self.KEY, chat_id)
+            pipe.sadd(self.PENDING_KEY, chat_id)
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(
+                "[%s]: Не удалось отметить чат недоставляемым: %s", chat_id, e
+            )
+
+    def discard(self, chat_id: int) -> None:
+        """Пользователь снова написал боту - чат доставляемый"""
+        try:
+            pipe = get_redis().pipeline()
+            pipe.srem(self.KEY, chat_id)
+            pipe.srem(self.PENDING_KEY, chat_id)
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(
+                "[%s]: Не удалось снять отметку недоставляемого: %s", chat_id, e
+            )
+
+    def filter(self, chat_ids: Iterable[int]) -> list[int]:
+        """Чаты без недоставляемых, отсечённые учитываются в статистике.
+
+        Если Redis недоступен, чаты возвращаются как есть.
+        """
+        chat_ids = list(chat_ids)
+        if not chat_ids:
+            return chat_ids
+        try:
+            redis = get_redis()
+            blocked = redis.smismember(self.KEY, chat_ids)
+            deliverable = [
+                chat_id
+                for chat_id, is_blocked in zip(chat_ids, blocked)
+                if not is_blocked
+            ]
+            if skipped := len(chat_ids) - len(deliverable):
+                redis.incrby(self.SKIPPED_KEY, skipped)
+                logger.info("Пропущено недоставляемых чатов: %s", skipped)
+            return deliverable
+        except RedisError as e:
+            logger.warning("Множество недоставляемых чатов недоступно: %s", e)
+            return chat_ids
+
+    def pop_pending(self, count: int) -> list[int]:
+        """Забирает до count чатов, ожидающих деактивации пользователя"""
+        return [int(chat_id) for chat_id in get_redis().spop(self.PENDING_KEY, count)]
+
+    def stats(self) -> dict[str, int]:
+        pipe = get_redis().pipeline()
+        pipe.scard(self.KEY)
+        pipe.scard(self.PENDING_KEY)
+        pipe.get(self.SKIPPED_KEY)
+        undeliverable, pending, skipped = pipe.execute()
+        return {
+            "undeliverable": undeliverable,
+            "pending_deactivation": pending,
+            "skipped_sends": int(skipped or 0),
+        }
+
+
+undeliverable_chats = UndeliverableChats()
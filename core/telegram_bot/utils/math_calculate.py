@@ -4,6 +4,7 @@ from datetime import timedelta
 from typing import Any, Optional, Dict
 
 from g_cup_site.models import StageModel, StageResultModel
+from telegram_bot.repositories import stages
 
 
 class IStageService(ABC):
@@ -82,11 +83,8 @@ class StageService(IStageService):
 
     async def get_active_stage(self) -> Optional[StageModel]:
         """Получение активного этапа"""
-        active_stage = await StageModel.objects.filter(
-            status__in=("judging", "accepting")
-        ).afirst()
-        return active_stage
+        return await stages.get_active_stage()
 
     async def get_best_result(self, stage: StageModel) -> Optional[StageResultModel]:
-        """Получение лучшего результата для этапа"""
-        return await stage.results.order_by("result_time_seconds").afirst()
+        """Получение лучшего результата для этапа вместе с пользователем"""
+        return await stages.get_best_result(stage)
@@ -1,15 +1,23 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
+from collections.abc import Iterable
+from datetime import timedelta
 
 from allauth.socialaccount.models import SocialAccount
 from asgiref.sync import sync_to_async
+from core.caches import shared_cache
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractBaseUser
+from redis.exceptions import RedisError
 from telegram import Bot
-from telegram.error import Forbidden
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+from telegram_bot.rate_limit import TelegramRateLimiter, shared_rate_limiter
+from telegram_bot.undeliverable import undeliverable_chats
 from telegram_bot.utils.math_calculate import TimeConverter
 
 User = get_user_model()
@@ -37,7 +45,123 @@ def get_user_by_tg_id(tg_id: int) -> AbstractBaseUser | None:
     return user
 
 
-async def send_telegram_message(chat_id: int, text: str) -> bool:
+# Итоги доставки одного сообщения
+SENT = "sent"
+BLOCKED = "blocked"
+FAILED = "failed"
+# сбой сети или таймаут, повтор позже может пройти
+UNREACHABLE = "unreachable"
+# уже доставлено раньше (повтор задачи после падения воркера или таймаута)
+DUPLICATE = "duplicate"
+# отметка идемпотентности на время отправки
+SENDING = "sending"
+
+
+async def deactivate_blocked_user(chat_id: int) -> None:
+    """Пользователь заблокировал бота - чат отсекается от рассылок сразу,
+    пользователь деактивируется пакетно задачей deactivate_undeliverable_users
+    """
+    logger.info("[%s]: Пользователь заблокировал, переводим его в неактивного", chat_id)
+    await sync_to_async(undeliverable_chats.add)(chat_id)
+
+
+async def deliver_message(
+    bot: Bot,
+    chat_id: int,
+    text: str,
+    limiter: TelegramRateLimiter | None = None,
+    idempotency_key: str | None = None,
+) -> str:
+    """Отправка одного сообщения, возвращает итог доставки.
+
+    С ограничителем отправка ждёт свободный токен общего лимита и лимита чата,
+    а RetryAfter ставит на паузу всех отправителей. С ключом идемпотентности
+    доставка в чат отмечается в кэше в два шага: до отправки - короткой
+    отметкой "отправляется" (TELEGRAM_IDEMPOTENCY_CLAIM_TTL), после ответа
+    Telegram - отметкой "доставлено" на TELEGRAM_IDEMPOTENCY_TTL. Повтор того
+    же уведомления не отправляется, неудачная отправка снимает отметку, а
+    если процесс упал посреди отправки, отметка истечёт и повтор пройдёт.
+    """
+    if idempotency_key is None:
+        return await _send_message(bot, chat_id, text, limiter)
+
+    key = f"telegram:sent:{idempotency_key}:{chat_id}"
+    try:
+        claimed = await shared_cache.aadd(
+            key, SENDING, timeout=settings.TELEGRAM_IDEMPOTENCY_CLAIM_TTL
+        )
+    except RedisError as e:
+        # без кэша лучше рискнуть дублем, чем не отправить
+        logger.warning("[%s]: Проверка повтора недоступна: %s", chat_id, e)
+        return await _send_message(bot, chat_id, text, limiter)
+
+    if not claimed:
+        logger.info("[%s]: Повтор %s не отправлен", chat_id, idempotency_key)
+        return DUPLICATE
+
+    status = await _send_message(bot, chat_id, text, limiter)
+    try:
+        if status in (FAILED, UNREACHABLE):
+            await shared_cache.adelete(key)
+        else:
+            await shared_cache.aset(
+                key, status, timeout=settings.TELEGRAM_IDEMPOTENCY_TTL
+            )
+    except RedisError as e:
+        logger.warning("[%s]: Не удалось обновить отметку доставки: %s", chat_id, e)
+    return status
+
+
+async def _send_message(
+    bot: Bot,
+    chat_id: int,
+    text: str,
+    limiter: TelegramRateLimiter | None = None,
+) -> str:
+    """Отправка одного сообщения с повтором по RetryAfter"""
+    try:
+        if limiter:
+            await limiter.acquire(chat_id)
+        await bot.send_message(chat_id=chat_id, text=text)
+    except RetryAfter as e:
+        # Telegram попросил подождать, повторяем один раз
+        logger.warning("[%s]: RetryAfter %s сек", chat_id, e.retry_after)
+        try:
+            if limiter:
+                await limiter.pause(_retry_after_seconds(e))
+                await limiter.acquire(chat_id)
+            else:
+                await asyncio.sleep(_retry_after_seconds(e))
+            await bot.send_message(chat_id=chat_id, text=text)
+        except Exception:
+            logger.exception("[%s]: Повторная отправка не удалась", chat_id)
+            return FAILED
+    except Forbidden:
+        await deactivate_blocked_user(chat_id)
+        return BLOCKED
+    except BadRequest:
+        logger.exception("[%s]: Telegram отклонил сообщение", chat_id)
+        return FAILED
+    except NetworkError as e:
+        logger.warning("[%s]: Telegram недоступен: %s", chat_id, e)
+        return UNREACHABLE
+    except Exception:
+        logger.exception("[%s]: Ошибка отправки в Telegram", chat_id)
+        return FAILED
+    return SENT
+
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+async def send_telegram_message(
+    chat_id: int, text: str, idempotency_key: str | None = None
+) -> str:
+    """Отправка одного сообщения, возвращает итог доставки"""
     if TOKEN is None:
         raise ValueError(
             "Token для бота не установлен, пожалуйста установите TOKEN для бота в .env"
@@ -45,24 +169,41 @@ async def send_telegram_message(chat_id: int, text: str) -> bool:
 
     bot = Bot(token=TOKEN)
     logger.info("[%s]: %s", chat_id, text)
-    try:
-        await bot.send_message(chat_id=chat_id, text=text)
-    except Forbidden:
-        logger.info(
-            "[%s]: Пользователь заблокировал, переводим его в неактивного", chat_id
-        )
-        user: AbstractBaseUser | None = await get_user_by_tg_id(chat_id)
-        if user is None:
-            logger.error(
-                "Сообщение пользователю не выслано, т.к. найденный пользователь us None"
+    async with shared_rate_limiter() as limiter:
+        return await deliver_message(bot, chat_id, text, limiter, idempotency_key)
+
+
+async def send_telegram_messages(
+    chat_ids: Iterable[int],
+    text: str,
+    rate: float,
+    idempotency_key: str | None = None,
+) -> dict[int, str]:
+    """Рассылка одного сообщения списку чатов одним экземпляром Bot.
+
+    Темп задаёт общий ограничитель Telegram, без него сообщения уходят не чаще
+    rate в секунду. Возвращаются итоги по каждому чату.
+    """
+    interval = 1 / rate
+    outcomes = {}
+    loop = asyncio.get_running_loop()
+    async with Bot(token=TOKEN) as bot, shared_rate_limiter() as limiter:
+        for chat_id in chat_ids:
+            started_at = loop.time()
+            outcomes[chat_id] = await deliver_message(
+                bot, chat_id, text, limiter, idempotency_key
             )
-            return False
-        user.is_active = False
-        user.save()
-    except Exception as e:
-        logger.error(f"Telegram send error: {e}", exc_info=True)
-
-    return True
+            if limiter is None:
+                await asyncio.sleep(max(0.0, interval - (loop.time() - started_at)))
+    logger.info(
+        "Рассылка %s чатам: %s",
+        len(outcomes),
+        {
+            status: list(outcomes.values()).count(status)
+            for status in set(outcomes.values())
+        },
+    )
+    return outcomes
 
 
 class MessageTimeTableFormatter:
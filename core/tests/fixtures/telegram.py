@@ -10,6 +10,16 @@ User = get_user_model()
 # =============================================================================
 
 
+@pytest.fixture(autouse=True)
+def clear_user_sessions():
+    """Сессии бота не должны переживать очистку БД между тестами"""
+    from telegram_bot.session import user_sessions
+
+    user_sessions.clear()
+    yield
+    user_sessions.clear()
+
+
 @pytest.fixture
 def telegram_update():
     """
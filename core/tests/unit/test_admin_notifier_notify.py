@@ -1,6 +1,8 @@
 import pytest
 from unittest.mock import patch, MagicMock
 
+from asgiref.sync import sync_to_async
+
 from users.utils import AdminNotifier
 
 
@@ -34,7 +36,7 @@ class TestAdminNotifierNotifyAdmin:
         # Arrange
 
         # Act
-        result = AdminNotifier.notify_admin(test_message)
+        result = await sync_to_async(AdminNotifier.notify_admin)(test_message)
 
         # Assert
         assert result is True
@@ -58,7 +60,7 @@ class TestAdminNotifierNotifyAdmin:
         # Arrange
 
         # Act
-        result = AdminNotifier.notify_admin("Test message")
+        result = await sync_to_async(AdminNotifier.notify_admin)("Test message")
 
         # Assert
 
@@ -84,7 +86,7 @@ class TestAdminNotifierNotifyAdmin:
         # Arrange
 
         # Act
-        result = AdminNotifier.notify_admin("Test message")
+        result = await sync_to_async(AdminNotifier.notify_admin)("Test message")
 
         # Assert
         assert not result
@@ -108,7 +110,7 @@ class TestAdminNotifierNotifyAdmin:
         # Arrange
 
         # Act
-        result = AdminNotifier.notify_admin("Test message")
+        result = await sync_to_async(AdminNotifier.notify_admin)("Test message")
 
         # Assert
         assert not result
@@ -138,7 +140,7 @@ class TestAdminNotifierNotifyAdmin:
         mock_send_task.delay.side_effect = type_error
 
         # Act
-        result = AdminNotifier.notify_admin("Test message")
+        result = await sync_to_async(AdminNotifier.notify_admin)("Test message")
 
         # Assert
         assert not result
@@ -164,7 +166,7 @@ class TestAdminNotifierNotifyAdmin:
         mock_user_filter.return_value.first = MagicMock(side_effect=type_error)
 
         # Act
-        result = AdminNotifier.notify_admin("Test message")
+        result = await sync_to_async(AdminNotifier.notify_admin)("Test message")
 
         # Assert
         assert not result
@@ -16,7 +16,7 @@ class TestTrackHandler:
     Проверяют корректность обработки команды отправки карты этапа.
     """
 
-    @patch("telegram_bot.keyboard.StageModel.objects.filter")
+    @patch("telegram_bot.repositories.StageModel.objects.filter")
     async def test_handle_stage_found_sends_photo(
         self, mock_stage_filter, telegram_update, telegram_context
     ):
@@ -51,7 +51,7 @@ class TestTrackHandler:
         assert "Test Stage" in call_args.kwargs["caption"]  # Проверка caption
         assert "gymkhana-cup.ru" in call_args.kwargs["caption"]  # Проверка ссылки
 
-    @patch("telegram_bot.keyboard.StageModel.objects.filter")
+    @patch("telegram_bot.repositories.StageModel.objects.filter")
     async def test_handle_stage_not_found_sends_text(
         self, mock_stage_filter, telegram_update, telegram_context
     ):
@@ -77,7 +77,7 @@ class TestTrackHandler:
             "Нет активных соревнований"
         )
 
-    @patch("telegram_bot.keyboard.StageModel.objects.filter")
+    @patch("telegram_bot.repositories.StageModel.objects.filter")
     async def test_handle_stage_exists_no_track_url(
         self, mock_stage_filter, telegram_update, telegram_context
     ):
@@ -109,7 +109,7 @@ class TestTrackHandler:
     # TODO: Добавь тест на обработку исключений
     @pytest.mark.parametrize("db_error", [DatabaseError, IntegrityError, DataError])
     @patch("telegram_bot.keyboard.logger")
-    @patch("telegram_bot.keyboard.StageModel.objects.filter")
+    @patch("telegram_bot.repositories.StageModel.objects.filter")
     async def test_handle_database_error(
         self,
         mock_stage_filter,
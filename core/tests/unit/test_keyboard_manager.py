@@ -0,0 +1,176 @@
+import time
+import tracemalloc
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from gymkhanagp.reference import SportsmanClassInfo
+from telegram import ReplyKeyboardMarkup
+from telegram_bot.bot import setup_bot
+from telegram_bot.keyboard import BACK_BUTTON, ClassSelectionKeyboards
+from telegram_bot.manager import KeyboardManager
+from telegram_bot.states import States
+
+CLASSES = {
+    name: SportsmanClassInfo(name, None, emoji)
+    for name, emoji in [("A", "🟥"), ("B", "🟧"), ("C1", "🟩"), ("C2", "🟦")]
+}
+
+
+def make_update(text: str) -> SimpleNamespace:
+    async def reply_text(*args, **kwargs):
+        return None
+
+    return SimpleNamespace(message=SimpleNamespace(text=text, reply_text=reply_text))
+
+
+def make_context(manager: KeyboardManager, state: States = States.MAIN_MENU):
+    return SimpleNamespace(
+        bot_data={KeyboardManager.BOT_DATA_KEY: manager},
+        user_data={"state": state},
+    )
+
+
+@pytest.mark.django_db
+class TestKeyboardManager:
+    def test_setup_bot_builds_single_manager(self):
+        application = setup_bot()
+
+        manager = application.bot_data[KeyboardManager.BOT_DATA_KEY]
+        assert isinstance(manager, KeyboardManager)
+        assert KeyboardManager.from_context(application) is manager
+
+    def test_handlers_share_manager(self):
+        manager = KeyboardManager()
+
+        handlers = [*manager._handlers.values(), *manager._state_handlers.values()]
+        assert all(handler.manager is manager for handler in handlers)
+        assert set(manager._state_handlers) == {
+            States.CLASS_SELECTION,
+            States.BASE_CLASS_SELECTION,
+            States.BUG_REPORT_WAIT,
+            States.FEATURE_REPORT_WAIT,
+        }
+
+    @pytest.mark.asyncio
+    async def test_state_dispatch(self, telegram_update):
+        manager = KeyboardManager()
+        handler = manager._state_handlers[States.BUG_REPORT_WAIT]
+        handler.handle = AsyncMock(return_value=States.MAIN_MENU)
+        context = make_context(manager, States.BUG_REPORT_WAIT)
+
+        await manager.handle_message(telegram_update, context)
+
+        handler.handle.assert_awaited_once_with(telegram_update, context)
+        assert context.user_data["state"] == States.MAIN_MENU
+
+    @pytest.mark.asyncio
+    async def test_back_returns_prebuilt_main_menu(self, telegram_update):
+        manager = KeyboardManager()
+        telegram_update.message.text = BACK_BUTTON
+        context = make_context(manager, States.CLASS_SELECTION)
+
+        await manager.handle_message(telegram_update, context)
+
+        assert context.user_data["state"] == States.MAIN_MENU
+        reply_markup = telegram_update.message.reply_text.call_args.kwargs[
+            "reply_markup"
+        ]
+        assert reply_markup is manager.get_main_keyboard()
+
+
+@pytest.mark.django_db
+class TestClassSelectionKeyboards:
+    def test_markup_marks_subscriptions(self):
+        keyboards = ClassSelectionKeyboards()
+
+        markup = keyboards.markup("ggp", CLASSES, ["C1"])
+
+        assert [[button.text for button in row] for row in markup.keyboard] == [
+            ["🔲 A", "🔲 B", "🟩 C1"],
+            ["🔲 C2"],
+            [BACK_BUTTON],
+        ]
+
+    def test_markup_reused_for_same_subscriptions(self):
+        keyboards = ClassSelectionKeyboards()
+
+        markup = keyboards.markup("ggp", CLASSES, ["C1", "A"])
+
+        assert keyboards.markup("ggp", CLASSES, ["A", "C1"]) is markup
+        assert keyboards.markup("ggp", CLASSES, ["A"]) is not markup
+        assert keyboards.markup("base", CLASSES, ["A", "C1"]) is not markup
+
+    def test_reloaded_classes_rebuild_layout(self):
+        keyboards = ClassSelectionKeyboards()
+        markup = keyboards.markup("ggp", CLASSES, [])
+
+        reloaded = {**CLASSES, "D": SportsmanClassInfo("D", None, "⬜")}
+        rebuilt = keyboards.markup("ggp", reloaded, [])
+
+        assert rebuilt is not markup
+        assert rebuilt.keyboard[1][1].text == "🔲 D"
+
+    def test_markups_bounded(self):
+        keyboards = ClassSelectionKeyboards()
+        keyboards.MAX_MARKUPS = 2
+
+        for subscribed in (["A"], ["B"], ["C1"]):
+            keyboards.markup("ggp", CLASSES, subscribed)
+
+        assert len(keyboards._markups) == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_benchmark_update_dispatch():
+    """Бенчмарк: память и время на сообщение с менеджером на каждое
+    сообщение и с общим менеджером.
+    """
+    updates = 200
+    manager = KeyboardManager()
+
+    def legacy_class_keyboard():
+        # как строилась клавиатура выбора класса до общих раскладок
+        keyboard = [
+            [f"🔲 {cls.name}" for cls in list(CLASSES.values())[i : i + 3]]
+            for i in range(0, len(CLASSES), 3)
+        ]
+        keyboard.append([BACK_BUTTON])
+        return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+
+    async def legacy(update, context):
+        context.user_data["state"] = States.CLASS_SELECTION
+        await KeyboardManager().handle_message(update, context)
+        legacy_class_keyboard()
+
+    async def shared(update, context):
+        context.user_data["state"] = States.CLASS_SELECTION
+        await KeyboardManager.from_context(context).handle_message(update, context)
+        manager.class_keyboards.markup("ggp", CLASSES, [])
+
+    async def measure(dispatch):
+        # возврат из выбора класса: главное меню и клавиатура выбора класса
+        update = make_update(BACK_BUTTON)
+        context = make_context(manager)
+        await dispatch(update, context)
+        tracemalloc.start()
+        started_at = time.perf_counter()
+        for _ in range(updates):
+            await dispatch(update, context)
+        elapsed = time.perf_counter() - started_at
+        # объекты сообщения освобождаются, пик - память одного сообщения
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed / updates, peak
+
+    before_latency, before_memory = await measure(legacy)
+    after_latency, after_memory = await measure(shared)
+
+    summary = (
+        f"На сообщение до: {before_latency * 1e6:.0f}мкс, {before_memory} байт; "
+        f"после: {after_latency * 1e6:.0f}мкс, {after_memory} байт"
+    )
+    assert after_latency < before_latency, summary
+    assert after_memory < before_memory, summary
@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from core.queue_metrics import (
+    WAIT_KEY,
+    queue_wait_stats,
+    record_queue_wait,
+    stamp_enqueued_at,
+)
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from core import celery_app, queue_metrics
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "task, queue",
+    [
+        ("gymkhanagp.tasks.send_telegram_message_task", "telegram_high"),
+        ("gymkhanagp.tasks.send_telegram_broadcast_task", "telegram_bulk"),
+        ("gymkhanagp.tasks.flush_notification_digest", "telegram_bulk"),
+        ("g_cup_site.tasks.stage_update.stage_update", "celery"),
+    ],
+)
+def test_task_routes(task, queue):
+    assert celery_app.amqp.router.route({}, task)["queue"].name == queue
+
+
+@pytest.mark.django_db
+class TestQueueMetrics:
+    """Тесты времени ожидания задач в очередях."""
+
+    def test_publish_stamps_enqueued_at(self):
+        headers = {}
+
+        stamp_enqueued_at(headers=headers)
+
+        assert headers["enqueued_at"] > 0
+
+    @pytest.fixture(autouse=True)
+    def pending_waits(self, settings):
+        settings.QUEUE_METRICS_FLUSH_SIZE = 3
+        settings.QUEUE_METRICS_FLUSH_INTERVAL = 3600
+        queue_metrics._pending.clear()
+        yield
+        queue_metrics._pending.clear()
+
+    @patch("core.queue_metrics.time.time", return_value=1010.0)
+    @patch("core.queue_metrics.get_redis")
+    def test_waits_written_in_one_pipeline(self, mock_redis, _time):
+        pipe = mock_redis.return_value.pipeline.return_value
+
+        def make_task(enqueued_at, queue):
+            return SimpleNamespace(
+                request=SimpleNamespace(
+                    enqueued_at=enqueued_at, delivery_info={"routing_key": queue}
+                )
+            )
+
+        record_queue_wait(task=make_task(1000.0, "telegram_high"))
+        record_queue_wait(task=make_task(1005.0, "telegram_high"))
+        # значения копятся в процессе, запуск задачи не ходит в Redis
+        mock_redis.assert_not_called()
+
+        record_queue_wait(task=make_task(1009.0, "celery"))
+
+        key = WAIT_KEY.format(queue="telegram_high")
+        pipe.lpush.assert_any_call(key, 10.0, 5.0)
+        pipe.lpush.assert_any_call(WAIT_KEY.format(queue="celery"), 1.0)
+        pipe.ltrim.assert_any_call(key, 0, 999)
+        pipe.execute.assert_called_once()
+
+    @patch("core.queue_metrics.get_redis")
+    def test_redis_error_drops_window(self, mock_redis):
+        mock_redis.return_value.pipeline.return_value.execute.side_effect = (
+            RedisConnectionError("refused")
+        )
+        queue_metrics._pending["celery"].append(1.0)
+
+        queue_metrics.flush_queue_waits()
+
+        assert not queue_metrics._pending
+
+    def test_eager_task_without_stamp_ignored(self):
+        task = SimpleNamespace(request=SimpleNamespace(delivery_info=None))
+
+        with patch("core.queue_metrics.get_redis") as mock_redis:
+            record_queue_wait(task=task)
+
+        mock_redis.assert_not_called()
+
+    @patch("core.queue_metrics.get_redis")
+    def test_wait_percentiles(self, mock_redis):
+        mock_redis.return_value = MagicMock()
+        mock_redis.return_value.lrange.return_value = [str(i) for i in range(1, 101)]
+
+        stats = queue_wait_stats("telegram_bulk")
+
+        assert stats["samples"] == 100
+        assert stats["p95"] == pytest.approx(95, abs=1)
+        assert stats["max"] == 100
@@ -26,7 +26,7 @@ class TestReportHandler:
         assert message == "✅ Отчет успешно сохранен!"
 
         # Проверяем, что отчет создался в базе
-        report = await Report.objects.aget()
+        report = await Report.objects.select_related("user").aget()
         assert report.user == django_user
         assert report.text == "Достаточно длинный текст для отчета о проблеме"
         assert report.source == SourceReports.TELEGRAM
@@ -0,0 +1,208 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from django.core.cache import cache
+from celery.exceptions import Retry
+from gymkhanagp.tasks import (
+    broadcast_telegram_message,
+    send_telegram_broadcast_task,
+    send_telegram_message_task,
+)
+from telegram.error import BadRequest, Forbidden, NetworkError
+from telegram_bot.utils import messages
+
+
+@pytest.fixture
+def mock_bot():
+    """Bot, который не ходит в сеть."""
+    bot = MagicMock()
+    bot.__aenter__ = AsyncMock(return_value=bot)
+    bot.__aexit__ = AsyncMock(return_value=None)
+    bot.send_message = AsyncMock()
+    with patch.object(messages, "Bot", return_value=bot):
+        yield bot
+
+
+@pytest.mark.django_db
+class TestSendTelegramMessages:
+    """Тесты рассылки одного сообщения списку чатов."""
+
+    async def test_outcomes_per_chat(self, mock_bot):
+        async def send_message(chat_id, text):
+            if chat_id == 2:
+                raise Forbidden("bot was blocked by the user")
+            if chat_id == 3:
+                raise NetworkError("timeout")
+
+        mock_bot.send_message.side_effect = send_message
+
+        with patch.object(
+            messages, "deactivate_blocked_user", new_callable=AsyncMock
+        ) as mock_deactivate:
+            outcomes = await messages.send_telegram_messages([1, 2, 3], "text", 1000)
+
+        assert outcomes == {
+            1: messages.SENT,
+            2: messages.BLOCKED,
+            3: messages.UNREACHABLE,
+        }
+        mock_deactivate.assert_awaited_once_with(2)
+
+    async def test_one_bot_and_pacing(self, mock_bot):
+        with patch.object(messages.asyncio, "sleep", new_callable=AsyncMock) as sleep:
+            await messages.send_telegram_messages([1, 2, 3, 4], "text", rate=10)
+
+        assert messages.Bot.call_count == 1
+        assert mock_bot.send_message.await_count == 4
+        assert sleep.await_count == 4
+        assert all(0 < call.args[0] <= 0.1 for call in sleep.await_args_list)
+
+
+@pytest.mark.django_db
+class TestSendTelegramBroadcastTask:
+    """Тесты задачи рассылки."""
+
+    @patch("gymkhanagp.tasks.send_telegram_messages", new_callable=AsyncMock)
+    def test_summary_and_retry_only_failed(self, mock_send):
+        mock_send.return_value = {
+            1: messages.SENT,
+            2: messages.SENT,
+            3: messages.BLOCKED,
+            4: messages.FAILED,
+        }
+
+        with patch.object(send_telegram_broadcast_task, "apply_async") as mock_retry:
+            summary = send_telegram_broadcast_task([1, 2, 3, 4], "text")
+
+        assert summary == {
+            "sent": 2,
+            "blocked": [3],
+            "failed": [4],
+            "duplicate": 0,
+            "retries": 0,
+        }
+        assert mock_retry.call_args.args[0] == ([4], "text", None)
+        assert mock_retry.call_args.kwargs["retries"] == 1
+
+    @patch.object(send_telegram_broadcast_task, "delay")
+    def test_broadcast_split_into_batches(self, mock_delay, settings):
+        settings.TELEGRAM_BROADCAST_BATCH_SIZE = 2
+
+        broadcast_telegram_message([1, 2, 3, 4, 5], "text")
+
+        assert [call.args[0] for call in mock_delay.call_args_list] == [
+            [1, 2],
+            [3, 4],
+            [5],
+        ]
+
+
+@pytest.mark.django_db
+class TestSendTelegramMessageTask:
+    """Тесты повторов задачи отправки одного сообщения."""
+
+    @pytest.fixture(autouse=True)
+    def token(self):
+        with patch.object(messages, "TOKEN", "token"):
+            yield
+
+    def test_unreachable_retried(self, mock_bot):
+        mock_bot.send_message.side_effect = NetworkError("timeout")
+
+        with pytest.raises(Retry):
+            send_telegram_message_task.apply((1, "text"), throw=True)
+
+    @pytest.mark.parametrize(
+        "error",
+        [BadRequest("chat not found"), Forbidden("bot was blocked by the user")],
+    )
+    def test_permanent_failure_not_retried(self, mock_bot, error):
+        mock_bot.send_message.side_effect = error
+
+        with patch.object(messages, "deactivate_blocked_user", new_callable=AsyncMock):
+            result = send_telegram_message_task.apply((1, "text"), throw=True)
+
+        assert result.successful()
+        assert mock_bot.send_message.await_count == 1
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    """Настоящий кэш вместо DummyCache из тестовых настроек."""
+    settings.CACHES = {
+        alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        for alias in ("default", "shared", "fingerprints")
+    }
+    cache.clear()
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("locmem_cache")
+class TestIdempotentDelivery:
+    """Тесты защиты от повторной отправки одного уведомления."""
+
+    async def test_repeated_send_suppressed(self, mock_bot):
+        first = await messages.send_telegram_messages([1, 2], "text", 1000, "stage:1")
+        # повтор задачи после того, как Telegram уже принял сообщение
+        second = await messages.send_telegram_messages(
+            [1, 2, 3], "text", 1000, "stage:1"
+        )
+
+        assert first == {1: messages.SENT, 2: messages.SENT}
+        assert second == {
+            1: messages.DUPLICATE,
+            2: messages.DUPLICATE,
+            3: messages.SENT,
+        }
+        assert mock_bot.send_message.await_count == 3
+
+    async def test_failed_send_can_be_retried(self, mock_bot):
+        mock_bot.send_message.side_effect = [NetworkError("timeout"), None]
+
+        first = await messages.deliver_message(mock_bot, 1, "text", None, "stage:1")
+        second = await messages.deliver_message(mock_bot, 1, "text", None, "stage:1")
+
+        assert (first, second) == (messages.UNREACHABLE, messages.SENT)
+
+    async def test_crash_after_claim_allows_retry(self, mock_bot, settings):
+        settings.TELEGRAM_IDEMPOTENCY_CLAIM_TTL = 60
+        # процесс убит, пока сообщение отправляется
+        mock_bot.send_message.side_effect = [asyncio.CancelledError, None]
+        with pytest.raises(asyncio.CancelledError):
+            await messages.deliver_message(mock_bot, 1, "text", None, "stage:1")
+
+        # пока отметка "отправляется" жива, повтор не уходит
+        assert (
+            await messages.deliver_message(mock_bot, 1, "text", None, "stage:1")
+            == messages.DUPLICATE
+        )
+        with patch("time.time", return_value=time.time() + 61):
+            status = await messages.deliver_message(
+                mock_bot, 1, "text", None, "stage:1"
+            )
+        assert status == messages.SENT
+
+        # доставленное помнится дольше отметки "отправляется"
+        with patch("time.time", return_value=time.time() + 600):
+            status = await messages.deliver_message(
+                mock_bot, 1, "text", None, "stage:1"
+            )
+        assert status == messages.DUPLICATE
+        assert mock_bot.send_message.await_count == 2
+
+    async def test_without_key_always_sent(self, mock_bot):
+        await messages.deliver_message(mock_bot, 1, "text")
+        await messages.deliver_message(mock_bot, 1, "text")
+
+        assert mock_bot.send_message.await_count == 2
+
+    @patch("gymkhanagp.tasks.send_telegram_messages", new_callable=AsyncMock)
+    def test_duplicates_counted_in_summary(self, mock_send):
+        mock_send.return_value = {1: messages.SENT, 2: messages.DUPLICATE}
+
+        summary = send_telegram_broadcast_task([1, 2], "text", "stage:1")
+
+        assert summary["duplicate"] == 1
+        assert mock_send.await_args.args[3] == "stage:1"
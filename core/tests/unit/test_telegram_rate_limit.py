@@ -0,0 +1,84 @@
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+from telegram.error import RetryAfter
+from telegram_bot.rate_limit import PAUSE_KEY, TelegramRateLimiter
+from telegram_bot.utils import messages
+
+
+@pytest.fixture
+def redis():
+    """Клиент redis.asyncio без сервера, Lua скрипт подменяется."""
+    client = MagicMock()
+    client.script = AsyncMock(return_value=0)
+    client.register_script.return_value = client.script
+    client.set = AsyncMock()
+    client.hmget = AsyncMock(return_value=[None, None])
+    client.pttl = AsyncMock(return_value=-2)
+    return client
+
+
+@pytest.fixture
+def limiter(redis, settings):
+    settings.TELEGRAM_RATE_GLOBAL = 30
+    settings.TELEGRAM_RATE_PRIVATE_CHAT = 1
+    settings.TELEGRAM_RATE_GROUP_PER_MINUTE = 20
+    return TelegramRateLimiter(redis)
+
+
+@pytest.mark.django_db
+class TestTelegramRateLimiter:
+    """Тесты общего ограничителя Telegram."""
+
+    async def test_waits_for_tokens(self, limiter, redis):
+        redis.script.side_effect = [250, 100, 0]
+
+        with patch("telegram_bot.rate_limit.asyncio.sleep", new_callable=AsyncMock):
+            waited = await limiter.acquire(42)
+
+        assert waited == pytest.approx(0.35)
+        keys = redis.script.await_args.kwargs["keys"]
+        assert keys == ["telegram:bucket:global", "telegram:bucket:chat:42", PAUSE_KEY]
+        assert redis.script.await_args.kwargs["args"] == [30, 30, 1, 1.0]
+
+    async def test_group_chat_limits(self, limiter, redis):
+        await limiter.acquire(-100500)
+
+        rate, capacity = redis.script.await_args.kwargs["args"][2:]
+        assert rate == pytest.approx(20 / 60)
+        assert capacity == 20
+
+    async def test_redis_unavailable_does_not_block(self, limiter, redis):
+        redis.script.side_effect = RedisConnectionError("refused")
+
+        assert await limiter.acquire(1) == 0
+
+    async def test_pause_and_metrics(self, limiter, redis):
+        await limiter.pause(2.5)
+
+        redis.set.assert_awaited_once_with(PAUSE_KEY, 1, px=2500)
+
+        redis.pttl.return_value = 1800
+        metrics = await limiter.metrics()
+        assert metrics == {
+            "global_tokens": 30.0,
+            "global_capacity": 30,
+            "paused_ms": 1800,
+        }
+
+    async def test_retry_after_pauses_cluster(self, limiter):
+        bot = MagicMock()
+        bot.send_message = AsyncMock(
+            side_effect=[RetryAfter(timedelta(seconds=3)), None]
+        )
+        limiter.pause = AsyncMock()
+        limiter.acquire = AsyncMock(return_value=0)
+
+        status = await messages.deliver_message(bot, 1, "text", limiter)
+
+        assert status == messages.SENT
+        limiter.pause.assert_awaited_once_with(3.0)
+        assert limiter.acquire.await_count == 2
+        assert bot.send_message.await_count == 2
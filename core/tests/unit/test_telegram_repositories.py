@@ -0,0 +1,163 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from g_cup_site.models import (
+    AthleteModel,
+    ChampionshipModel,
+    CityModel,
+    CountryModel,
+    MotorcycleModel,
+    StageModel,
+    StageResultModel,
+)
+from gymkhanagp.models import (
+    CompetitionTypeModel,
+    SportsmanClassModel,
+    Subscription,
+)
+from gymkhanagp.reference import reference_cache
+from telegram_bot.commands import bug_report, start
+from telegram_bot.keyboard import BACK_BUTTON
+from telegram_bot.manager import KeyboardManager
+from telegram_bot.repositories import stages, users
+from telegram_bot.states import States
+from users.models import Report, TypeReport
+
+TELEGRAM_ID = 189000981
+
+
+def make_update(text: str) -> MagicMock:
+    update = MagicMock()
+    update.effective_user.id = TELEGRAM_ID
+    update.effective_user.first_name = "Test"
+    update.effective_user.last_name = ""
+    update.effective_user.username = "testuser"
+    update.message.text = text
+    update.message.reply_text = AsyncMock()
+    update.message.reply_photo = AsyncMock()
+    return update
+
+
+def replies(update: MagicMock) -> list[str]:
+    return [
+        call.args[0] if call.args else call.kwargs["text"]
+        for call in update.message.reply_text.call_args_list
+    ]
+
+
+def create_stage_with_result() -> StageModel:
+    country = CountryModel.objects.create(title="Россия")
+    city = CityModel.objects.create(title="Москва", country=country)
+    championship = ChampionshipModel.objects.create(
+        champ_id=1, title="Чемпионат", year=2025, description=""
+    )
+    stage = StageModel.objects.create(
+        stage_id=100,
+        championship=championship,
+        title="Этап",
+        stage_class="A",
+        status="accepting",
+        track_url="http://example.com/track.jpg",
+    )
+    motorcycle = MotorcycleModel.objects.create(title="Moto")
+    for athlete_id, time_ms in ((1, 62000), (2, 60000)):
+        athlete = AthleteModel.objects.create(
+            id=athlete_id,
+            first_name=f"Имя{athlete_id}",
+            last_name=f"Фамилия{athlete_id}",
+            city=city,
+            sportsman_class="C1",
+        )
+        StageResultModel.objects.create(
+            stage=stage,
+            user=athlete,
+            motorcycle=motorcycle,
+            date=timezone.now(),
+            fine=0,
+            result_time_seconds=time_ms,
+            result_time=f"01:0{time_ms // 1000 - 60}.000",
+        )
+    return stage
+
+
+@pytest.mark.django_db
+class TestRepositories:
+    @pytest.mark.parametrize("value", [None, [], "abc", 666666666])
+    def test_get_by_telegram_id_not_found(self, value):
+        assert async_to_sync(users.get_by_telegram_id)(value) is None
+
+    def test_best_result_loads_user(self):
+        stage = create_stage_with_result()
+
+        best_result = async_to_sync(stages.get_best_result)(stage)
+
+        with CaptureQueriesContext(connection) as queries:
+            assert best_result.user.full_name == "Имя2 Фамилия2"
+        assert len(queries) == 0
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+async def test_bot_does_not_block_event_loop(monkeypatch):
+    """Обработчики бота работают без DJANGO_ALLOW_ASYNC_UNSAFE.
+
+    Синхронный запрос в цикле событий поднимает SynchronousOnlyOperation:
+    обработчик падает или отвечает сообщением об ошибке.
+    """
+    monkeypatch.delenv("DJANGO_ALLOW_ASYNC_UNSAFE", raising=False)
+    await CompetitionTypeModel.objects.acreate(name="ggp")
+    await SportsmanClassModel.objects.acreate(name="C1", subscribe_emoji="🟩")
+    reference_cache.invalidate()
+    manager = KeyboardManager()
+    context = MagicMock(
+        args=[], user_data={}, bot_data={KeyboardManager.BOT_DATA_KEY: manager}
+    )
+
+    async def send(text: str) -> list[str]:
+        update = make_update(text)
+        await manager.handle_message(update, context)
+        return replies(update)
+
+    # регистрация и повторный /start
+    update = make_update("/start")
+    await start(update, context)
+    assert replies(update)[0] == "Добро пожаловать, Test!"
+    update = make_update("/start")
+    await start(update, context)
+    assert replies(update) == ["Вы уже зарегестрированы, Test!"]
+
+    # репорты кнопкой и командой
+    context.user_data["state"] = States.BUG_REPORT_WAIT
+    assert await send("Бот не отвечает на кнопку") == [
+        "🐞 Баг-report Успешно зарегестрирован 🐞"
+    ]
+    context.user_data["state"] = States.FEATURE_REPORT_WAIT
+    assert (await send("Добавьте уведомления о базовых фигурах"))[0].startswith(
+        "✨ Фича успешно зарегестрирована"
+    )
+    update = make_update("/bug_report")
+    context.args = ["Не", "приходят", "уведомления"]
+    await bug_report(update, context)
+    assert replies(update) == ["✅ Отчет успешно сохранен!"]
+    assert await Report.objects.filter(user__username=f"tg_{TELEGRAM_ID}").acount() == 3
+    assert await Report.objects.filter(report_type=TypeReport.FEATURE).acount() == 1
+
+    # подписка на класс
+    assert context.user_data["state"] == States.MAIN_MENU
+    assert await send("📝 Подписаться на GGP классы") == ["Выберите класс спортсмена:"]
+    assert await send("🔲 C1") == ["Вы подписаны на GGP класс - C1"]
+    assert await Subscription.objects.filter(sportsman_class__name="C1").aexists()
+    assert await send(BACK_BUTTON) == ["Главное меню:"]
+
+    # этап, карта и временные диапазоны
+    await sync_to_async(create_stage_with_result)()
+    update = make_update("🗺️ Выслать карту GGP")
+    await manager.handle_message(update, context)
+    update.message.reply_photo.assert_awaited_once()
+    timetable = await send("Получить 🕗 этапа")
+    assert timetable[0].startswith("Лидер: 🟩 C1 - Имя2 Фамилия2\nВремя: 01:00.000")
+
+    reference_cache.invalidate()
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from gymkhanagp.tasks import broadcast_telegram_message
+from telegram.error import NetworkError
+from telegram_bot import sender as sender_module
+from telegram_bot.sender import (
+    OUTBOX_KEY,
+    RETRY_KEY,
+    SenderStats,
+    TelegramSender,
+)
+
+
+class FakeRedis:
+    """Списки и множества Redis в памяти, останавливает сервис когда очередь пуста."""
+
+    def __init__(self, stop: asyncio.Event):
+        self.lists: dict[str, list[str]] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.strings: dict[str, str] = {}
+        self.stop = stop
+        self.gets = 0
+
+    def store(self, key, value, ex=None):
+        self.strings[key] = value
+
+    async def get(self, key):
+        self.gets += 1
+        return self.strings.get(key)
+
+    def push(self, key, *values):
+        self.lists.setdefault(key, [])[:0] = reversed(values)
+
+    async def lpush(self, key, *values):
+        self.push(key, *values)
+
+    async def lmove(self, source, destination, src="LEFT", dest="RIGHT"):
+        items = self.lists.get(source)
+        if not items:
+            return None
+        value = items.pop(0 if src == "LEFT" else -1)
+        target = self.lists.setdefault(destination, [])
+        if dest == "LEFT":
+            target.insert(0, value)
+        else:
+            target.append(value)
+        return value
+
+    async def blmove(self, source, destination, timeout, src="LEFT", dest="RIGHT"):
+        await asyncio.sleep(0)
+        value = await self.lmove(source, destination, src, dest)
+        if value is None:
+            self.stop.set()
+        return value
+
+    async def lrem(self, key, count, value):
+        self.lists[key].remove(value)
+        return 1
+
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def register_script(self, script):
+        async def promote(keys, args):
+            retries, outbox = keys
+            due = [
+                message
+                for message, score in self.zsets.get(retries, {}).items()
+                if score <= args[0]
+            ]
+            for message in due:
+                del self.zsets[retries][message]
+                self.lists.setdefault(outbox, []).append(message)
+            return len(due)
+
+        return promote
+
+
+def make_bot(send_message) -> MagicMock:
+    bot = MagicMock()
+    bot.__aenter__ = AsyncMock(return_value=bot)
+    bot.__aexit__ = AsyncMock(return_value=None)
+    bot.send_message = AsyncMock(side_effect=send_message)
+    return bot
+
+
+@pytest.mark.django_db
+class TestTelegramSender:
+    """Тесты сервиса отправки из очереди Redis."""
+
+    async def test_sends_queue_concurrently_with_one_bot(self):
+        stop = asyncio.Event()
+        redis = FakeRedis(stop)
+        in_flight = 0
+        max_in_flight = 0
+
+        async def send_message(chat_id, text):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+        sync_redis = MagicMock()
+        pipe = sync_redis.pipeline.return_value
+        pipe.lpush.side_effect = redis.push
+        pipe.set.side_effect = redis.store
+        with patch.object(sender_module, "get_redis", return_value=sync_redis):
+            sender_module.enqueue_messages(range(20), "text")
+        bot = make_bot(send_message)
+
+        stats = await TelegramSender(redis, bot, concurrency=4, rate=10_000).run(stop)
+
+        assert bot.send_message.await_count == 20
+        assert bot.__aenter__.await_count == 1
+        assert stats.statuses["sent"] == 20
+        assert 1 < max_in_flight <= 4
+        sent_order = [
+            call.kwargs["chat_id"] for call in bot.send_message.await_args_list
+        ]
+        assert sorted(sent_order) == list(range(20))
+        # текст хранится один раз, сервис читает его из Redis однажды
+        assert len(redis.strings) == 1
+        assert all(
+            "text" not in item
+            for item in map(json.loads, pipe.lpush.call_args.args[1:])
+        )
+        assert redis.gets <= 4
+
+    async def test_failed_message_retried_until_max_attempts(self):
+        stop = asyncio.Event()
+        redis = FakeRedis(stop)
+        redis.push(
+            OUTBOX_KEY,
+            json.dumps({"chat_id": 1, "text": "t", "enqueued_at": 0, "attempt": 1}),
+        )
+        bot = make_bot(NetworkError("timeout"))
+
+        sender = TelegramSender(
+            redis, bot, concurrency=1, rate=10_000, max_attempts=3, retry_delay=0
+        )
+        # ждём повторные попытки, которые сервис вернул в очередь
+        while True:
+            stop.clear()
+            await sender.run(stop)
+            if not redis.lists.get(OUTBOX_KEY) and not redis.zsets.get(RETRY_KEY):
+                break
+
+        assert bot.send_message.await_count == 3
+        assert sender.stats.statuses["unreachable"] == 3
+        assert redis.lists[sender.processing_key] == []
+
+    async def test_failed_message_waits_for_retry_time(self):
+        stop = asyncio.Event()
+        redis = FakeRedis(stop)
+        redis.push(
+            OUTBOX_KEY,
+            json.dumps({"chat_id": 1, "text": "t", "enqueued_at": 0, "attempt": 1}),
+        )
+        bot = make_bot(NetworkError("timeout"))
+
+        sender = TelegramSender(redis, bot, concurrency=1, rate=10_000, retry_delay=60)
+        await sender.run(stop)
+
+        assert bot.send_message.await_count == 1
+        assert redis.lists[OUTBOX_KEY] == []
+        [(message, retry_at)] = redis.zsets[RETRY_KEY].items()
+        assert json.loads(message)["attempt"] == 2
+        assert retry_at == pytest.approx(time.time() + 60, abs=5)
+
+    async def test_messages_in_processing_recovered_on_start(self):
+        """Сообщения, забранные сервисом до падения, отправляются после запуска"""
+        stop = asyncio.Event()
+        redis = FakeRedis(stop)
+        bot = make_bot(None)
+        sender = TelegramSender(redis, bot, concurrency=1, rate=10_000)
+        # забраны из очереди по порядку: 1, затем 2
+        redis.push(
+            sender.processing_key,
+            *(
+                json.dumps({"chat_id": chat_id, "text": "t", "enqueued_at": 0})
+                for chat_id in (1, 2)
+            ),
+        )
+
+        await sender.run(stop)
+
+        sent_order = [
+            call.kwargs["chat_id"] for call in bot.send_message.await_args_list
+        ]
+        assert sent_order == [1, 2]
+        assert redis.lists[sender.processing_key] == []
+
+
+@pytest.mark.django_db
+class TestSenderStats:
+    def test_percentiles(self):
+        stats = SenderStats()
+        for latency in range(1, 101):
+            stats.record("sent", latency / 10, latency / 1000)
+
+        assert stats.percentile(stats.send_latencies, 50) == pytest.approx(0.05, 0.05)
+        assert stats.percentile(stats.send_latencies, 99) == pytest.approx(0.099)
+        assert "p95=" in str(stats)
+
+
+@pytest.mark.django_db
+@patch("gymkhanagp.tasks.enqueue_messages")
+def test_broadcast_uses_redis_backend(mock_enqueue, settings):
+    settings.TELEGRAM_SENDER_BACKEND = "redis"
+
+    broadcast_telegram_message([1, 2], "text")
+
+    mock_enqueue.assert_called_once_with([1, 2], "text", None)
@@ -0,0 +1,179 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from allauth.socialaccount.models import SocialAccount
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from gymkhanagp.models import (
+    CompetitionTypeModel,
+    SportsmanClassModel,
+    Subscription,
+)
+from gymkhanagp.reference import reference_cache
+from gymkhanagp.tests.factories import (
+    CompetitionTypeFactory,
+    SportsmanClassFactory,
+    SubscriptionFactory,
+    UserFactory,
+)
+from telegram_bot.manager import KeyboardManager
+from telegram_bot.session import SessionCache, user_sessions
+from telegram_bot.states import States
+
+TELEGRAM_ID = 189000981
+
+
+@pytest.fixture
+def telegram_user(db):
+    """Пользователь бота с подпиской на GGP C3"""
+    reference_cache.invalidate()
+    ggp = CompetitionTypeFactory(name="ggp")
+    CompetitionTypeFactory(name="base")
+    SportsmanClassFactory(name="C1", subscribe_emoji="🟩")
+    SportsmanClassFactory(name="C2", subscribe_emoji="🟦")
+    user = UserFactory()
+    SocialAccount.objects.create(user=user, provider="telegram", uid=TELEGRAM_ID)
+    SubscriptionFactory(
+        user_subscription=user.subscriptions,
+        competition_type=ggp,
+        sportsman_class__name="C3",
+    )
+    yield user
+    reference_cache.invalidate()
+
+
+def tap(state: States, text: str):
+    update = MagicMock()
+    update.effective_user.id = TELEGRAM_ID
+    update.message.text = text
+    update.message.reply_text = AsyncMock()
+    context = MagicMock(user_data={})
+    handler = KeyboardManager()._state_handlers[state]
+    return async_to_sync(handler.handle)(update, context), update
+
+
+@pytest.mark.django_db
+class TestSessionCache:
+    def test_loads_identity_and_subscriptions(self, telegram_user):
+        session = async_to_sync(user_sessions.get)(TELEGRAM_ID)
+
+        assert session.user_id == telegram_user.pk
+        assert session.subscription_id == telegram_user.subscriptions.pk
+        assert session.subscribed_classes("ggp") == {"C3"}
+        assert session.subscribed_classes("base") == set()
+
+    def test_cached_until_ttl(self, telegram_user):
+        sessions = SessionCache(max_size=10, ttl=60)
+        session = async_to_sync(sessions.get)(TELEGRAM_ID)
+
+        with CaptureQueriesContext(connection) as queries:
+            assert async_to_sync(sessions.get)(TELEGRAM_ID) is session
+        assert len(queries) == 0
+
+        expiring = SessionCache(max_size=10, ttl=0)
+        session = async_to_sync(expiring.get)(TELEGRAM_ID)
+        assert async_to_sync(expiring.get)(TELEGRAM_ID) is not session
+
+    def test_lru_bounded(self, telegram_user):
+        sessions = SessionCache(max_size=1, ttl=60)
+        async_to_sync(sessions.get)(TELEGRAM_ID)
+        async_to_sync(sessions.get)(1)
+
+        assert list(sessions._sessions) == [TELEGRAM_ID]
+
+    def test_unknown_user(self, db):
+        assert async_to_sync(user_sessions.get)(1) is None
+
+    def test_toggle_costs_one_write(self, telegram_user):
+        """Нажатие на класс: одна запись без чтений (на SQLite - DELETE и INSERT)"""
+        async_to_sync(user_sessions.get)(TELEGRAM_ID)
+        reference_cache.sportsman_classes()
+
+        with CaptureQueriesContext(connection) as queries:
+            state, update = tap(States.CLASS_SELECTION, "🔲 C1")
+
+        assert state == States.CLASS_SELECTION
+        statements = [
+            query["sql"].split()[0]
+            for query in queries
+            if not query["sql"].startswith(("SAVEPOINT", "RELEASE"))
+        ]
+        assert "SELECT" not in statements
+        if connection.vendor == "postgresql":
+            assert statements == ["WITH"]
+        assert user_sessions._sessions[TELEGRAM_ID].subscribed_classes("ggp") == {
+            "C1",
+            "C3",
+        }
+        assert "🟩 C1" in str(update.message.reply_text.call_args)
+        assert Subscription.objects.filter(
+            user_subscription__user=telegram_user, sportsman_class__name="C1"
+        ).exists()
+
+    def test_toggle_scoped_by_competition(self, telegram_user):
+        tap(States.BASE_CLASS_SELECTION, "🔲 C3")
+
+        state, _ = tap(States.CLASS_SELECTION, "🟩 C3")
+
+        assert state == States.CLASS_SELECTION
+        remaining = Subscription.objects.filter(
+            user_subscription__user=telegram_user
+        ).values_list("competition_type__name", "sportsman_class__name")
+        assert list(remaining) == [("base", "C3")]
+        session = async_to_sync(user_sessions.get)(TELEGRAM_ID)
+        assert session.subscribed_classes("ggp") == set()
+        assert session.subscribed_classes("base") == {"C3"}
+
+    def test_toggle_off_reads_nothing(self, telegram_user):
+        async_to_sync(user_sessions.get)(TELEGRAM_ID)
+        reference_cache.sportsman_classes()
+
+        with CaptureQueriesContext(connection) as queries:
+            tap(States.CLASS_SELECTION, "🟩 C3")
+
+        assert not [query for query in queries if query["sql"].startswith("SELECT")]
+        assert not Subscription.objects.exists()
+
+    def test_menu_after_check_interval_reads_nothing(
+        self, telegram_user, settings, monkeypatch
+    ):
+        """Справочник без изменений не перечитывается при сверке версии"""
+        settings.CACHES = {
+            alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+            for alias in ("default", "shared", "fingerprints")
+        }
+        monkeypatch.setattr(reference_cache, "check_interval", 0)
+        manager = KeyboardManager()
+        async_to_sync(user_sessions.get)(TELEGRAM_ID)
+        reference_cache.sportsman_classes()
+
+        def open_menu():
+            update = MagicMock()
+            update.effective_user.id = TELEGRAM_ID
+            update.message.text = "📝 Подписаться на GGP классы"
+            update.message.reply_text = AsyncMock()
+            context = MagicMock(user_data={"state": States.MAIN_MENU})
+            async_to_sync(manager.handle_message)(update, context)
+            return update.message.reply_text.call_args.kwargs["reply_markup"]
+
+        markup = open_menu()
+        with CaptureQueriesContext(connection) as queries:
+            # раскладка классов не перестраивается
+            assert open_menu() is markup
+        assert len(queries) == 0
+
+    def test_toggle_follows_database_state(self, telegram_user):
+        """Подписка оформлена на сайте после загрузки сессии"""
+        async_to_sync(user_sessions.get)(TELEGRAM_ID)
+        Subscription.objects.create(
+            user_subscription=telegram_user.subscriptions,
+            competition_type=CompetitionTypeModel.objects.get(name="ggp"),
+            sportsman_class=SportsmanClassModel.objects.get(name="C1"),
+        )
+
+        tap(States.CLASS_SELECTION, "🔲 C1")
+
+        session = async_to_sync(user_sessions.get)(TELEGRAM_ID)
+        assert session.subscribed_classes("ggp") == {"C3"}
+        assert not Subscription.objects.filter(sportsman_class__name="C1").exists()
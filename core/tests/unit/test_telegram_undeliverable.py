@@ -0,0 +1,148 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from allauth.socialaccount.models import SocialAccount
+from django.contrib.auth import get_user_model
+from gymkhanagp.models import UserSubscription
+from gymkhanagp.tasks import broadcast_telegram_message, deactivate_undeliverable_users
+from redis.exceptions import ConnectionError as RedisConnectionError
+from telegram.error import Forbidden
+from telegram_bot.undeliverable import UndeliverableChats
+from telegram_bot.utils import messages
+
+User = get_user_model()
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def command(*args):
+            self.commands.append((name, args))
+            return self
+
+        return command
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args) for name, args in self.commands]
+
+
+class FakeRedis:
+    """Множества и счётчики Redis в памяти (значения хранятся строками)."""
+
+    def __init__(self):
+        self.sets: dict[str, set[str]] = {}
+        self.counters: dict[str, int] = {}
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def sadd(self, key, *values):
+        self.sets.setdefault(key, set()).update(map(str, values))
+
+    def srem(self, key, *values):
+        self.sets.get(key, set()).difference_update(map(str, values))
+
+    def smismember(self, key, values):
+        return [int(str(value) in self.sets.get(key, set())) for value in values]
+
+    def spop(self, key, count):
+        members = self.sets.get(key, set())
+        return [members.pop() for _ in range(min(count, len(members)))]
+
+    def scard(self, key):
+        return len(self.sets.get(key, set()))
+
+    def incrby(self, key, amount):
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def get(self, key):
+        value = self.counters.get(key)
+        return None if value is None else str(value)
+
+
+@pytest.fixture
+def mock_bot_forbidden():
+    bot = MagicMock()
+    bot.send_message = AsyncMock(side_effect=Forbidden("bot was blocked by the user"))
+    return bot
+
+
+@pytest.fixture
+def redis():
+    fake = FakeRedis()
+    with patch("telegram_bot.undeliverable.get_redis", return_value=fake):
+        yield fake
+
+
+def make_telegram_user(chat_id: int) -> User:
+    user = User.objects.create(username=f"tg_{chat_id}")
+    # подписка создаётся сигналом gymkhanagp.signals
+    SocialAccount.objects.create(user=user, provider="telegram", uid=str(chat_id))
+    return user
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("redis")
+class TestUndeliverableChats:
+    """Тесты множества недоставляемых чатов."""
+
+    async def test_forbidden_marks_chat_without_db_writes(self, mock_bot_forbidden):
+        status = await messages.deliver_message(mock_bot_forbidden, 5, "text")
+
+        assert status == messages.BLOCKED
+        assert UndeliverableChats().filter([4, 5, 6]) == [4, 6]
+
+    @patch("gymkhanagp.tasks.send_telegram_broadcast_task.delay")
+    def test_fanout_skips_undeliverable(self, mock_delay):
+        chats = UndeliverableChats()
+        chats.add(2)
+
+        broadcast_telegram_message([1, 2, 3], "text")
+        broadcast_telegram_message([2], "text")
+
+        mock_delay.assert_called_once_with([1, 3], "text", None)
+        assert chats.stats()["skipped_sends"] == 2
+
+    def test_discard_restores_delivery(self):
+        chats = UndeliverableChats()
+        chats.add(2)
+
+        chats.discard(2)
+
+        assert chats.filter([2]) == [2]
+        assert chats.stats()["pending_deactivation"] == 0
+
+    def test_bulk_deactivation(self, settings):
+        settings.TELEGRAM_UNDELIVERABLE_BATCH_SIZE = 2
+        blocked = [make_telegram_user(chat_id) for chat_id in (11, 12, 13)]
+        active = make_telegram_user(14)
+        chats = UndeliverableChats()
+        for chat_id in (11, 12, 13, 99):
+            chats.add(chat_id)
+
+        with patch("gymkhanagp.tasks.subscriber_index") as mock_index:
+            stats = deactivate_undeliverable_users()
+
+        assert stats["deactivated"] == 3
+        assert stats["pending_deactivation"] == 0
+        assert stats["undeliverable"] == 4
+        assert not User.objects.filter(
+            id__in=[user.id for user in blocked], is_active=True
+        ).exists()
+        assert not UserSubscription.objects.filter(
+            user__in=blocked, is_active=True
+        ).exists()
+        active.refresh_from_db()
+        assert active.is_active
+        mock_index.invalidate.assert_called_once()
+
+
+@pytest.mark.django_db
+def test_redis_unavailable_keeps_all_chats():
+    with patch("telegram_bot.undeliverable.get_redis") as mock_redis:
+        mock_redis.return_value.smismember.side_effect = RedisConnectionError()
+
+        assert UndeliverableChats().filter([1, 2]) == [1, 2]
@@ -1,6 +1,7 @@
 from unittest.mock import patch
 
 import pytest
+from asgiref.sync import sync_to_async
 from users.utils import get_telegram_id, get_user_by_telegram_id
 
 
@@ -25,7 +26,7 @@ class TestGetTelegramId:
         user = django_user_with_telegram
 
         # Act
-        user_id: int | None = get_telegram_id(user)
+        user_id: int | None = await sync_to_async(get_telegram_id)(user)
 
         # Assert
         assert user_id == 189000981
@@ -48,7 +49,7 @@ class TestGetTelegramId:
 
         """
         # Act & Assert
-        result = get_telegram_id(value)
+        result = await sync_to_async(get_telegram_id)(value)
 
         assert not result
         mock_logger.error.assert_called_once()
@@ -64,7 +65,7 @@ class TestGetTelegramId:
         user = django_user
 
         # Act
-        user_id: int | None = get_telegram_id(user)
+        user_id: int | None = await sync_to_async(get_telegram_id)(user)
 
         # Assert
         assert user_id is None
@@ -82,7 +83,7 @@ class TestGetTelegramId:
         Так же производит запись в логгер
         """
         # Act
-        user_id: int | None = get_telegram_id(wrong_value)
+        user_id: int | None = await sync_to_async(get_telegram_id)(wrong_value)
 
         # Assert
         mock_logger.error.assert_called_once()
@@ -96,7 +97,7 @@ class TestGetTelegramId:
         и возвращает None без выбрасывания исключений.
         """
         # Act
-        user_id: int | None = get_telegram_id(None)
+        user_id: int | None = await sync_to_async(get_telegram_id)(None)
 
         # Assert
         assert user_id is None
@@ -134,7 +135,7 @@ class TestGetTelegramUserById:
         expected_user = django_user_with_telegram
 
         # Act
-        get_user = get_user_by_telegram_id(value)
+        get_user = await sync_to_async(get_user_by_telegram_id)(value)
 
         # Assert
         assert get_user == expected_user
@@ -166,7 +167,7 @@ class TestGetTelegramUserById:
         контекста БД, но тест проверяет поиск других/несуществующих ID.
         """
         # Act
-        get_user = get_user_by_telegram_id(value)
+        get_user = await sync_to_async(get_user_by_telegram_id)(value)
 
         # Assert
         assert get_user is None
@@ -183,7 +184,7 @@ class TestGetTelegramUserById:
         типов, отличных от int, str или None (списки, словари, объекты).
         """
 
-        result = get_user_by_telegram_id(wrong_value)
+        result = await sync_to_async(get_user_by_telegram_id)(wrong_value)
 
         assert not result
         mock_logger.error.assert_called_once()
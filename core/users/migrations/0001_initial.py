@@ -0,0 +1,82 @@
+# Generated by Django 6.0.9 on 2026-10-18 13:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Report",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Дата создания"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Дата обновления"),
+                ),
+                ("text", models.TextField(verbose_name="Текст отчета")),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[
+                            ("Telegram", "telegram"),
+                            ("Website", "website"),
+                            ("Other", "other"),
+                        ],
+                        default="Other",
+                        max_length=20,
+                        verbose_name="Источник отчета",
+                    ),
+                ),
+                (
+                    "report_type",
+                    models.CharField(
+                        choices=[
+                            ("Bug", "bug"),
+                            ("Feature", "feature"),
+                            ("Other", "other"),
+                        ],
+                        default="Other",
+                        max_length=20,
+                        verbose_name="Тип отчета",
+                    ),
+                ),
+                ("resolved", models.BooleanField(default=False)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Репорт пользователя",
+                "verbose_name_plural": "Репорты пользователей",
+                "db_table": "reports",
+                "ordering": ("-created_at",),
+                "default_related_name": "profile",
+            },
+        ),
+    ]